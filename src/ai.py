@@ -0,0 +1,358 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game_events import EventType, NullEventSink, RecordingEventSink
+from game_state import GameState
+from snapshot import _full_payload, restore_full
+
+# Pluggable faction AIs. GameState.ai_players maps a faction id to an AI object; factions without one
+# use the built-in random AI (GameState._plan_default_ai_turn). Each turn an AI plans its orders as
+# (unit_id, target_city_id) moves to adjacent cities from the turn-start state, and GameState then
+# carries them out through move_unit exactly as if a player had issued them. Units without an order
+# hold their city. Planning must leave the game as it found it and draw randomness only from the rng
+# it is given.
+Order = Tuple[str, str]
+
+_NULL_SINK = NullEventSink()
+
+
+class FactionAI:
+    name = "base"
+
+    def plan_orders(self, game_state: GameState, faction_id: str, rng: random.Random) -> List[Order]:
+        raise NotImplementedError
+
+    def merge_stats(self, other: "FactionAI"):
+        # Takes over the counters of a copy of this AI that planned a turn in another process.
+        pass
+
+    def close(self):
+        # Releases worker processes or other resources held between turns.
+        pass
+
+
+def _units_by_origin(game_state: GameState, faction_id: str) -> Dict[Tuple[str, object], List[str]]:
+    # The faction's living, placed units grouped by (city, movement type): units sharing both have the
+    # same choice of moves.
+    groups: Dict[Tuple[str, object], List[str]] = {}
+    units = game_state.army_units
+    for unit_id in game_state.factions[faction_id].army_units_list_ids:
+        unit = units.get(unit_id)
+        if unit is None or unit.soldiers <= 0 or not unit.current_location_city_id:
+            continue
+        key = (unit.current_location_city_id, game_state._movement_type_of(unit))
+        groups.setdefault(key, []).append(unit_id)
+    return groups
+
+
+def _enemy_strength(game_state: GameState, city_id: str) -> int:
+    owner_id = game_state.game_map.cities[city_id].current_owner_faction_id
+    return game_state._city_faction_unit_counts.get(city_id, {}).get(owner_id, 0)
+
+
+def candidate_plans(game_state: GameState, faction_id: str, count: int = 8, rng: Optional[random.Random] = None) -> List[List[Order]]:
+    # A handful of complete order sets for the faction, each deciding every unit:
+    #   0 hold      - nobody moves
+    #   1 advance   - every unit attacks an adjacent enemy city, or takes a step toward the nearest one
+    #   2 strike    - only units next to an enemy city move, all into its most weakly held neighbour
+    #   3.. mixed   - each unit group independently holds, attacks or advances at random
+    # Duplicates are dropped, so hold always comes first and advance second unless it equals hold.
+    # Plans are built once per decision; search then only has to compare them.
+    rng = rng or random.Random(0)
+    game_map = game_state.game_map
+    cities = game_map.cities
+    enemy_ids = [enemy_id for enemy_id in game_state.diplomacy.enemies_of(faction_id) if enemy_id in game_state.factions]
+    enemy_city_ids = [city_id for enemy_id in enemy_ids for city_id in game_state.factions[enemy_id].controlled_cities_ids]
+    groups = _units_by_origin(game_state, faction_id)
+
+    hops: Dict[Tuple[str, object], str] = {}
+    if enemy_city_ids:
+        sources_by_type: Dict[object, List[str]] = {}
+        for city_id, movement_type in groups:
+            sources_by_type.setdefault(movement_type, []).append(city_id)
+        for movement_type, source_ids in sources_by_type.items():
+            for source_id, (_, hop_city_id, _) in game_map.distances_from_many(source_ids, enemy_city_ids, movement_type).items():
+                if hop_city_id is not None:
+                    hops[(source_id, movement_type)] = hop_city_id
+
+    war_targets: Dict[str, List[str]] = {}
+    for city_id, _ in groups:
+        if city_id not in war_targets:
+            war_targets[city_id] = [adj_city_id for adj_city_id in game_map.neighbors(city_id)
+                                    if (owner_id := cities[adj_city_id].current_owner_faction_id) and owner_id != faction_id
+                                    and game_state.diplomacy.is_at_war(faction_id, owner_id)]
+
+    def advance_target(key) -> Optional[str]:
+        targets = war_targets[key[0]]
+        return targets[0] if targets else hops.get(key)
+
+    def weakest_target(key) -> Optional[str]:
+        targets = war_targets[key[0]]
+        return min(targets, key=lambda city_id: _enemy_strength(game_state, city_id)) if targets else None
+
+    def plan_from(choose) -> List[Order]:
+        orders: List[Order] = []
+        for key, unit_ids in groups.items():
+            target = choose(key)
+            if target is not None and target != key[0]:
+                orders.extend((unit_id, target) for unit_id in unit_ids)
+        return orders
+
+    plans = [[], plan_from(advance_target), plan_from(weakest_target)]
+    while len(plans) < count:
+        plans.append(plan_from(lambda key: rng.choice((None, advance_target(key), weakest_target(key), hops.get(key)))))
+    unique: Dict[Tuple[Order, ...], List[Order]] = {}
+    for plan in plans[:count]:
+        unique.setdefault(tuple(plan), plan)  # small factions often get the same plan more than once
+    return list(unique.values())
+
+
+def evaluate(game_state: GameState, faction_id: str) -> float:
+    # Score in [0, 1]: the faction's share of all owned cities and of all soldiers, weighted equally.
+    owned_cities = sum(len(faction.controlled_cities_ids) for faction in game_state.factions.values())
+    own_cities = len(game_state.factions[faction_id].controlled_cities_ids)
+    table = game_state.army_units
+    own_code = table.factions.codes.get(faction_id)
+    total_soldiers = sum(table.soldiers)  # rows of destroyed units hold 0 soldiers
+    own_soldiers = sum(soldiers for code, soldiers in zip(table.faction_codes, table.soldiers) if code == own_code)
+    city_share = own_cities / owned_cities if owned_cities else 0.0
+    soldier_share = own_soldiers / total_soldiers if total_soldiers else 0.0
+    return 0.5 * (city_share + soldier_share)
+
+
+def _playout(game_state: GameState, faction_id: str, plan: Sequence[Order], depth: int) -> float:
+    # Plays the plan, resolves this turn's battles, then lets every faction (this one included) run
+    # the built-in random AI for depth - 1 more turns.
+    for unit_id, target_city_id in plan:
+        game_state.move_unit(unit_id, target_city_id, acting_faction_id=faction_id)
+    game_state._resolve_all_city_battles()
+    for _ in range(depth - 1):
+        game_state.next_turn()
+    return evaluate(game_state, faction_id)
+
+
+def _select(visits: List[int], totals: List[float], playouts: int, exploration: float) -> int:
+    # UCB1 over the candidate plans; each plan is tried once before any is tried twice.
+    for index, count in enumerate(visits):
+        if not count:
+            return index
+    log_playouts = math.log(playouts)
+    return max(range(len(visits)), key=lambda index: totals[index] / visits[index] + exploration * math.sqrt(log_playouts / visits[index]))
+
+
+def search(game_state: GameState, faction_id: str, plans: Sequence[Sequence[Order]], seed: int, deadline: Optional[float],
+           max_playouts: Optional[int], depth: int, exploration: float) -> Tuple[List[int], List[float]]:
+    # Monte Carlo tree search with the candidate plans as the root's children and random playouts below
+    # them. Every playout runs inside a transaction on game_state itself and is rolled back, so the game
+    # is left exactly as it was; it plays under its own game seed so that playouts differ. Stops at the
+    # time.monotonic() deadline or after max_playouts. Returns (visits, total value) per plan.
+    visits = [0] * len(plans)
+    totals = [0.0] * len(plans)
+    playout_seeds = random.Random(seed)
+    saved_seed, saved_sink = game_state.seed, game_state.event_sink
+    saved_players, saved_planner, saved_profiler = game_state.ai_players, game_state.ai_planner, game_state.profiler
+    game_state.event_sink = _NULL_SINK
+    game_state.ai_players = {}
+    game_state.ai_planner = None
+    game_state.profiler = None  # playout turns are not game turns
+    saved_replay_log, game_state.replay_log = game_state.replay_log, None
+    playouts = 0
+    try:
+        while (max_playouts is None or playouts < max_playouts) and (deadline is None or time.monotonic() < deadline):
+            index = _select(visits, totals, playouts, exploration)
+            game_state.seed = playout_seeds.getrandbits(64)
+            game_state.begin()
+            try:
+                value = _playout(game_state, faction_id, plans[index], depth)
+            finally:
+                game_state.rollback()
+            visits[index] += 1
+            totals[index] += value
+            playouts += 1
+    finally:
+        game_state.seed, game_state.event_sink = saved_seed, saved_sink
+        game_state.ai_players, game_state.ai_planner, game_state.profiler = saved_players, saved_planner, saved_profiler
+        game_state.replay_log = saved_replay_log
+    return visits, totals
+
+
+def _search_worker(payload, faction_id: str, plans, seed: int, deadline: Optional[float], max_playouts: Optional[int],
+                   depth: int, exploration: float) -> Tuple[List[int], List[float]]:
+    # Runs in a worker process on a copy of the game rebuilt from a snapshot payload.
+    game_state = restore_full(payload)
+    game_state.set_event_sink(_NULL_SINK)
+    return search(game_state, faction_id, plans, seed, deadline, max_playouts, depth, exploration)
+
+
+class GreedyAI(FactionAI):
+    # Every unit attacks or advances on the nearest enemy city each turn. Cheap, and the fallback plan
+    # of MCTSAI when its budget allows no playouts at all.
+    name = "greedy"
+
+    def plan_orders(self, game_state: GameState, faction_id: str, rng: random.Random) -> List[Order]:
+        return candidate_plans(game_state, faction_id, count=2)[-1]
+
+
+class MCTSAI(FactionAI):
+    # Chooses between candidate_plans() by Monte Carlo tree search within a wall-clock budget per
+    # decision (budget_ms; None to run exactly max_playouts per searching process, which makes decisions
+    # reproducible).
+    # With workers > 1 the search is root-parallel: workers - 1 processes each search a snapshot copy
+    # of the game with their own seed next to the search in this process, and visit counts are summed.
+    # The budget is checked between playouts, so a decision can overrun it by one playout.
+    name = "mcts"
+
+    def __init__(self, budget_ms: Optional[float] = 50.0, max_playouts: Optional[int] = None, depth: int = 3,
+                 candidates: int = 8, workers: int = 1, exploration: float = 0.7):
+        if budget_ms is None and max_playouts is None:
+            raise ValueError("MCTSAI needs a time budget, a playout limit, or both")
+        if depth < 1 or candidates < 2 or workers < 1:
+            raise ValueError("depth and workers must be at least 1 and candidates at least 2")
+        self.budget_ms = budget_ms
+        self.max_playouts = max_playouts
+        self.depth = depth
+        self.candidates = candidates
+        self.workers = workers
+        self.exploration = exploration
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.decisions = 0
+        self.playouts = 0
+        self.search_seconds = 0.0
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.search_seconds if self.search_seconds else 0.0
+
+    def merge_stats(self, other: "MCTSAI"):
+        self.decisions, self.playouts, self.search_seconds = other.decisions, other.playouts, other.search_seconds
+
+    def __getstate__(self):
+        # Copies sent to planning workers start their own process pool if they need one.
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def get_stats(self) -> Dict[str, float]:
+        return {"decisions": self.decisions, "playouts": self.playouts, "search_seconds": self.search_seconds,
+                "playouts_per_second": self.playouts_per_second}
+
+    def plan_orders(self, game_state: GameState, faction_id: str, rng: random.Random) -> List[Order]:
+        start = time.monotonic()
+        deadline = start + self.budget_ms / 1000.0 if self.budget_ms is not None else None
+        seed = rng.getrandbits(64)
+        plans = candidate_plans(game_state, faction_id, self.candidates, random.Random(seed))
+        if len(plans) == 1:
+            return plans[0]  # nothing to choose between, e.g. a faction with no units left
+        futures = []
+        if self.workers > 1:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers - 1)
+            payload = _full_payload(game_state)
+            futures = [self._executor.submit(_search_worker, payload, faction_id, plans, seed + worker, deadline,
+                                             self.max_playouts, self.depth, self.exploration)
+                       for worker in range(1, self.workers)]
+        visits, totals = search(game_state, faction_id, plans, seed, deadline, self.max_playouts, self.depth, self.exploration)
+        for future in futures:
+            worker_visits, worker_totals = future.result()
+            visits = [a + b for a, b in zip(visits, worker_visits)]
+            totals = [a + b for a, b in zip(totals, worker_totals)]
+        playouts = sum(visits)
+        if playouts:
+            best = max(range(len(plans)), key=lambda index: (visits[index], totals[index] / visits[index] if visits[index] else 0.0))
+        else:
+            best = min(1, len(plans) - 1)  # the advance plan
+        elapsed = time.monotonic() - start
+        self.decisions += 1
+        self.playouts += playouts
+        self.search_seconds += elapsed
+        sink = game_state.event_sink
+        if sink.enabled:
+            sink.emit((EventType.AI_PLAN, game_state.current_turn, faction_id, self.name, len(plans), playouts,
+                       round(elapsed * 1000, 1), len(plans[best])))
+        return plans[best]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _plan_worker(payload, jobs: List[Tuple[str, int]], ai_players: Dict[str, FactionAI],
+                 record_events: bool) -> List[Tuple[str, List[Order], List[Tuple], Optional[FactionAI]]]:
+    # Rebuilds the turn-start state from a snapshot payload and plans the given factions. Returns, per
+    # faction, its orders, the events planning emitted and the worker's copy of its AI (for stats).
+    game_state = restore_full(payload)
+    sink = RecordingEventSink() if record_events else _NULL_SINK
+    game_state.set_event_sink(sink)
+    game_state.ai_players = ai_players
+    results = []
+    for faction_id, seed in jobs:
+        orders = game_state.plan_ai_turn(faction_id, seed)
+        events = list(sink.events) if record_events else []
+        if record_events:
+            sink.clear()
+        results.append((faction_id, orders, events, ai_players.get(faction_id)))
+    return results
+
+
+class ParallelPlanner:
+    # Plans AI turns in worker processes (GameState.set_ai_planner). Factions are dealt round-robin to
+    # the workers, each of which rebuilds the turn-start state from one snapshot payload per turn and
+    # gets pickled copies of its factions' AI objects; their stats are merged back afterwards and the
+    # events they emitted are replayed here in faction order. Processes rather than threads, since
+    # planning is pure Python and would hold the GIL. Every faction plans from the same state with its
+    # own seed, so the orders do not depend on the number of workers. Rebuilding the state costs about
+    # as much as loading a snapshot, so this pays off when planning is expensive (MCTSAI, many factions).
+
+    def __init__(self, workers: int):
+        if workers < 1:
+            raise ValueError("ParallelPlanner needs at least one worker")
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def plan(self, game_state: GameState, jobs: List[Tuple[str, int]]) -> Dict[str, List[Order]]:
+        if not jobs:
+            return {}
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        payload = _full_payload(game_state)
+        sink = game_state.event_sink
+        futures = []
+        for worker in range(min(self.workers, len(jobs))):
+            worker_jobs = jobs[worker::self.workers]
+            ai_players = {faction_id: game_state.ai_players[faction_id] for faction_id, _ in worker_jobs
+                          if faction_id in game_state.ai_players}
+            futures.append(self._executor.submit(_plan_worker, payload, worker_jobs, ai_players, sink.enabled))
+        results = {}
+        for future in futures:
+            for faction_id, orders, events, worker_ai in future.result():
+                results[faction_id] = (orders, events)
+                if worker_ai is not None:
+                    game_state.ai_players[faction_id].merge_stats(worker_ai)
+        orders_by_faction = {}
+        for faction_id, _ in jobs:
+            orders, events = results[faction_id]
+            for event in events:
+                sink.emit(event)
+            orders_by_faction[faction_id] = orders
+        return orders_by_faction
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+AI_TYPES = {"greedy": GreedyAI, "mcts": MCTSAI}
+
+
+def make_ai(name: str, **options) -> Optional[FactionAI]:
+    # "random" means the built-in AI, represented by None in GameState.ai_players.
+    if name == "random":
+        return None
+    if name not in AI_TYPES:
+        raise ValueError(f"Unknown AI '{name}'. Choose from: random, {', '.join(AI_TYPES)}")
+    return AI_TYPES[name](**options)
@@ -1,27 +1,104 @@
-
 from typing import Optional
+from unit_table import UnitTable
 
 class ArmyUnit:
+    # A unit is a lightweight view onto one row of a UnitTable. A unit constructed directly owns a private
+    # one-row table until GameState.add_army_unit moves it into the game's shared table.
+    __slots__ = ("_table", "_row")
+
     def __init__(self, unit_id: str, unit_type_id: str, base_attack: int, base_defense: int, 
                  owning_faction_id: str, soldiers: int = 1000, 
                  leading_general_id: Optional[str] = None):
-        self.unit_id = unit_id
-        self.unit_type_id = unit_type_id 
-        self.base_attack = base_attack
-        self.base_defense = base_defense
-        self.owning_faction_id = owning_faction_id
-        self.leading_general_id: Optional[str] = leading_general_id
-        self.soldiers = soldiers
-        self.max_soldiers = soldiers 
-        self.morale = 100 
-        self.current_location_city_id: Optional[str] = None 
+        self._table = UnitTable()
+        self._row = self._table.append_row(unit_id, unit_type_id, base_attack, base_defense, owning_faction_id,
+                                           soldiers, soldiers, leading_general_id=leading_general_id)
+
+    @property
+    def unit_id(self) -> str:
+        return self._table.unit_ids[self._row]
+
+    @property
+    def unit_type_id(self) -> str:
+        return self._table.unit_types.values[self._table.type_codes[self._row]]
+
+    @property
+    def base_attack(self) -> int:
+        return self._table.base_attack[self._row]
+
+    @property
+    def base_defense(self) -> int:
+        return self._table.base_defense[self._row]
+
+    @property
+    def owning_faction_id(self) -> Optional[str]:
+        return self._table.factions.lookup(self._table.faction_codes[self._row])
+
+    @property
+    def leading_general_id(self) -> Optional[str]:
+        return self._table.generals.lookup(self._table.general_codes[self._row])
+
+    @leading_general_id.setter
+    def leading_general_id(self, general_id: Optional[str]):
+        table = self._table
+        if table.write_barrier:
+            table.before_write("general_codes", self._row)
+        table.general_codes[self._row] = table.generals.intern(general_id)
+        table.dirty[self._row] = 1
+        table.version += 1
+
+    @property
+    def soldiers(self) -> int:
+        return self._table.soldiers[self._row]
+
+    @soldiers.setter
+    def soldiers(self, value: int):
+        table = self._table
+        if table.write_barrier:
+            table.before_write("soldiers", self._row)
+        table.soldiers[self._row] = value
+        table.dirty[self._row] = 1
+        table.version += 1
+
+    @property
+    def max_soldiers(self) -> int:
+        return self._table.max_soldiers[self._row]
+
+    @property
+    def morale(self) -> int:
+        return self._table.morale[self._row]
+
+    @morale.setter
+    def morale(self, value: int):
+        table = self._table
+        if table.write_barrier:
+            table.before_write("morale", self._row)
+        table.morale[self._row] = value
+        table.dirty[self._row] = 1
+        table.version += 1
+
+    @property
+    def current_location_city_id(self) -> Optional[str]:
+        return self._table.cities.lookup(self._table.city_codes[self._row])
+
+    @current_location_city_id.setter
+    def current_location_city_id(self, city_id: Optional[str]):
+        table = self._table
+        if table.write_barrier:
+            table.before_write("city_codes", self._row)
+        table.city_codes[self._row] = table.cities.intern(city_id)
+        table.dirty[self._row] = 1
+        table.version += 1
 
     def __str__(self):
         leader_str = f", Leader: {self.leading_general_id}" if self.leading_general_id else ""
         return f"Unit: {self.unit_id} ({self.unit_type_id}), ATK:{self.base_attack}, DEF:{self.base_defense}, Soldiers: {self.soldiers}, Faction: {self.owning_faction_id}, Location: {self.current_location_city_id or 'Field'}{leader_str}"
 
     def take_damage(self, damage: int):
+        # For a unit on its own; once it is in a game use GameState.damage_unit, which also updates the region counts.
         self.soldiers -= damage
         if self.soldiers < 0:
             self.soldiers = 0
         return self.soldiers == 0 # Returns True if unit is destroyed
+
+
+UnitTable.view_class = ArmyUnit
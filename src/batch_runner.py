@@ -0,0 +1,155 @@
+import argparse
+import contextlib
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ai import ParallelPlanner, make_ai
+from game_events import NullEventSink
+from game_state import GameState
+
+
+def _default_scenario() -> GameState:
+    from main import setup_initial_state
+    return setup_initial_state()
+
+
+def _determine_winner(game_state: GameState) -> Optional[str]:
+    owners = set(city.current_owner_faction_id for city in game_state.game_map.cities.values() if city.current_owner_faction_id)
+    if len(owners) == 1:
+        return owners.pop()
+    return None
+
+
+def collect_game_result(game_state: GameState) -> Dict[str, Any]:
+    cities_per_faction: Dict[str, int] = {faction_id: 0 for faction_id in game_state.factions}
+    for city in game_state.game_map.cities.values():
+        if city.current_owner_faction_id in cities_per_faction:
+            cities_per_faction[city.current_owner_faction_id] += 1
+    soldiers_per_faction: Dict[str, int] = {faction_id: 0 for faction_id in game_state.factions}
+    for unit in game_state.army_units.values():
+        if unit.owning_faction_id in soldiers_per_faction:
+            soldiers_per_faction[unit.owning_faction_id] += unit.soldiers
+    return {
+        "winner": _determine_winner(game_state),
+        "turn": game_state.current_turn,
+        "cities_per_faction": cities_per_faction,
+        "soldiers_per_faction": soldiers_per_faction,
+    }
+
+
+def run_headless_game(seed: int, num_turns: int, scenario_factory: Optional[Callable[[], GameState]] = None,
+                      combat_engine: str = "python", ai_name: str = "random",
+                      ai_options: Optional[Dict[str, Any]] = None, ai_planning_workers: int = 0) -> Dict[str, Any]:
+    random.seed(seed)
+    factory = scenario_factory or _default_scenario
+    turn_times: List[float] = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        game_state = factory()
+    game_state.seed = seed
+    game_state.set_event_sink(NullEventSink())
+    game_state.combat_engine = combat_engine
+    ai_players = []
+    for faction_id in game_state.factions:
+        if faction_id != game_state.player_faction_id and (ai_player := make_ai(ai_name, **(ai_options or {}))) is not None:
+            game_state.set_faction_ai(faction_id, ai_player)
+            ai_players.append(ai_player)
+    if ai_planning_workers:
+        game_state.set_ai_planner(ParallelPlanner(ai_planning_workers))
+    try:
+        for _ in range(num_turns):
+            turn_start = time.perf_counter()
+            game_state.next_turn()
+            game_state.compact_units()
+            turn_times.append(time.perf_counter() - turn_start)
+    finally:
+        for ai_player in ai_players:
+            ai_player.close()
+        game_state.set_ai_planner(None)
+    result = collect_game_result(game_state)
+    result["seed"] = seed
+    result["turn_times"] = turn_times
+    result["ai_playouts"] = sum(getattr(ai_player, "playouts", 0) for ai_player in ai_players)
+    result["ai_search_seconds"] = sum(getattr(ai_player, "search_seconds", 0.0) for ai_player in ai_players)
+    return result
+
+
+def _run_game_args(args) -> Dict[str, Any]:
+    return run_headless_game(*args)
+
+
+def aggregate_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    wins: Dict[str, int] = {}
+    total_cities: Dict[str, int] = {}
+    total_soldiers: Dict[str, int] = {}
+    all_turn_times: List[float] = []
+    for result in results:
+        winner_key = result["winner"] or "none"
+        wins[winner_key] = wins.get(winner_key, 0) + 1
+        for faction_id, count in result["cities_per_faction"].items():
+            total_cities[faction_id] = total_cities.get(faction_id, 0) + count
+        for faction_id, soldiers in result["soldiers_per_faction"].items():
+            total_soldiers[faction_id] = total_soldiers.get(faction_id, 0) + soldiers
+        all_turn_times.extend(result["turn_times"])
+    num_games = len(results)
+    ai_playouts = sum(result.get("ai_playouts", 0) for result in results)
+    ai_search_seconds = sum(result.get("ai_search_seconds", 0.0) for result in results)
+    return {
+        "games": num_games,
+        "wins": wins,
+        "mean_cities_per_faction": {f_id: total / num_games for f_id, total in total_cities.items()} if num_games else {},
+        "mean_soldiers_per_faction": {f_id: total / num_games for f_id, total in total_soldiers.items()} if num_games else {},
+        "mean_turn_time": sum(all_turn_times) / len(all_turn_times) if all_turn_times else 0.0,
+        "max_turn_time": max(all_turn_times) if all_turn_times else 0.0,
+        "ai_playouts": ai_playouts,
+        "ai_playouts_per_second": ai_playouts / ai_search_seconds if ai_search_seconds else 0.0,
+        "results": results,
+    }
+
+
+def run_batch(num_games: int, num_turns: int, base_seed: int = 0,
+              scenario_factory: Optional[Callable[[], GameState]] = None,
+              max_workers: Optional[int] = None, combat_engine: str = "python", ai_name: str = "random",
+              ai_options: Optional[Dict[str, Any]] = None, ai_planning_workers: int = 0) -> Dict[str, Any]:
+    # scenario_factory must be a module-level callable so it can be pickled into worker processes.
+    job_args = [(base_seed + game_index, num_turns, scenario_factory, combat_engine, ai_name, ai_options, ai_planning_workers)
+                for game_index in range(num_games)]
+    if max_workers == 1:
+        results = [_run_game_args(args) for args in job_args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_run_game_args, job_args, chunksize=max(1, num_games // 64)))
+    return aggregate_results(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Napoleon campaigns in parallel.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--combat-engine", choices=["python", "numpy", "parallel"], default="python")
+    parser.add_argument("--ai", choices=["random", "greedy", "mcts"], default="random", help="AI for every non-player faction")
+    parser.add_argument("--ai-budget-ms", type=float, default=50.0, help="mcts: wall-clock budget per faction per turn")
+    parser.add_argument("--ai-workers", type=int, default=1, help="mcts: processes per search (root-parallel)")
+    parser.add_argument("--ai-planning-workers", type=int, default=0, help="processes planning AI turns in each game (0: in-process)")
+    args = parser.parse_args()
+
+    ai_options = {"budget_ms": args.ai_budget_ms, "workers": args.ai_workers} if args.ai == "mcts" else None
+    batch_start = time.perf_counter()
+    summary = run_batch(args.games, args.turns, base_seed=args.seed, max_workers=args.workers, combat_engine=args.combat_engine,
+                        ai_name=args.ai, ai_options=ai_options, ai_planning_workers=args.ai_planning_workers)
+    elapsed = time.perf_counter() - batch_start
+    print(f"Ran {summary['games']} games x {args.turns} turns in {elapsed:.2f}s")
+    print(f"Wins: {summary['wins']}")
+    print(f"Mean cities per faction: {summary['mean_cities_per_faction']}")
+    print(f"Mean surviving soldiers per faction: {summary['mean_soldiers_per_faction']}")
+    print(f"Wall time per turn: mean {summary['mean_turn_time'] * 1000:.3f}ms, max {summary['max_turn_time'] * 1000:.3f}ms")
+    if summary["ai_playouts"]:
+        print(f"AI search: {summary['ai_playouts']} playouts, {summary['ai_playouts_per_second']:.0f} playouts/s per search")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,665 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from ai import MCTSAI, ParallelPlanner
+from army_unit import ArmyUnit
+from city import City
+from faction import Faction
+from game_enums import DiplomaticStatus, UnitType
+from game_events import NullEventSink
+from game_map import GameMap
+from game_state import GameState
+from general import General
+import combat_numpy
+import combat_parallel
+from replay import ReplayLog
+from scenario_generator import generate_scenario
+from snapshot import load_snapshot, save_delta, save_snapshot
+from unit_table import UnitTable
+from views import ViewQuery, get_page
+
+
+def measure_unit_memory(unit_counts: List[int] = (10**4, 10**5, 10**6), num_factions: int = 8, num_cities: int = 1000) -> Dict[int, float]:
+    # Bytes of heap retained per unit when units live in a UnitTable (ids, columns, interners and id index).
+    unit_types = list(UnitType)
+    faction_ids = [f"faction_{i}" for i in range(num_factions)]
+    city_ids = [f"city_{i}" for i in range(num_cities)]
+    results: Dict[int, float] = {}
+    for count in unit_counts:
+        gc.collect()
+        tracemalloc.start()
+        table = UnitTable()
+        for index in range(count):
+            unit_type = unit_types[index % len(unit_types)]
+            table.append_row(f"unit_{index}", unit_type.type_id, unit_type.base_attack, unit_type.base_defense,
+                             faction_ids[index % num_factions], unit_type.default_soldiers, unit_type.default_soldiers,
+                             current_location_city_id=city_ids[index % num_cities])
+        current_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[count] = current_bytes / count
+        del table
+    return results
+
+
+def bench_diplomacy(num_factions: int = 500, num_wars: int = 2000, num_queries: int = 200000, seed: int = 0) -> Dict[str, float]:
+    rng = random.Random(seed)
+    game = GameState(game_map_obj=GameMap(map_id="diplomacy_bench"))
+    start = time.perf_counter()
+    for index in range(num_factions):
+        game.add_faction(Faction(faction_id=f"minor_{index}", name=f"Minor Faction {index}", short_name=f"M{index}"))
+    registration_time = time.perf_counter() - start
+
+    faction_ids = list(game.factions)
+    start = time.perf_counter()
+    for _ in range(num_wars):
+        game.set_diplomatic_status(rng.choice(faction_ids), rng.choice(faction_ids), DiplomaticStatus.WAR, -100)
+    war_time = time.perf_counter() - start
+
+    pairs = [(rng.choice(faction_ids), rng.choice(faction_ids)) for _ in range(num_queries)]
+    start = time.perf_counter()
+    wars_found = sum(1 for faction1_id, faction2_id in pairs if game.is_at_war(faction1_id, faction2_id))
+    query_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    game.get_diplomacy_summary_str(faction_ids[0])
+    summary_time = time.perf_counter() - start
+    return {
+        "factions": num_factions,
+        "registration_s": registration_time,
+        "set_status_us": war_time / num_wars * 1e6,
+        "is_at_war_ns": query_time / num_queries * 1e9,
+        "wars_found": wars_found,
+        "summary_ms": summary_time * 1000,
+    }
+
+
+def _random_road_network(num_cities: int, roads_per_city: int, rng: random.Random) -> List[tuple]:
+    # A ring (so the map is connected) plus random long roads, as a stand-in for generated maps.
+    roads = [(index, (index + 1) % num_cities) for index in range(num_cities)]
+    roads.extend((rng.randrange(num_cities), rng.randrange(num_cities)) for _ in range(num_cities * (roads_per_city - 1)))
+    return [(a, b) for a, b in roads if a != b]
+
+
+def _map_with_cities(cities: List[City]) -> GameMap:
+    game_map = GameMap(map_id="graph_bench")
+    for city in cities:
+        game_map.add_city(city)
+    return game_map
+
+
+def _time_map_lookups(game_map: GameMap, pairs: List[tuple], probe_city_ids: List[str]) -> Dict[str, float]:
+    start = time.perf_counter()
+    for city1_id, city2_id in pairs:
+        game_map.are_adjacent(city1_id, city2_id)
+    adjacency_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for city_id in probe_city_ids:
+        for _ in game_map.adjacency_list[city_id]:
+            pass
+    neighbor_time = time.perf_counter() - start
+    start = time.perf_counter()
+    game_map.route_distance(probe_city_ids[0], probe_city_ids[1])
+    route_time = time.perf_counter() - start
+    return {"are_adjacent_ns": adjacency_time / len(pairs) * 1e9,
+            "neighbor_walk_ns": neighbor_time / len(probe_city_ids) * 1e9,
+            "cold_route_ms": route_time * 1000}
+
+
+def bench_map_layouts(num_cities: int = 100000, roads_per_city: int = 3, num_queries: int = 200000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    # GameMap heap bytes (excluding City objects) and lookup speed for the dict-of-sets
+    # layout, the in-memory CSR layout and a memory-mapped graph file.
+    rng = random.Random(seed)
+    city_ids = [f"city_{index}" for index in range(num_cities)]
+    roads = _random_road_network(num_cities, roads_per_city, rng)
+    pairs = [(city_ids[a], city_ids[b]) for a, b in (rng.choice(roads) for _ in range(num_queries // 2))]
+    pairs += [(rng.choice(city_ids), rng.choice(city_ids)) for _ in range(num_queries - len(pairs))]
+    probe_city_ids = [rng.choice(city_ids) for _ in range(num_queries)]
+    results: Dict[str, Dict[str, float]] = {}
+
+    cities = [City(city_id=city_id, name=city_id, region_id="bench") for city_id in city_ids]
+
+    # Map bytes exclude the City objects, which are shared by every layout.
+    gc.collect()
+    tracemalloc.start()
+    dict_map = _map_with_cities(cities)
+    for a, b in roads:
+        dict_map.add_adjacency(city_ids[a], city_ids[b])
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    dict_map.compact_adjacency()
+    gc.collect()
+    csr_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    lookup_map = _map_with_cities(cities)
+    for a, b in roads:
+        lookup_map.add_adjacency(city_ids[a], city_ids[b])
+    results["dict_of_sets"] = {"map_bytes_per_city": dict_bytes / num_cities, **_time_map_lookups(lookup_map, pairs, probe_city_ids)}
+    results["csr"] = {"map_bytes_per_city": csr_bytes / num_cities, **_time_map_lookups(dict_map, pairs, probe_city_ids)}
+
+    graph_fd, graph_path = tempfile.mkstemp(suffix=".graph")
+    os.close(graph_fd)
+    try:
+        lookup_map.save_graph_file(graph_path)
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        mapped_map = GameMap(map_id="graph_bench")
+        mapped_map.load_graph_file(graph_path, city_factory=lookup_map.cities.__getitem__)
+        load_time = time.perf_counter() - start
+        mapped_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results["csr_mmap"] = {"map_bytes_per_city": mapped_bytes / num_cities, "file_bytes_per_city": os.path.getsize(graph_path) / num_cities,
+                               "load_ms": load_time * 1000, **_time_map_lookups(mapped_map, pairs, probe_city_ids)}
+        del mapped_map
+    finally:
+        gc.collect()
+        try:
+            os.remove(graph_path)
+        except OSError:
+            pass
+    return results
+
+
+def _large_game_state(num_units: int, num_cities: int, num_factions: int, rng: random.Random, home_cities_only: bool = False) -> GameState:
+    # Random road network; cities dealt round-robin to the factions and units scattered over all cities
+    # (or only over their own faction's cities).
+    game_map = GameMap(map_id="bench")
+    city_ids = [f"city_{index}" for index in range(num_cities)]
+    game_map.add_cities([City(city_id=city_id, name=city_id, region_id="bench") for city_id in city_ids])
+    game_map.add_adjacencies([(city_ids[a], city_ids[b]) for a, b in _random_road_network(num_cities, 3, rng)])
+    game_state = GameState(game_map_obj=game_map)
+    faction_ids = [f"faction_{index}" for index in range(num_factions)]
+    game_state.add_factions([Faction(faction_id=faction_id, name=faction_id, short_name=faction_id) for faction_id in faction_ids])
+    game_state.assign_cities([(city_id, faction_ids[index % num_factions]) for index, city_id in enumerate(city_ids)])
+    unit_type = UnitType.INFANTRY_CORPS
+    homes = [rng.randrange(index % num_factions, num_cities, num_factions) if home_cities_only else rng.randrange(num_cities)
+             for index in range(num_units)]
+    game_state.add_unit_rows([(f"unit_{index}", unit_type.type_id, unit_type.base_attack, unit_type.base_defense, faction_ids[index % num_factions],
+                               20000, 20000, 100, None, city_ids[homes[index]]) for index in range(num_units)])
+    return game_state
+
+
+def bench_snapshots(num_units: int = 10**6, num_cities: int = 10000, num_factions: int = 8, changed_fraction: float = 0.02,
+                    seed: int = 0) -> Dict[str, Dict[str, float]]:
+    # Full snapshot vs per-turn delta size and time on a large state, where changed_fraction of the
+    # units are moved or take damage between the two saves.
+    rng = random.Random(seed)
+    game_state = _large_game_state(num_units, num_cities, num_factions, rng)
+    game_map = game_state.game_map
+    results: Dict[str, Dict[str, float]] = {}
+    directory = tempfile.mkdtemp()
+    try:
+        full_path = os.path.join(directory, "base.full")
+        results["full"] = save_snapshot(game_state, full_path)
+        unit_ids = list(game_state.army_units)
+        for unit_id in rng.sample(unit_ids, int(num_units * changed_fraction)):
+            unit = game_state.army_units[unit_id]
+            if rng.random() < 0.5:
+                game_state.move_unit(unit_id, rng.choice(game_map.neighbors(unit.current_location_city_id)))
+            else:
+                game_state.damage_unit(unit_id, rng.randrange(1, 5000))
+        game_state.current_turn += 1
+        delta_path = os.path.join(directory, "turn.delta")
+        results["delta"] = save_delta(game_state, delta_path, base_turn=game_state.current_turn - 1)
+        start = time.perf_counter()
+        load_snapshot(full_path)
+        results["full"]["load_seconds"] = time.perf_counter() - start
+        start = time.perf_counter()
+        load_snapshot(full_path, [delta_path])
+        results["delta"]["load_seconds"] = time.perf_counter() - start
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return results
+
+
+def bench_lookahead(num_units: int = 10**6, num_cities: int = 10000, num_factions: int = 8, turns: int = 5, seed: int = 0) -> Dict[str, float]:
+    # What it costs to simulate one turn and throw it away. Units start in their own cities and every
+    # faction is at war with the next one, so a turn changes a handful of units, cities and factions.
+    rng = random.Random(seed)
+    game_state = _large_game_state(num_units, num_cities, num_factions, rng, home_cities_only=True)
+    game_state.set_event_sink(NullEventSink())
+    faction_ids = list(game_state.factions)
+    for index, faction_id in enumerate(faction_ids):
+        game_state.set_diplomatic_status(faction_id, faction_ids[(index + 1) % num_factions], DiplomaticStatus.WAR, -100)
+    timings = {"turn": 0.0, "begin_turn_rollback": 0.0, "rollback": 0.0, "fork": 0.0, "fork_turn": 0.0, "journal_entries": 0}
+    for _ in range(turns):
+        start = time.perf_counter()
+        game_state.begin()
+        game_state.next_turn()
+        rollback_start = time.perf_counter()
+        timings["journal_entries"] += game_state.rollback()
+        timings["rollback"] += time.perf_counter() - rollback_start
+        timings["begin_turn_rollback"] += time.perf_counter() - start
+        start = time.perf_counter()
+        child = game_state.fork()
+        timings["fork"] += time.perf_counter() - start
+        child.next_turn()
+        timings["fork_turn"] += time.perf_counter() - start
+        del child
+        start = time.perf_counter()
+        game_state.next_turn()
+        timings["turn"] += time.perf_counter() - start
+    return {key: value / turns for key, value in timings.items()}
+
+
+def bench_ai(num_units: int = 2000, num_cities: int = 500, num_factions: int = 8, budget_ms: float = 200.0,
+             worker_counts: List[int] = (1, 2, 4), decisions: int = 3, seed: int = 0) -> Dict[int, Dict[str, float]]:
+    # MCTS playout throughput for one faction's decision, per number of root-parallel search processes.
+    # Worker processes are started before timing; each decision still ships a snapshot of the game to them.
+    rng = random.Random(seed)
+    game_state = _large_game_state(num_units, num_cities, num_factions, rng, home_cities_only=True)
+    game_state.set_event_sink(NullEventSink())
+    faction_ids = list(game_state.factions)
+    for index, faction_id in enumerate(faction_ids):
+        game_state.set_diplomatic_status(faction_id, faction_ids[(index + 1) % num_factions], DiplomaticStatus.WAR, -100)
+    results: Dict[int, Dict[str, float]] = {}
+    for workers in worker_counts:
+        ai_player = MCTSAI(budget_ms=budget_ms, workers=workers)
+        try:
+            ai_player.plan_orders(game_state, faction_ids[0], rng)  # warm-up: starts the worker processes
+            ai_player.decisions, ai_player.playouts, ai_player.search_seconds = 0, 0, 0.0
+            for _ in range(decisions):
+                ai_player.plan_orders(game_state, faction_ids[0], rng)
+        finally:
+            ai_player.close()
+        results[workers] = {"playouts_per_decision": ai_player.playouts / decisions,
+                            "decision_ms": ai_player.search_seconds / decisions * 1000,
+                            "playouts_per_second": ai_player.playouts_per_second}
+    return results
+
+
+def bench_ai_planning(num_units: int = 20000, num_cities: int = 4000, num_factions: int = 40, turns: int = 5,
+                      worker_counts: List[int] = (0, 2, 4), seed: int = 0) -> Dict[int, float]:
+    # Mean AI planning time per turn with the built-in AI for many factions, planned in this process (0)
+    # or by a ParallelPlanner with that many workers. The planned orders must not depend on the count.
+    rng = random.Random(seed)
+    game_state = _large_game_state(num_units, num_cities, num_factions, rng, home_cities_only=True)
+    game_state.set_event_sink(NullEventSink())
+    faction_ids = list(game_state.factions)
+    for index, faction_id in enumerate(faction_ids):
+        game_state.set_diplomatic_status(faction_id, faction_ids[(index + 1) % num_factions], DiplomaticStatus.WAR, -100)
+    results: Dict[int, float] = {}
+    reference = None
+    for workers in worker_counts:
+        game_state.set_ai_planner(ParallelPlanner(workers) if workers else None)
+        game_state._plan_ai_turns()  # warm-up: starts the worker processes
+        plans = []
+        start = time.perf_counter()
+        for _ in range(turns):
+            plans.append(game_state._plan_ai_turns())
+        results[workers] = (time.perf_counter() - start) / turns
+        if reference is None:
+            reference = plans
+        elif plans != reference:
+            raise RuntimeError(f"AI plans with {workers} workers differ from the in-process plans")
+    game_state.set_ai_planner(None)
+    return results
+
+
+def bench_battles(num_units: int = 10**5, num_cities: int = 2000, num_factions: int = 8, worker_counts: List[int] = (2, 4),
+                  seed: int = 0) -> Dict[str, float]:
+    # Time to resolve one turn's battles with the python engine and the parallel engine. Units are
+    # scattered over all cities, so most cities are contested. Each run is rolled back and must leave
+    # the same soldier counts as the python engine.
+    rng = random.Random(seed)
+    game_state = _large_game_state(num_units, num_cities, num_factions, rng)
+    game_state.set_event_sink(NullEventSink())
+    faction_ids = list(game_state.factions)
+    for index, faction_id in enumerate(faction_ids):
+        for other_id in faction_ids[index + 1:]:
+            game_state.set_diplomatic_status(faction_id, other_id, DiplomaticStatus.WAR, -100)
+    results: Dict[str, float] = {"battles": len(game_state.contested_city_ids)}
+    reference = None
+    for engine, workers in [("python", None)] + [("parallel", workers) for workers in worker_counts]:
+        game_state.combat_engine, game_state.battle_workers = engine, workers
+        game_state.begin()
+        start = time.perf_counter()
+        game_state._resolve_all_city_battles()
+        elapsed = time.perf_counter() - start
+        outcome = game_state.army_units.soldiers[:]
+        game_state.rollback()
+        if reference is None:
+            reference = outcome
+        elif outcome != reference:
+            raise RuntimeError(f"parallel battles with {workers} workers differ from the python engine")
+        results[f"{engine}_{workers}" if workers else engine] = elapsed
+    combat_parallel.shutdown()
+    return results
+
+
+def _build_comparison_battle(num_defenders: int, num_attackers: int) -> GameState:
+    battle_map = GameMap(map_id="engine_comparison")
+    battle_map.add_city(City(city_id="fortress", name="Fortress", region_id="test"))
+    game = GameState(game_map_obj=battle_map)
+    game.set_event_sink(NullEventSink())
+    game.add_faction(Faction(faction_id="defender", name="Defender", short_name="Def"))
+    game.add_faction(Faction(faction_id="attacker", name="Attacker", short_name="Att"))
+    game.set_diplomatic_status("defender", "attacker", DiplomaticStatus.WAR, -100)
+    game.assign_city_to_faction("fortress", "defender")
+    game.add_general(General(general_id="marshal", name="Marshal", faction_id="attacker", command=80, attack_skill=70, defense_skill=60))
+    unit_types = [UnitType.INFANTRY_CORPS, UnitType.CAVALRY_SQUADRON, UnitType.ARTILLERY_BATTERY, UnitType.MILITIA]
+    for side, count in (("defender", num_defenders), ("attacker", num_attackers)):
+        for index in range(count):
+            unit_type = unit_types[index % len(unit_types)]
+            unit_id = f"{side}_{index}"
+            game.add_army_unit(ArmyUnit(unit_id=unit_id, unit_type_id=unit_type.type_id, base_attack=unit_type.base_attack,
+                                        base_defense=unit_type.base_defense, owning_faction_id=side,
+                                        soldiers=unit_type.default_soldiers // 100,
+                                        leading_general_id="marshal" if side == "attacker" and index % 3 == 0 else None))
+            game.place_unit_in_city(unit_id, "fortress")
+    return game
+
+
+# (defenders, attackers): a held fortress, and one taken in roughly half the battles.
+COMPARISON_FORCES = ((12, 16), (1, 22))
+
+
+def compare_engines(trials: int = 500, num_defenders: int = 12, num_attackers: int = 16, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    # Runs the same battle under the python and numpy engines and summarises the outcome distributions side by side.
+    stats: Dict[str, Dict[str, float]] = {}
+    for engine in ("python", "numpy"):
+        random.seed(seed)
+        defender_totals = []
+        attacker_totals = []
+        captures = 0
+        destroyed_units = 0
+        for _ in range(trials):
+            game = _build_comparison_battle(num_defenders, num_attackers)
+            game.combat_engine = engine
+            game._resolve_all_city_battles()
+            defender_totals.append(sum(u.soldiers for u in game.army_units.values() if u.owning_faction_id == "defender"))
+            attacker_totals.append(sum(u.soldiers for u in game.army_units.values() if u.owning_faction_id == "attacker"))
+            captures += game.game_map.get_city("fortress").current_owner_faction_id == "attacker"
+            destroyed_units += num_defenders + num_attackers - len(game.army_units)
+        stats[engine] = {
+            "defender_mean": statistics.fmean(defender_totals),
+            "defender_std": statistics.pstdev(defender_totals),
+            "attacker_mean": statistics.fmean(attacker_totals),
+            "attacker_std": statistics.pstdev(attacker_totals),
+            "capture_rate": captures / trials,
+            "destroyed_units_mean": destroyed_units / trials,
+        }
+    return stats
+
+
+def bench_economy(city_counts: List[int] = (10**3, 10**4, 10**5), num_factions: int = 8, turns: int = 20,
+                  seed: int = 0) -> Dict[int, float]:
+    # Economy phase time per turn as the map grows; with the income ledger it should stay flat.
+    results: Dict[int, float] = {}
+    for num_cities in city_counts:
+        game_state = _large_game_state(0, num_cities, num_factions, random.Random(seed))
+        game_state.set_event_sink(NullEventSink())
+        start = time.perf_counter()
+        for _ in range(turns):
+            game_state._run_economy_phase()
+        results[num_cities] = (time.perf_counter() - start) / turns
+    return results
+
+
+def bench_replay(num_cities: int = 1000, num_factions: int = 8, num_units: int = 4000, turns: int = 1000,
+                 checkpoint_every: int = 10, seeks: int = 20, seed: int = 0) -> Dict[str, float]:
+    # Records a long game on a generated scenario, then times seeking to random turns and a full verify.
+    game_state = generate_scenario(num_cities, num_factions=num_factions, units_per_faction=num_units // num_factions, seed=seed)
+    log = ReplayLog(checkpoint_every=checkpoint_every)
+    log.start(game_state)
+    start = time.perf_counter()
+    for _ in range(turns):
+        game_state.next_turn()
+    results = {"record_ms_per_turn": (time.perf_counter() - start) / turns * 1000, "entries": len(log.entries)}
+    log.stop(game_state)
+    rng = random.Random(seed)
+    seek_times = []
+    for turn in rng.sample(range(log.start_turn, log.last_turn + 1), seeks):
+        start = time.perf_counter()
+        log.seek(turn)
+        seek_times.append(time.perf_counter() - start)
+    results["seek_mean_ms"] = sum(seek_times) / seeks * 1000
+    results["seek_max_ms"] = max(seek_times) * 1000
+    start = time.perf_counter()
+    results["verify_mismatches"] = len(log.verify())
+    results["verify_seconds"] = time.perf_counter() - start
+    return results
+
+
+def bench_suite(num_cities: int = 10000, avg_degree: float = 3.0, num_factions: int = 16, num_units: int = 10**5,
+                war_density: float = 0.3, turns: int = 3, moves: int = 2000, stack_size: int = 5000, recruits: int = 10000,
+                detail_calls: int = 20, seed: int = 0) -> Dict[str, Any]:
+    # The common game operations on a generated scenario (see scenario_generator.py). Everything that
+    # changes the game except next_turn runs in a transaction and is rolled back, so each measurement
+    # starts from the same state.
+    results: Dict[str, Any] = {"params": {"cities": num_cities, "avg_degree": avg_degree, "factions": num_factions, "units": num_units,
+                                          "war_density": war_density, "seed": seed}}
+    start = time.perf_counter()
+    game_state = generate_scenario(num_cities, avg_degree, num_factions, num_units // num_factions, war_density, seed=seed)
+    results["generate_seconds"] = time.perf_counter() - start
+    game_map = game_state.game_map
+    rng = random.Random(seed)
+    faction_ids = list(game_state.factions)
+    player_id = game_state.player_faction_id
+
+    # move_unit: player units to random adjacent cities.
+    player_units = list(game_state.factions[player_id].army_units_list_ids)
+    orders = [(unit_id, rng.choice(game_map.neighbors(game_state.army_units[unit_id].current_location_city_id)))
+              for unit_id in rng.sample(player_units, min(moves, len(player_units)))]
+    game_state.begin()
+    start = time.perf_counter()
+    for unit_id, target_city_id in orders:
+        game_state.move_unit(unit_id, target_city_id)
+    results["move_unit_us"] = (time.perf_counter() - start) / max(1, len(orders)) * 1e6
+    game_state.rollback()
+
+    # _resolve_battle_in_city: stack_size units of each side in one of the player's cities.
+    battle_city_id = game_state.factions[player_id].capital_city_id
+    enemy_id = faction_ids[1]
+    unit_type = UnitType.INFANTRY_CORPS
+    game_state.begin()
+    game_state.set_diplomatic_status(player_id, enemy_id, DiplomaticStatus.WAR, -100)
+    game_state.add_unit_rows([(f"stack_{faction_id}_{index}", unit_type.type_id, unit_type.base_attack, unit_type.base_defense, faction_id,
+                               unit_type.default_soldiers, unit_type.default_soldiers, 100, None, battle_city_id)
+                              for faction_id in (player_id, enemy_id) for index in range(stack_size)])
+    start = time.perf_counter()
+    game_state._resolve_battle_in_city(game_map.get_city(battle_city_id))
+    results["battle_ms"] = (time.perf_counter() - start) * 1000
+    results["battle_units"] = 2 * stack_size
+    game_state.rollback()
+
+    # recruit_unit one by one, then recruit_units in one call, in the player's capital.
+    capital_id = game_state.factions[player_id].capital_city_id
+    game_state.begin()
+    start = time.perf_counter()
+    for _ in range(recruits):
+        game_state.recruit_unit(unit_type.type_id, capital_id)
+    results["recruit_unit_us"] = (time.perf_counter() - start) / recruits * 1e6
+    game_state.rollback()
+    game_state.begin()
+    start = time.perf_counter()
+    game_state.recruit_units(unit_type.type_id, capital_id, recruits)
+    results["recruit_units_us_per_unit"] = (time.perf_counter() - start) / recruits * 1e6
+    game_state.rollback()
+
+    # Read-only reports.
+    largest_faction_id = max(faction_ids, key=lambda faction_id: len(game_state.factions[faction_id].controlled_cities_ids))
+    start = time.perf_counter()
+    for _ in range(detail_calls):
+        game_state.get_faction_details_str(largest_faction_id)
+    results["faction_details_ms"] = (time.perf_counter() - start) / detail_calls * 1000
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        game_state.display_summary()
+    results["display_summary_ms"] = (time.perf_counter() - start) * 1000
+    # A sorted view of every unit: built once, then later pages come from the view cache.
+    query = ViewQuery("units", sort="soldiers", descending=True)
+    start = time.perf_counter()
+    get_page(game_state, query, 1)
+    results["summary_page_cold_ms"] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for page in range(2, detail_calls + 2):
+        get_page(game_state, query, page)
+    results["summary_page_warm_ms"] = (time.perf_counter() - start) / detail_calls * 1000
+    # Every faction's stats in every region from the region index, against one recount from the cities and units.
+    region_ids = list(game_map.regions)
+    start = time.perf_counter()
+    for region_id in region_ids:
+        for faction_id in faction_ids:
+            game_state.get_region_stats(region_id, faction_id)
+    results["region_query_us"] = (time.perf_counter() - start) / max(1, len(region_ids) * len(faction_ids)) * 1e6
+    start = time.perf_counter()
+    game_state._computed_region_stats()
+    results["region_recount_ms"] = (time.perf_counter() - start) * 1000
+
+    # next_turn, with the turn profiler's phase breakdown.
+    profiler = game_state.enable_profiling(turns)
+    for _ in range(turns):
+        game_state.next_turn()
+    results["next_turn_ms"] = sum(profile["seconds"] for profile in profiler.history) / turns * 1000
+    phases: Dict[str, float] = {}
+    for profile in profiler.history:
+        for phase, seconds in profile["phases"].items():
+            phases[phase] = phases.get(phase, 0.0) + seconds * 1000 / turns
+    results["next_turn_phases_ms"] = phases
+    game_state.disable_profiling()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _numeric_leaves(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        leaves: Dict[str, float] = {}
+        for key, item in value.items():
+            leaves.update(_numeric_leaves(item, f"{prefix}.{key}" if prefix else str(key)))
+        return leaves
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    # One line per number found in both result files, with the ratio current / baseline.
+    old, new = _numeric_leaves(baseline.get("results", {})), _numeric_leaves(current.get("results", {}))
+    lines = [f"Comparing {baseline.get('commit') or '?'} -> {current.get('commit') or '?'}"]
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key] / old[key] if old[key] else float("inf") if new[key] else 1.0
+        lines.append(f"  {key:<50} {old[key]:>14.3f} {new[key]:>14.3f}  x{ratio:.2f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Napoleon performance benchmarks.")
+    parser.add_argument("--only", choices=["memory", "diplomacy", "map", "snapshot", "lookahead", "ai", "planning", "battles", "engines", "economy", "replay", "suite"], default=None)
+    parser.add_argument("--unit-counts", type=int, nargs="+", default=[10**4, 10**5, 10**6])
+    parser.add_argument("--factions", type=int, default=500)
+    parser.add_argument("--cities", type=int, default=100000)
+    parser.add_argument("--snapshot-units", type=int, default=10**6, help="units in the snapshot and lookahead benchmarks")
+    parser.add_argument("--ai-budget-ms", type=float, default=200.0, help="per-decision budget in the ai benchmark")
+    parser.add_argument("--suite-units", type=int, default=10**5, help="units in the generated scenario of the suite benchmark")
+    parser.add_argument("--suite-cities", type=int, default=10000)
+    parser.add_argument("--suite-factions", type=int, default=16)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON, e.g. to diff between commits")
+    parser.add_argument("--compare", metavar="PATH", help="a JSON file from an earlier run to compare the results with")
+    args = parser.parse_args()
+    results: Dict[str, Any] = {}
+    if args.only in (None, "memory"):
+        results["memory"] = measure_unit_memory(args.unit_counts)
+        for count, bytes_per_unit in results["memory"].items():
+            print(f"{count:>9} units: {bytes_per_unit:.1f} bytes/unit")
+    if args.only in (None, "diplomacy"):
+        results["diplomacy"] = bench_diplomacy(args.factions)
+        print(f"diplomacy: {results['diplomacy']}")
+    if args.only in (None, "map"):
+        results["map"] = bench_map_layouts(args.cities)
+        for layout, stats in results["map"].items():
+            print(f"map {layout}: " + ", ".join(f"{key}={value:.1f}" for key, value in stats.items()))
+    if args.only in (None, "snapshot"):
+        results["snapshot"] = bench_snapshots(args.snapshot_units)
+        for kind, stats in results["snapshot"].items():
+            print(f"snapshot {kind}: {stats['bytes'] / 1024:.0f} KiB, save {stats['seconds'] * 1000:.0f}ms, "
+                  f"load (base + deltas) {stats['load_seconds'] * 1000:.0f}ms")
+    if args.only in (None, "lookahead"):
+        stats = bench_lookahead(args.snapshot_units)
+        results["lookahead"] = dict(stats)
+        print(f"lookahead per turn: {stats.pop('journal_entries'):.0f} journal entries, "
+              + ", ".join(f"{key}={value * 1000:.1f}ms" for key, value in stats.items()))
+
+    if args.only in (None, "ai"):
+        results["ai"] = bench_ai(budget_ms=args.ai_budget_ms)
+        for workers, stats in results["ai"].items():
+            print(f"mcts {workers} process(es): {stats['playouts_per_decision']:.0f} playouts per decision in "
+                  f"{stats['decision_ms']:.0f}ms, {stats['playouts_per_second']:.0f} playouts/s")
+
+    if args.only in (None, "planning"):
+        results["planning"] = bench_ai_planning()
+        for workers, seconds in results["planning"].items():
+            print(f"ai planning, {workers or 'no'} worker(s): {seconds * 1000:.1f}ms per turn")
+
+    if args.only in (None, "battles"):
+        stats = bench_battles()
+        results["battles"] = dict(stats)
+        print(f"battles ({stats.pop('battles'):.0f} cities): " + ", ".join(f"{key}={value * 1000:.0f}ms" for key, value in stats.items()))
+
+    if args.only in (None, "engines") and combat_numpy.numpy_available():
+        results["engines"] = {}
+        for forces in COMPARISON_FORCES:
+            stats = results["engines"][f"{forces[0]}v{forces[1]}"] = compare_engines(500, *forces)
+            print(f"combat engines, {forces[0]} defenders against {forces[1]} attackers:")
+            for engine_name, engine_stats in stats.items():
+                print(f"{engine_name:>8}: " + ", ".join(f"{key}={value:.2f}" for key, value in engine_stats.items()))
+
+    if args.only in (None, "economy"):
+        results["economy"] = bench_economy()
+        for num_cities, seconds in results["economy"].items():
+            print(f"economy phase, {num_cities} cities: {seconds * 1e6:.1f}us per turn")
+
+    if args.only in (None, "replay"):
+        stats = results["replay"] = bench_replay()
+        print(f"replay ({stats['entries']} entries): record {stats['record_ms_per_turn']:.1f}ms per turn, "
+              f"seek mean {stats['seek_mean_ms']:.1f}ms, max {stats['seek_max_ms']:.1f}ms, "
+              f"verify {stats['verify_seconds']:.2f}s ({stats['verify_mismatches']} mismatches)")
+
+    if args.only in (None, "suite"):
+        stats = results["suite"] = bench_suite(args.suite_cities, num_factions=args.suite_factions, num_units=args.suite_units)
+        print(f"suite ({args.suite_units} units, {args.suite_cities} cities): generate {stats['generate_seconds']:.2f}s, "
+              f"next_turn {stats['next_turn_ms']:.1f}ms, move_unit {stats['move_unit_us']:.1f}us, "
+              f"battle of {stats['battle_units']} units {stats['battle_ms']:.0f}ms, recruit_unit {stats['recruit_unit_us']:.1f}us "
+              f"(bulk {stats['recruit_units_us_per_unit']:.1f}us per unit), "
+              f"faction details {stats['faction_details_ms']:.2f}ms, display_summary {stats['display_summary_ms']:.0f}ms, "
+              f"summary page {stats['summary_page_cold_ms']:.1f}ms cold / {stats['summary_page_warm_ms']:.3f}ms cached, "
+              f"region query {stats['region_query_us']:.2f}us (recount {stats['region_recount_ms']:.0f}ms)")
+        print("  next_turn phases: " + ", ".join(f"{phase}={ms:.1f}ms" for phase, ms in stats["next_turn_phases_ms"].items()))
+
+    # Integer keys (unit counts, worker counts) become strings in JSON.
+    report = {"commit": _git_commit(), "python": platform.python_version(), "machine": platform.machine(),
+              "cpus": os.cpu_count(), "only": args.only, "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(report, json_file, indent=2, sort_keys=True)
+        print(f"Wrote {args.json}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as json_file:
+            baseline = json.load(json_file)
+        for line in compare_results(baseline, json.loads(json.dumps(report))):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
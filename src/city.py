@@ -1,5 +1,6 @@
-'''
 from typing import Optional
+from game_enums import TerrainType
+from id_index import OrderedIdSet
 # from faction import Faction # Avoid circular dependency for now
 
 class City:
@@ -11,8 +12,8 @@ class City:
         self.population = 50000 # Example
         self.economy = 100 # Example
         self.industry = 50 # Example
-        self.garrisoned_units = []
+        self.garrisoned_units = OrderedIdSet()
+        self.terrain_type = TerrainType.PLAINS # Terrain around the city; sets the cost of marching into it
 
     def __str__(self):
         return f"City: {self.name} (ID: {self.city_id}), Region: {self.region_id}, Owner: {self.current_owner_faction_id or 'Unowned'}"
-'''
\ No newline at end of file
@@ -0,0 +1,180 @@
+import random
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the vectorized combat engine
+    np = None
+
+from game_events import EventType
+
+# The module constants are read from game_state at call time to keep a single source of truth.
+import game_state as game_state_module
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _gather_units(game_state, units, is_defending_flags):
+    # Struct-of-arrays view of every unit taking part in this combat phase, read straight from the unit table columns.
+    table = game_state.army_units
+    rows = np.fromiter((unit._row for unit in units), dtype=np.int64, count=len(units))
+    base_attack = np.frombuffer(table.base_attack, dtype=np.int16)[rows].astype(np.float64)
+    base_defense = np.frombuffer(table.base_defense, dtype=np.int16)[rows].astype(np.float64)
+    soldiers = np.frombuffer(table.soldiers, dtype=np.int32)[rows].astype(np.int64)
+    general_codes = np.frombuffer(table.general_codes, dtype=np.int32)[rows]
+
+    # Skills per interned general code; code -1 (no general) maps to the extra last slot.
+    known_generals = [game_state.generals.get(general_id) for general_id in table.generals.values]
+    attack_skill = np.array([g.attack_skill if g else 0 for g in known_generals] + [0], dtype=np.float64)[general_codes]
+    defense_skill = np.array([g.defense_skill if g else 0 for g in known_generals] + [0], dtype=np.float64)[general_codes]
+    command = np.array([g.command if g else 0 for g in known_generals] + [0], dtype=np.float64)[general_codes]
+    has_general = np.array([g is not None for g in known_generals] + [False], dtype=bool)[general_codes]
+
+    eff_attack = base_attack + np.where(has_general, attack_skill / game_state_module.GENERAL_ATTACK_BONUS_DIVISOR, 0.0)
+    eff_defense = base_defense + np.where(has_general, defense_skill / game_state_module.GENERAL_DEFENSE_BONUS_DIVISOR, 0.0)
+    eff_defense = np.where(is_defending_flags, eff_defense * game_state_module.CITY_DEFENSE_BONUS_MULTIPLIER, eff_defense)
+    soldier_multiplier = np.where(has_general, 1 + command / game_state_module.GENERAL_COMMAND_EFFICIENCY_DIVISOR, 1.0)
+    return rows, np.maximum(1.0, eff_attack), np.maximum(1.0, eff_defense), soldier_multiplier, soldiers
+
+
+def _run_attack_phase(rng, attacker_indexes, target_indexes, eff_attack, eff_defense, soldier_multiplier, soldiers, on_attack=None):
+    # Resolves "each attacker hits a uniformly chosen surviving target" in waves. A wave draws targets and
+    # rolls for every pending attacker at once, then accepts attacks up to and including the first one that
+    # destroys its target. Draws after that point are discarded and redrawn against the reduced target list,
+    # so every accepted attack sees exactly the target pool the sequential engine would have seen.
+    # The wave size adapts to the observed distance between kills to keep discarded draws cheap.
+    # Returns (indexes of destroyed targets in order, number of attacks made).
+    eff_soldiers = np.maximum(1.0, soldiers[attacker_indexes] * soldier_multiplier[attacker_indexes])
+    lethality = game_state_module.COMBAT_LATHALITY_FACTOR
+    pending = 0
+    destroyed = []
+    targets = target_indexes
+    wave_size = 64
+    while pending < attacker_indexes.size and targets.size:
+        wave_attackers = attacker_indexes[pending:pending + wave_size]
+        wave_eff_soldiers = eff_soldiers[pending:pending + wave_size]
+        wave_targets = targets[rng.integers(0, targets.size, size=wave_attackers.size)]
+        rolls = rng.uniform(0.8, 1.2, size=wave_attackers.size)
+        att_eff = eff_attack[wave_attackers]
+        def_eff = eff_defense[wave_targets]
+        potential = wave_eff_soldiers * (att_eff / (att_eff + def_eff)) * lethality
+        casualties = np.maximum(1, np.ceil(potential * rolls).astype(np.int64))
+
+        # Damage each target has taken from earlier attacks in this wave (exclusive running sum per target).
+        order = np.argsort(wave_targets, kind="stable")
+        sorted_targets = wave_targets[order]
+        sorted_casualties = casualties[order]
+        running = np.cumsum(sorted_casualties)
+        group_starts = np.flatnonzero(np.r_[True, sorted_targets[1:] != sorted_targets[:-1]])
+        group_offsets = np.repeat(running[group_starts] - sorted_casualties[group_starts], np.diff(np.r_[group_starts, sorted_targets.size]))
+        prior_damage = np.empty_like(casualties)
+        prior_damage[order] = running - sorted_casualties - group_offsets
+
+        remaining_before = soldiers[wave_targets] - prior_damage
+        kills = np.flatnonzero(casualties >= remaining_before)
+        accepted = int(kills[0]) + 1 if kills.size else wave_attackers.size
+        applied = np.minimum(casualties[:accepted], remaining_before[:accepted])
+        if on_attack is not None:
+            for i in range(accepted):
+                on_attack(int(wave_attackers[i]), int(wave_targets[i]), float(att_eff[i]), float(wave_eff_soldiers[i]),
+                          float(def_eff[i]), int(remaining_before[i]), int(applied[i]))
+        np.subtract.at(soldiers, wave_targets[:accepted], applied)
+        if kills.size:
+            killed = int(wave_targets[accepted - 1])
+            destroyed.append(killed)
+            targets = targets[targets != killed]
+            wave_size = max(16, 2 * accepted)
+        else:
+            wave_size *= 2
+        pending += accepted
+    return destroyed, pending
+
+
+def resolve_battles(game_state, city_ids: List[str]):
+    if np is None:
+        raise RuntimeError("The numpy combat engine requires numpy to be installed.")
+    sink = game_state.event_sink
+    log_events = sink.enabled
+    turn = game_state.current_turn
+
+    battles = []
+    units = []
+    defending_flags = []
+    for city_id in city_ids:
+        city_obj = game_state.game_map.get_city(city_id)
+        if not city_obj:
+            continue
+        battle = game_state._prepare_battle(city_obj, announce=False)
+        if battle is None:
+            continue
+        units_by_faction, defender_faction_id, attacker_faction_ids = battle
+        defender_units = [u for u in units_by_faction.get(defender_faction_id, []) if u.soldiers > 0]
+        attacker_units = [u for fid in attacker_faction_ids for u in units_by_faction.get(fid, []) if u.soldiers > 0]
+        first = len(units)
+        units.extend(defender_units)
+        units.extend(attacker_units)
+        defending_flags.extend([True] * len(defender_units))
+        defending_flags.extend([False] * len(attacker_units))
+        defender_indexes = np.arange(first, first + len(defender_units))
+        attacker_indexes = np.arange(first + len(defender_units), len(units))
+        battles.append((city_obj, units_by_faction, defender_faction_id, attacker_faction_ids, defender_indexes, attacker_indexes))
+    if not battles:
+        return
+
+    is_defending = np.array(defending_flags, dtype=bool)
+    rows, eff_attack, eff_defense, soldier_multiplier, soldiers = _gather_units(game_state, units, is_defending)
+
+    for city_obj, units_by_faction, defender_faction_id, attacker_faction_ids, defender_indexes, attacker_indexes in battles:
+        city_id = city_obj.city_id
+        rng = np.random.default_rng(game_state.substream_seed("battle", city_id))
+        on_attack = None
+        if log_events:
+            sink.emit((EventType.BATTLE_STARTED, turn, city_id, defender_faction_id, tuple(attacker_faction_ids)))
+            def on_attack(attacker, target, att_eff, eff_soldiers, def_eff, target_soldiers, casualties):
+                sink.emit((EventType.ATTACK, turn, city_id, bool(is_defending[attacker]), units[attacker].unit_id, int(soldiers[attacker]),
+                           att_eff, eff_soldiers, units[target].unit_id, target_soldiers, def_eff))
+                sink.emit((EventType.CASUALTIES, turn, city_id, units[target].unit_id, casualties, target_soldiers - casualties))
+                if casualties == target_soldiers:
+                    sink.emit((EventType.UNIT_DESTROYED, turn, city_id, units[target].unit_id))
+
+        destroyed: List[int] = []
+        attacks = 0
+        if defender_indexes.size and attacker_indexes.size:
+            if log_events:
+                sink.emit((EventType.ATTACK_PHASE, turn, city_id, True, (defender_faction_id,)))
+            phase_destroyed, phase_attacks = _run_attack_phase(rng, defender_indexes, attacker_indexes, eff_attack, eff_defense,
+                                                               soldier_multiplier, soldiers, on_attack)
+            destroyed += phase_destroyed
+            attacks += phase_attacks
+        surviving_attackers = attacker_indexes[soldiers[attacker_indexes] > 0]
+        if surviving_attackers.size and defender_indexes.size:
+            if log_events:
+                sink.emit((EventType.ATTACK_PHASE, turn, city_id, False, tuple(attacker_faction_ids)))
+            phase_destroyed, phase_attacks = _run_attack_phase(rng, surviving_attackers, defender_indexes, eff_attack, eff_defense,
+                                                               soldier_multiplier, soldiers, on_attack)
+            destroyed += phase_destroyed
+            attacks += phase_attacks
+        if game_state.profiler is not None:
+            game_state._count_battle(attacks, len(destroyed))
+
+        battle_indexes = np.concatenate((defender_indexes, attacker_indexes))
+        table = game_state.army_units
+        if table.write_barrier:
+            table.before_write_rows("soldiers", rows[battle_indexes].tolist())
+        soldier_column = np.frombuffer(table.soldiers, dtype=np.int32)
+        losses = {}
+        for index, lost in zip(battle_indexes.tolist(), (soldier_column[rows[battle_indexes]] - soldiers[battle_indexes]).tolist()):
+            if lost:
+                faction_id = units[index].owning_faction_id
+                losses[faction_id] = losses.get(faction_id, 0) + lost
+        soldier_column[rows[battle_indexes]] = soldiers[battle_indexes]
+        dirty_column = np.frombuffer(table.dirty, dtype=np.uint8)
+        dirty_column[rows[battle_indexes]] = 1
+        del soldier_column, dirty_column  # release the buffer exports so the table can grow again
+        table.version += 1
+        game_state._track_soldier_losses(city_obj.region_id, losses)
+        for index in destroyed:
+            game_state._remove_unit(units[index].unit_id)
+        game_state._settle_battle(city_obj, units_by_faction, defender_faction_id, attacker_faction_ids)
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from game_events import RecordingEventSink
+
+# The module constants are read from game_state at call time to keep a single source of truth.
+import game_state as game_state_module
+
+# Parallel combat engine: the python engine's battles fought in worker processes. Battles in different
+# cities never share units, and each draws from its own (turn, city) random stream, so they can be
+# fought in any order or place. Every battle is prepared here, its plain-data inputs are fought by
+# game_state.simulate_battle in the workers, and the results (and events) are applied back in contested
+# city order. The outcome is identical to the python engine for any number of workers.
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def _simulate_chunk(battle_args: List[tuple]) -> List[tuple]:
+    return [game_state_module.simulate_battle(*args) for args in battle_args]
+
+
+def resolve_battles(game_state, city_ids: List[str], workers: Optional[int] = None):
+    workers = workers or os.cpu_count() or 1
+    sink = game_state.event_sink
+    specs = []
+    for city_id in city_ids:
+        city_obj = game_state.game_map.get_city(city_id)
+        if not city_obj:
+            continue
+        if sink.enabled:
+            # Keep events of skipped battles in city order with the fought ones.
+            recorder = RecordingEventSink()
+            game_state.event_sink = recorder
+            try:
+                spec = game_state._battle_spec(city_obj)
+            finally:
+                game_state.event_sink = sink
+            specs.append((spec, list(recorder.events)))
+        else:
+            specs.append((game_state._battle_spec(city_obj), []))
+    battle_args = [spec[-1] for spec, _ in specs if spec is not None]
+    if workers <= 1 or len(battle_args) < 2:
+        results = _simulate_chunk(battle_args)
+    else:
+        # Round-robin chunks, one per worker; results are put back in input order.
+        chunks = [battle_args[worker::workers] for worker in range(min(workers, len(battle_args)))]
+        chunk_results = list(_get_executor(workers).map(_simulate_chunk, chunks))
+        results = [None] * len(battle_args)
+        for worker, chunk_result in enumerate(chunk_results):
+            results[worker::workers] = chunk_result
+    results_iter = iter(results)
+    for spec, prepare_events in specs:
+        for event in prepare_events:
+            sink.emit(event)
+        if spec is not None:
+            game_state._apply_battle(spec, next(results_iter))
@@ -0,0 +1,221 @@
+import argparse
+import json
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+from game_events import NullEventSink, PrintEventSink
+from game_state import GameState
+from scenario import load_scenario, scenario_path
+from snapshot import save_snapshot
+
+# Runs game_loop commands from a script instead of input(): one command per line, blank lines and
+# "#" comments ignored. Each line is parsed into a typed order by a dispatch table on its first word
+# and executed against the GameState without the interactive output (next turn does not print the
+# summary). Every command yields one result dict:
+#   {"line": 3, "command": "move unit fra_guard to vienna", "order": "move", "ok": true, "message": "..."}
+# Runs of identical recruit orders are executed as a single recruit_units call, and each of those
+# commands reports that call's message.
+#
+# Script commands (the "as <faction_id>" prefix acts for another faction instead of the player):
+#   [as <faction_id>] move unit <unit_id> to <city_id>
+#   [as <faction_id>] recruit unit <type> in <city_id> [with <general_id>]
+#   [as <faction_id>] recruit units <count> <type> in <city_id> [with <general_id>]
+#   [as <faction_id>] declare war <target_faction_id>
+#   develop city <city_id> <building_type>
+#   next turn [count]
+
+
+class MoveOrder(NamedTuple):
+    unit_id: str
+    city_id: str
+    faction_id: Optional[str]
+
+
+class RecruitOrder(NamedTuple):
+    unit_type: str
+    city_id: str
+    count: int
+    general_id: Optional[str]
+    faction_id: Optional[str]
+
+
+class DevelopOrder(NamedTuple):
+    city_id: str
+    building_type: str
+
+
+class DeclareWarOrder(NamedTuple):
+    target_faction_id: str
+    faction_id: Optional[str]
+
+
+class NextTurnOrder(NamedTuple):
+    count: int
+
+
+Order = Union[MoveOrder, RecruitOrder, DevelopOrder, DeclareWarOrder, NextTurnOrder]
+ORDER_NAMES = {MoveOrder: "move", RecruitOrder: "recruit", DevelopOrder: "develop", DeclareWarOrder: "declare", NextTurnOrder: "next"}
+
+
+def _parse_move(parts: List[str], faction_id: Optional[str]) -> Union[Order, str]:
+    if len(parts) == 5 and parts[1] == "unit" and parts[3] == "to":
+        return MoveOrder(parts[2], parts[4], faction_id)
+    return "Error: Invalid move command. Format: move unit <unit_id> to <target_city_id>"
+
+
+def _parse_recruit(parts: List[str], faction_id: Optional[str]) -> Union[Order, str]:
+    if parts[1:2] == ["unit"] and len(parts) in (5, 7) and parts[3] == "in" and (len(parts) == 5 or parts[5] == "with"):
+        return RecruitOrder(parts[2], parts[4], 1, parts[6] if len(parts) == 7 else None, faction_id)
+    if (parts[1:2] == ["units"] and len(parts) in (6, 8) and parts[2].isdigit() and parts[4] == "in"
+            and (len(parts) == 6 or parts[6] == "with")):
+        return RecruitOrder(parts[3], parts[5], int(parts[2]), parts[7] if len(parts) == 8 else None, faction_id)
+    return ("Error: Invalid recruit command. Format: recruit unit <type> in <city_id> [with <general_id>] "
+            "or recruit units <count> <type> in <city_id> [with <general_id>]")
+
+
+def _parse_develop(parts: List[str], faction_id: Optional[str]) -> Union[Order, str]:
+    if faction_id is not None:
+        return "Error: develop cannot be given on behalf of another faction."
+    if len(parts) == 4 and parts[1] == "city":
+        return DevelopOrder(parts[2], parts[3])
+    return "Error: Invalid develop command. Format: develop city <city_id> <building_type>"
+
+
+def _parse_declare(parts: List[str], faction_id: Optional[str]) -> Union[Order, str]:
+    if len(parts) == 3 and parts[1] == "war":
+        return DeclareWarOrder(parts[2], faction_id)
+    return "Error: Invalid declare command. Format: declare war <target_faction_id>"
+
+
+def _parse_next(parts: List[str], faction_id: Optional[str]) -> Union[Order, str]:
+    if faction_id is not None:
+        return "Error: next turn cannot be given on behalf of a faction."
+    if parts[1:2] == ["turn"] and (len(parts) == 2 or (len(parts) == 3 and parts[2].isdigit() and int(parts[2]) > 0)):
+        return NextTurnOrder(int(parts[2]) if len(parts) == 3 else 1)
+    return "Error: Invalid next command. Format: next turn [count]"
+
+
+PARSERS: Dict[str, Callable[[List[str], Optional[str]], Union[Order, str]]] = {
+    "move": _parse_move,
+    "recruit": _parse_recruit,
+    "develop": _parse_develop,
+    "declare": _parse_declare,
+    "next": _parse_next,
+}
+
+
+def parse_command(text: str) -> Union[Order, str]:
+    # The order for one command line, or an "Error: ..." message.
+    parts = text.lower().split()
+    faction_id = None
+    if len(parts) >= 3 and parts[0] == "as":
+        faction_id, parts = parts[1], parts[2:]
+    parser = PARSERS.get(parts[0]) if parts else None
+    if parser is None:
+        return f"Error: Unknown command '{text}'. Supported: {', '.join(PARSERS)}"
+    return parser(parts, faction_id)
+
+
+def _next_turns(game_state: GameState, order: NextTurnOrder) -> str:
+    for _ in range(order.count):
+        game_state.next_turn()
+    return f"Advanced to turn {game_state.current_turn}."
+
+
+def _declare_war(game_state: GameState, order: DeclareWarOrder) -> str:
+    faction_id = order.faction_id or game_state.player_faction_id
+    return game_state.declare_war_on_faction(faction_id, order.target_faction_id)
+
+
+EXECUTORS: Dict[type, Callable[[GameState, Any], str]] = {
+    MoveOrder: lambda game_state, order: game_state.march_unit(order.unit_id, order.city_id, order.faction_id),
+    RecruitOrder: lambda game_state, order: game_state.recruit_units(order.unit_type, order.city_id, order.count, order.general_id, order.faction_id),
+    DevelopOrder: lambda game_state, order: game_state.develop_building_in_city(order.city_id, order.building_type),
+    DeclareWarOrder: _declare_war,
+    NextTurnOrder: _next_turns,
+}
+
+
+def parse_script(lines: Iterable[str]) -> Iterator[Tuple[int, str, Union[Order, str]]]:
+    # (line number, command text, order or error message) for every command line.
+    for line_number, line in enumerate(lines, start=1):
+        text = line.strip()
+        if text and not text.startswith("#"):
+            yield line_number, text, parse_command(text)
+
+
+def _result(line_number: int, text: str, order: Union[Order, str], message: str) -> Dict[str, Any]:
+    return {"line": line_number, "command": text, "order": ORDER_NAMES.get(type(order)),
+            "ok": not message.startswith("Error"), "message": message}
+
+
+def run_commands(game_state: GameState, lines: Iterable[str], stop_on_error: bool = False) -> List[Dict[str, Any]]:
+    # Executes every command in order and returns one result per command. With stop_on_error the run
+    # ends after the first command that fails to parse or execute.
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, str, RecruitOrder]] = []  # a run of identical recruit orders, executed together
+
+    def flush_recruits() -> bool:
+        if not pending:
+            return True
+        first = pending[0][2]
+        message = game_state.recruit_units(first.unit_type, first.city_id, sum(order.count for _, _, order in pending),
+                                           first.general_id, first.faction_id)
+        results.extend(_result(line_number, text, order, message) for line_number, text, order in pending)
+        pending.clear()
+        return not message.startswith("Error")
+
+    for line_number, text, order in parse_script(lines):
+        if isinstance(order, RecruitOrder) and (not pending or pending[0][2]._replace(count=0) == order._replace(count=0)):
+            pending.append((line_number, text, order))
+            continue
+        if not flush_recruits() and stop_on_error:
+            return results
+        if isinstance(order, RecruitOrder):
+            pending.append((line_number, text, order))
+            continue
+        message = order if isinstance(order, str) else EXECUTORS[type(order)](game_state, order)
+        results.append(_result(line_number, text, order, message))
+        if stop_on_error and not results[-1]["ok"]:
+            return results
+    flush_recruits()
+    return results
+
+
+def write_results(results: List[Dict[str, Any]], out: TextIO):
+    for result in results:
+        out.write(json.dumps(result) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script of game commands and print one JSON result per command.")
+    parser.add_argument("script", help="command file, or - for standard input")
+    parser.add_argument("--scenario", default="europe_1805", help="scenario name or path to a .jsonl scenario file")
+    parser.add_argument("--seed", type=int, default=None, help="game seed (default: random)")
+    parser.add_argument("--output", help="write the JSON lines here instead of standard output")
+    parser.add_argument("--events", action="store_true", help="print game events while running")
+    parser.add_argument("--stop-on-error", action="store_true")
+    parser.add_argument("--save-snapshot", metavar="PATH", help="save the final game state as a snapshot")
+    args = parser.parse_args()
+    game_state, _ = load_scenario(args.scenario if args.scenario.endswith(".jsonl") else scenario_path(args.scenario))
+    if args.seed is not None:
+        game_state.seed = args.seed
+    game_state.set_event_sink(PrintEventSink() if args.events else NullEventSink())
+    if args.script == "-":
+        results = run_commands(game_state, sys.stdin, args.stop_on_error)
+    else:
+        with open(args.script, "r", encoding="utf-8") as script_file:
+            results = run_commands(game_state, script_file, args.stop_on_error)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            write_results(results, out)
+    else:
+        write_results(results, sys.stdout)
+    if args.save_snapshot:
+        save_snapshot(game_state, args.save_snapshot)
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"{len(results)} commands, {failed} failed; now turn {game_state.current_turn}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from game_enums import DiplomaticStatus
+
+# Status codes stored in the matrix. Code 0 is the default for every pair: PEACE with relation 0.
+STATUS_BY_CODE: List[DiplomaticStatus] = [DiplomaticStatus.PEACE] + [status for status in DiplomaticStatus if status != DiplomaticStatus.PEACE]
+CODE_BY_STATUS: Dict[DiplomaticStatus, int] = {status: code for code, status in enumerate(STATUS_BY_CODE)}
+WAR_CODE = CODE_BY_STATUS[DiplomaticStatus.WAR]
+
+
+class DiplomacyMatrix:
+    # Symmetric N x N status and relation matrices, indexed by dense faction indexes, plus one
+    # "at war with" bitset per faction so war checks are a single shift-and-mask.
+    def __init__(self, initial_capacity: int = 8):
+        self.index_of: Dict[str, int] = {}
+        self.faction_ids: List[str] = []
+        self._capacity = initial_capacity
+        self._status = bytearray(initial_capacity * initial_capacity)
+        self._relation = array("i", bytes(4 * initial_capacity * initial_capacity))
+        self.war_bits: List[int] = []
+        self._treaties: Dict[Tuple[int, int], List[str]] = {}
+        self.dirty = False  # set on any change; cleared by snapshot.py
+        self._shared = False  # containers still shared with a copy(); see _unshare
+
+    def __len__(self) -> int:
+        return len(self.faction_ids)
+
+    def _unshare(self):
+        # copy() shares every container between the two matrices; each copies them before its first change.
+        if self._shared:
+            self.index_of = self.index_of.copy()
+            self.faction_ids = self.faction_ids[:]
+            self._status = self._status[:]
+            self._relation = self._relation[:]
+            self.war_bits = self.war_bits[:]
+            self._treaties = self._treaties.copy()
+            self._shared = False
+
+    def _grow(self, min_capacity: int):
+        old_capacity = self._capacity
+        new_capacity = max(min_capacity, old_capacity * 2)
+        new_status = bytearray(new_capacity * new_capacity)
+        new_relation = array("i", bytes(4 * new_capacity * new_capacity))
+        count = len(self.faction_ids)
+        for row in range(count):
+            old_start = row * old_capacity
+            new_start = row * new_capacity
+            new_status[new_start:new_start + count] = self._status[old_start:old_start + count]
+            new_relation[new_start:new_start + count] = self._relation[old_start:old_start + count]
+        self._capacity = new_capacity
+        self._status = new_status
+        self._relation = new_relation
+
+    def reserve(self, faction_count: int):
+        if faction_count > self._capacity:
+            self._grow(faction_count)
+
+    def register(self, faction_id: str) -> int:
+        index = self.index_of.get(faction_id)
+        if index is not None:
+            return index
+        self._unshare()
+        index = len(self.faction_ids)
+        if index >= self._capacity:
+            self._grow(index + 1)
+        self.index_of[faction_id] = index
+        self.faction_ids.append(faction_id)
+        self.war_bits.append(0)
+        self.dirty = True
+        return index
+
+    def set_status(self, faction1_id: str, faction2_id: str, status: DiplomaticStatus, relation_value: int = 0):
+        self._unshare()
+        i = self.index_of[faction1_id]
+        j = self.index_of[faction2_id]
+        code = CODE_BY_STATUS[status]
+        capacity = self._capacity
+        self._status[i * capacity + j] = code
+        self._status[j * capacity + i] = code
+        self._relation[i * capacity + j] = relation_value
+        self._relation[j * capacity + i] = relation_value
+        if code == WAR_CODE:
+            self.war_bits[i] |= 1 << j
+            self.war_bits[j] |= 1 << i
+        else:
+            self.war_bits[i] &= ~(1 << j)
+            self.war_bits[j] &= ~(1 << i)
+        self._treaties.pop((min(i, j), max(i, j)), None)
+        self.dirty = True
+
+    def pair_state(self, faction1_id: str, faction2_id: str) -> Tuple[DiplomaticStatus, int, List[str]]:
+        i = self.index_of[faction1_id]
+        j = self.index_of[faction2_id]
+        return (STATUS_BY_CODE[self._status[i * self._capacity + j]], self._relation[i * self._capacity + j],
+                list(self._treaties.get((min(i, j), max(i, j)), ())))
+
+    def restore_pair(self, faction1_id: str, faction2_id: str, status: DiplomaticStatus, relation_value: int, treaties: List[str]):
+        # Inverse of set_status, given what pair_state returned before it (used by transaction rollback).
+        self.set_status(faction1_id, faction2_id, status, relation_value)
+        if treaties:
+            i = self.index_of[faction1_id]
+            j = self.index_of[faction2_id]
+            self._treaties[(min(i, j), max(i, j))] = treaties
+
+    def copy(self) -> "DiplomacyMatrix":
+        # O(1): the copy shares this matrix's containers until either side changes something.
+        clone = DiplomacyMatrix.__new__(DiplomacyMatrix)
+        clone.__dict__.update(self.__dict__)
+        clone._shared = self._shared = True
+        return clone
+
+    def export_state(self) -> Dict[str, Any]:
+        count = len(self.faction_ids)
+        capacity = self._capacity
+        status = bytearray()
+        relation = array("i")
+        for row in range(count):
+            status += self._status[row * capacity:row * capacity + count]
+            relation.extend(self._relation[row * capacity:row * capacity + count])
+        return {"faction_ids": list(self.faction_ids), "status": bytes(status), "relation": relation.tobytes(),
+                "treaties": {(self.faction_ids[i], self.faction_ids[j]): list(treaties) for (i, j), treaties in self._treaties.items() if treaties}}
+
+    def restore_state(self, state: Dict[str, Any]):
+        # Replaces the matrix contents in place, so FactionRelationsView objects bound to it stay valid.
+        faction_ids = state["faction_ids"]
+        count = len(faction_ids)
+        self.index_of = {faction_id: index for index, faction_id in enumerate(faction_ids)}
+        self.faction_ids = list(faction_ids)
+        self._capacity = max(8, count)
+        self._status = bytearray(self._capacity * self._capacity)
+        self._relation = array("i", bytes(4 * self._capacity * self._capacity))
+        relation = array("i")
+        relation.frombytes(state["relation"])
+        for row in range(count):
+            start = row * self._capacity
+            self._status[start:start + count] = state["status"][row * count:(row + 1) * count]
+            self._relation[start:start + count] = relation[row * count:(row + 1) * count]
+        self.war_bits = [0] * count
+        for i in range(count):
+            for j in range(count):
+                if self._status[i * self._capacity + j] == WAR_CODE:
+                    self.war_bits[i] |= 1 << j
+        self._treaties = {(min(self.index_of[a], self.index_of[b]), max(self.index_of[a], self.index_of[b])): list(treaties)
+                          for (a, b), treaties in state["treaties"].items()}
+        self.dirty = False
+        self._shared = False
+
+    def status(self, faction1_id: str, faction2_id: str) -> Optional[DiplomaticStatus]:
+        i = self.index_of.get(faction1_id)
+        j = self.index_of.get(faction2_id)
+        if i is None or j is None or i == j:
+            return None
+        return STATUS_BY_CODE[self._status[i * self._capacity + j]]
+
+    def relation_value(self, faction1_id: str, faction2_id: str) -> int:
+        i = self.index_of[faction1_id]
+        j = self.index_of[faction2_id]
+        return self._relation[i * self._capacity + j]
+
+    def treaties(self, faction1_id: str, faction2_id: str) -> List[str]:
+        i = self.index_of[faction1_id]
+        j = self.index_of[faction2_id]
+        return list(self._treaties.get((min(i, j), max(i, j)), ()))
+
+    def is_at_war(self, faction1_id: str, faction2_id: str) -> bool:
+        i = self.index_of.get(faction1_id)
+        j = self.index_of.get(faction2_id)
+        if i is None or j is None:
+            return False
+        return (self.war_bits[i] >> j) & 1 == 1
+
+    def enemies_of(self, faction_id: str) -> List[str]:
+        index = self.index_of.get(faction_id)
+        if index is None:
+            return []
+        bits = self.war_bits[index]
+        enemies = []
+        while bits:
+            low_bit = bits & -bits
+            enemies.append(self.faction_ids[low_bit.bit_length() - 1])
+            bits ^= low_bit
+        return enemies
+
+
+class FactionRelationsView:
+    # Read-only view shaped like the old Faction.diplomatic_relations dict:
+    # {target_faction_id: {"status": DiplomaticStatus, "relation_value": int, "treaties": List[str]}}.
+    # The dicts it returns are copies. Relations change only through GameState.set_diplomatic_status,
+    # which also journals the change and refreshes which cities are contested.
+    __slots__ = ("_matrix", "_faction_id")
+
+    def __init__(self, matrix: DiplomacyMatrix, faction_id: str):
+        self._matrix = matrix
+        self._faction_id = faction_id
+
+    def __getitem__(self, target_faction_id: str) -> Dict[str, Any]:
+        status = self._matrix.status(self._faction_id, target_faction_id)
+        if status is None:
+            raise KeyError(target_faction_id)
+        return {"status": status,
+                "relation_value": self._matrix.relation_value(self._faction_id, target_faction_id),
+                "treaties": self._matrix.treaties(self._faction_id, target_faction_id)}
+
+    def __setitem__(self, target_faction_id: str, relation: Dict[str, Any]):
+        raise TypeError("Faction relations are read-only; use GameState.set_diplomatic_status.")
+
+    def get(self, target_faction_id: str, default=None):
+        try:
+            return self[target_faction_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, target_faction_id) -> bool:
+        return target_faction_id != self._faction_id and target_faction_id in self._matrix.index_of
+
+    def __iter__(self) -> Iterator[str]:
+        return (faction_id for faction_id in self._matrix.faction_ids if faction_id != self._faction_id)
+
+    def __len__(self) -> int:
+        return max(0, len(self._matrix) - 1)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(faction_id, self[faction_id]) for faction_id in self]
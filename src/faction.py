@@ -1,5 +1,6 @@
 
 from typing import Optional, Dict, List, Any
+from id_index import OrderedIdSet
 
 class Faction:
     def __init__(self, faction_id: str, name: str, short_name: str, leader_id: str = None, capital_city_id: str = None):
@@ -8,12 +9,13 @@ class Faction:
         self.short_name = short_name
         self.leader_general_id = leader_id
         self.capital_city_id = capital_city_id
-        self.controlled_cities_ids: List[str] = []
-        self.generals_list_ids: List[str] = []
-        self.army_units_list_ids: List[str] = []
+        self.controlled_cities_ids = OrderedIdSet()
+        self.generals_list_ids = OrderedIdSet()
+        self.army_units_list_ids = OrderedIdSet()
         self.treasury = 1000  # Example starting value
         self.food_reserves = 500 # Example starting value
         self.manpower_pool = 10000 # Example starting value
+        self.next_unit_number = 1  # recruited units are named f"{faction_id}_unit_{n}"; numbers are never reused
         # diplomatic_relations: Dict[target_faction_id, Dict["status": DiplomaticStatus, "relation_value": int, "treaties": List[str]]]
         self.diplomatic_relations: Dict[str, Dict[str, Any]] = {} 
 
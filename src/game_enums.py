@@ -12,6 +12,11 @@ class UnitMovementType(Enum):
     HORSE = "horse"
     ARTILLERY = "artillery"
 
+_MOVEMENT_TYPE_BY_UNIT_TYPE_ID = {
+    "cavalry_squadron": UnitMovementType.HORSE,
+    "artillery_battery": UnitMovementType.ARTILLERY,
+}
+
 class UnitType(Enum):
     # type_id_str, base_attack, base_defense, default_soldiers
     INFANTRY_CORPS = ("infantry_corps", 25, 20, 20000)
@@ -44,6 +49,10 @@ class UnitType(Enum):
     def default_soldiers(self):
         return self._default_soldiers
 
+    @property
+    def movement_type(self) -> UnitMovementType:
+        return _MOVEMENT_TYPE_BY_UNIT_TYPE_ID.get(self._type_id_str, UnitMovementType.FOOT)
+
     @classmethod
     def from_string(cls, s: str):
         s_lower = s.lower()
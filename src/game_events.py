@@ -0,0 +1,183 @@
+from collections import deque
+from enum import Enum
+from typing import Deque, List, Optional, Tuple
+
+
+class EventType(Enum):
+    TURN_STARTED = "turn_started"
+    INCOME = "income"
+    AI_PHASE_STARTED = "ai_phase_started"
+    AI_TURN_STARTED = "ai_turn_started"
+    AI_NO_UNITS = "ai_no_units"
+    AI_MOVE = "ai_move"
+    AI_IDLE = "ai_idle"
+    AI_PLAN = "ai_plan"
+    UNIT_MARCHED = "unit_marched"
+    UNIT_MARCH_HALTED = "unit_march_halted"
+    BATTLE_STARTED = "battle_started"
+    BATTLE_SKIPPED = "battle_skipped"
+    ATTACK_PHASE = "attack_phase"
+    ATTACK = "attack"
+    CASUALTIES = "casualties"
+    UNIT_DESTROYED = "unit_destroyed"
+    CITY_CAPTURED = "city_captured"
+    CITY_HELD = "city_held"
+    BATTLE_ENDED = "battle_ended"
+
+
+# An event record is a plain tuple: (event_type, turn, *fields). Fields are ids and numbers only;
+# names and text are looked up when the record is rendered, never when it is emitted.
+GameEvent = Tuple
+
+
+def _faction_short_name(game_state, faction_id: Optional[str]) -> str:
+    if game_state is not None and faction_id in game_state.factions:
+        return game_state.factions[faction_id].short_name
+    return faction_id or "Unowned"
+
+
+def _faction_name(game_state, faction_id: Optional[str]) -> str:
+    if game_state is not None and faction_id in game_state.factions:
+        return game_state.factions[faction_id].name
+    return faction_id or "Unowned"
+
+
+def _city_name(game_state, city_id: Optional[str]) -> str:
+    if game_state is not None and city_id:
+        city = game_state.game_map.get_city(city_id)
+        if city:
+            return city.name
+    return city_id or "Field"
+
+
+def render_event(event: GameEvent, game_state=None) -> str:
+    event_type, turn = event[0], event[1]
+    fields = event[2:]
+    if event_type == EventType.TURN_STARTED:
+        return f"\n--- Advanced to Turn {turn} ---"
+    if event_type == EventType.INCOME:
+        faction_id, income, treasury = fields
+        return f"  {_faction_short_name(game_state, faction_id)} received {income} gold. Treasury: {treasury}"
+    if event_type == EventType.AI_PHASE_STARTED:
+        return "\n-- AI Factions Processing --"
+    if event_type == EventType.AI_TURN_STARTED:
+        faction_id, = fields
+        return f"\n--- AI Turn: {_faction_short_name(game_state, faction_id)} (ID: {faction_id}) ---"
+    if event_type == EventType.AI_NO_UNITS:
+        faction_id, = fields
+        return f"  AI {_faction_short_name(game_state, faction_id)} has no units in any city to move."
+    if event_type == EventType.AI_MOVE:
+        faction_id, unit_id, from_city_id, to_city_id, targets_enemy, move_result = fields
+        short_name = _faction_short_name(game_state, faction_id)
+        from_name = _city_name(game_state, from_city_id)
+        if targets_enemy:
+            intent = f"  AI {short_name} unit {unit_id} in {from_name} is targeting enemy city: {to_city_id}!"
+        else:
+            intent = f"  AI {short_name} unit {unit_id} in {from_name} moves to adjacent city: {to_city_id}."
+        return f"{intent}\n    Move Result: {move_result}"
+    if event_type == EventType.AI_IDLE:
+        faction_id, = fields
+        return f"  AI {_faction_short_name(game_state, faction_id)} took no action with its units this turn."
+    if event_type == EventType.AI_PLAN:
+        faction_id, ai_name, candidates, playouts, elapsed_ms, orders = fields
+        return (f"  AI {_faction_short_name(game_state, faction_id)} ({ai_name}) weighed {candidates} plans over {playouts} playouts "
+                f"in {elapsed_ms}ms and issues {orders} orders.")
+    if event_type == EventType.UNIT_MARCHED:
+        unit_id, from_city_id, hop_city_id, destination_id, move_result = fields
+        if hop_city_id == destination_id:
+            return f"  Unit {unit_id} reached {_city_name(game_state, destination_id)}. {move_result}"
+        return f"  Unit {unit_id} marching from {_city_name(game_state, from_city_id)} toward {_city_name(game_state, destination_id)}: {move_result}"
+    if event_type == EventType.UNIT_MARCH_HALTED:
+        unit_id, city_id, destination_id = fields
+        return f"  Unit {unit_id} in {_city_name(game_state, city_id)} halts: no route to {_city_name(game_state, destination_id)}."
+    if event_type == EventType.BATTLE_STARTED:
+        city_id, defender_faction_id, attacker_faction_ids = fields
+        attacker_names = [_faction_short_name(game_state, fid) for fid in attacker_faction_ids]
+        return (f"\n--- Battle in {_city_name(game_state, city_id)} (ID: {city_id}, Turn {turn}) ---\n"
+                f"  City originally owned by: {_faction_short_name(game_state, defender_faction_id)}\n"
+                f"  Defending Faction: {_faction_short_name(game_state, defender_faction_id)}\n"
+                f"  Attacking Factions: {attacker_names}")
+    if event_type == EventType.BATTLE_SKIPPED:
+        city_id, owner_faction_id = fields
+        city_name = _city_name(game_state, city_id)
+        if owner_faction_id:
+            return f"  {city_name}: units from multiple factions present, but no factions at WAR with owner {_faction_short_name(game_state, owner_faction_id)}. No battle."
+        return f"  City {city_name} is Unowned. Complex battle resolution for unowned cities not yet implemented. Skipping."
+    if event_type == EventType.ATTACK_PHASE:
+        city_id, defenders_attacking, faction_ids = fields
+        names = ", ".join(_faction_short_name(game_state, fid) for fid in faction_ids)
+        if defenders_attacking:
+            return f"  -- Defender's ({names}) Attack Phase --"
+        return f"  -- Attackers' ({names}) Attack Phase --"
+    if event_type == EventType.ATTACK:
+        (city_id, defenders_attacking, unit_id, unit_soldiers, eff_attack, eff_soldiers,
+         target_id, target_soldiers, eff_defense) = fields
+        attacker_tag, target_tag = ("D", "A") if defenders_attacking else ("A", "D")
+        return f"    {attacker_tag}:{unit_id}({unit_soldiers}) [EA:{eff_attack:.1f} ES:{eff_soldiers:.0f}] attacks {target_tag}:{target_id}({target_soldiers}) [ED:{eff_defense:.1f}]"
+    if event_type == EventType.CASUALTIES:
+        city_id, unit_id, casualties, remaining = fields
+        return f"      {unit_id} takes {casualties} casualties. {remaining} remain."
+    if event_type == EventType.UNIT_DESTROYED:
+        city_id, unit_id = fields
+        return f"      Unit {unit_id} has been destroyed!"
+    if event_type == EventType.CITY_CAPTURED:
+        city_id, old_owner_faction_id, new_owner_faction_id = fields
+        if old_owner_faction_id:
+            return f"  DEFENDERS WIPED OUT! {_city_name(game_state, city_id)} has been occupied by {_faction_name(game_state, new_owner_faction_id)}!"
+        return f"  {_city_name(game_state, city_id)} was unowned and is now claimed by {_faction_name(game_state, new_owner_faction_id)}!"
+    if event_type == EventType.CITY_HELD:
+        city_id, owner_faction_id, defenders_survived = fields
+        city_name = _city_name(game_state, city_id)
+        if not owner_faction_id:
+            return f"  {city_name} remains unowned or contested among multiple survivors."
+        if defenders_survived:
+            return f"  {_faction_short_name(game_state, owner_faction_id)} holds {city_name}."
+        return f"  All forces in {city_name} have been wiped out. City remains with {_faction_short_name(game_state, owner_faction_id)}."
+    if event_type == EventType.BATTLE_ENDED:
+        city_id, = fields
+        return f"--- Battle in {_city_name(game_state, city_id)} resolved. ---"
+    return f"{event_type.value} (turn {turn}): {fields}"
+
+
+class EventSink:
+    # Producers check `enabled` before assembling a record, so a disabled sink costs one attribute read.
+    enabled = True
+
+    def bind(self, game_state):
+        self.game_state = game_state
+
+    def emit(self, event: GameEvent):
+        raise NotImplementedError
+
+
+class NullEventSink(EventSink):
+    enabled = False
+
+    def emit(self, event: GameEvent):
+        pass
+
+
+class PrintEventSink(EventSink):
+    def __init__(self):
+        self.game_state = None
+
+    def emit(self, event: GameEvent):
+        print(render_event(event, self.game_state))
+
+
+class RecordingEventSink(EventSink):
+    def __init__(self, max_events: Optional[int] = None):
+        self.game_state = None
+        self.events: Deque[GameEvent] = deque(maxlen=max_events)
+
+    def emit(self, event: GameEvent):
+        self.events.append(event)
+
+    def events_of_type(self, event_type: EventType) -> List[GameEvent]:
+        return [event for event in self.events if event[0] == event_type]
+
+    def render(self) -> List[str]:
+        return [render_event(event, self.game_state) for event in self.events]
+
+    def clear(self):
+        self.events.clear()
@@ -1,31 +1,443 @@
-from typing import Dict, List, Set # Add Set
+from array import array
+from collections import OrderedDict, deque
+from heapq import heappop, heappush
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple # Add Set
+
+from game_enums import TerrainType, UnitMovementType
+from id_index import OrderedIdSet
+from map_graph import AdjacencyView, CSRAdjacency, build_csr, load_graph_file, write_graph_file
+
+# Cost of entering a city, by the terrain around it. Routes with movement_type=None count hops (plain BFS).
+MOVEMENT_COSTS: Dict[UnitMovementType, Dict[TerrainType, int]] = {
+    UnitMovementType.FOOT: {TerrainType.PLAINS: 1, TerrainType.CITY: 1, TerrainType.FOREST: 2, TerrainType.MOUNTAIN: 3},
+    UnitMovementType.HORSE: {TerrainType.PLAINS: 1, TerrainType.CITY: 1, TerrainType.FOREST: 3, TerrainType.MOUNTAIN: 4},
+    UnitMovementType.ARTILLERY: {TerrainType.PLAINS: 1, TerrainType.CITY: 1, TerrainType.FOREST: 3, TerrainType.MOUNTAIN: 5},
+}
+UNREACHABLE = -1
+ROUTE_CACHE_SIZE = 64
+
+RouteTable = Tuple[array, array]  # (distance to the target, next hop toward it), indexed by city index
+
 
 class GameMap:
     def __init__(self, map_id: str):
         self.map_id = map_id
         self.cities: Dict[str, any] = {} # City objects, keyed by city_id
-        self.regions: Dict[str, any] = {} # Region objects, keyed by region_id
+        self.regions: Dict[str, OrderedIdSet] = {} # region_id -> ids of the cities in that region
         self.adjacency_list: Dict[str, Set[str]] = {} # New: Stores city adjacencies
+        # Dense city indexes used by the route search and the cached route tables.
+        self.city_ids: List[str] = []
+        self._city_index: Dict[str, int] = {}
+        self._neighbor_indexes: List[List[int]] = []
+        self._entry_costs: Dict[Optional[UnitMovementType], List[int]] = {}
+        self._route_tables: "OrderedDict[Tuple[int, Optional[UnitMovementType]], RouteTable]" = OrderedDict()
+        self.route_cache_size = ROUTE_CACHE_SIZE
+        self._graph_mapping = None # mmap backing a loaded graph file
+        # weakref to the GameState playing on this map (set by GameState); it can forbid edits, see _check_editable.
+        self._game_ref = None
+
+    @property
+    def compact_mode(self) -> bool:
+        return isinstance(self._neighbor_indexes, CSRAdjacency)
+
+    def _check_editable(self):
+        # Cities and roads are shared with forked games and are not covered by transaction rollback,
+        # so editing them then would silently change the other game or survive the rollback.
+        game_state = self._game_ref() if self._game_ref is not None else None
+        reason = game_state.map_edit_blocker() if game_state is not None else None
+        if reason:
+            raise RuntimeError(f"Map '{self.map_id}' cannot be edited while {reason}.")
 
     def add_city(self, city_obj):
+        self._check_editable()
+        index = self._city_index.get(city_obj.city_id)
+        replaced = self.cities.get(city_obj.city_id)
+        if replaced is not None and replaced.region_id != city_obj.region_id:
+            self.regions[replaced.region_id].discard(city_obj.city_id)
+            if not self.regions[replaced.region_id]:
+                del self.regions[replaced.region_id]
         self.cities[city_obj.city_id] = city_obj
-        if city_obj.city_id not in self.adjacency_list: # Initialize adjacency set for new city
+        self.regions.setdefault(city_obj.region_id, OrderedIdSet()).add(city_obj.city_id)
+        if not self.compact_mode and city_obj.city_id not in self.adjacency_list: # Initialize adjacency set for new city
             self.adjacency_list[city_obj.city_id] = set()
+        if index is not None:
+            # Replacing a city may change its terrain, so every cost-based table is suspect.
+            self._clear_route_caches()
+            return
+        # A new city has no roads yet: cached tables stay valid and simply report it as unreachable.
+        self._city_index[city_obj.city_id] = len(self.city_ids)
+        self.city_ids.append(city_obj.city_id)
+        self._neighbor_indexes.append([])
+        for movement_type, costs in self._entry_costs.items():
+            costs.append(self._entry_cost(city_obj, movement_type))
 
     def get_city(self, city_id: str):
         return self.cities.get(city_id)
 
     def add_adjacency(self, city1_id: str, city2_id: str):
+        self._check_editable()
         if city1_id not in self.cities or city2_id not in self.cities:
             print(f"Warning: Attempting to add adjacency for non-existent city: {city1_id} or {city2_id}")
             return
-        self.adjacency_list.setdefault(city1_id, set()).add(city2_id)
-        self.adjacency_list.setdefault(city2_id, set()).add(city1_id)
+        if self.are_adjacent(city1_id, city2_id):
+            return
+        index1 = self._city_index[city1_id]
+        index2 = self._city_index[city2_id]
+        if self.compact_mode:
+            self._neighbor_indexes.add_edge(index1, index2)
+        else:
+            self.adjacency_list.setdefault(city1_id, set()).add(city2_id)
+            self.adjacency_list.setdefault(city2_id, set()).add(city1_id)
+            self._neighbor_indexes[index1].append(index2)
+            self._neighbor_indexes[index2].append(index1)
+        if self._route_tables:
+            self._repair_route_tables(index1, index2)
+
+    # --- Batch APIs for scenario loading: validate once per batch, no per-item warnings ---
+
+    def add_cities(self, city_objs: List):
+        self._check_editable()
+        new_ids = [city.city_id for city in city_objs]
+        duplicates = [city_id for city_id in new_ids if city_id in self.cities]
+        if len(set(new_ids)) != len(new_ids) or duplicates:
+            raise ValueError(f"Duplicate city ids in batch for map '{self.map_id}': {duplicates[:5] or 'repeated within batch'}")
+        first_index = len(self.city_ids)
+        self.cities.update(zip(new_ids, city_objs))
+        for city in city_objs:
+            self.regions.setdefault(city.region_id, OrderedIdSet()).add(city.city_id)
+        self.city_ids.extend(new_ids)
+        self._city_index.update(zip(new_ids, range(first_index, first_index + len(new_ids))))
+        if self.compact_mode:
+            for _ in new_ids:
+                self._neighbor_indexes.append([])
+        else:
+            self.adjacency_list.update((city_id, set()) for city_id in new_ids)
+            self._neighbor_indexes.extend([] for _ in new_ids)
+        for movement_type, costs in self._entry_costs.items():
+            costs.extend(self._entry_cost(city, movement_type) for city in city_objs)
+
+    def add_adjacencies(self, city_id_pairs: List[Tuple[str, str]]):
+        self._check_editable()
+        city_index = self._city_index
+        unknown = {city_id for pair in city_id_pairs for city_id in pair if city_id not in city_index}
+        if unknown:
+            raise ValueError(f"Adjacencies reference unknown cities on map '{self.map_id}': {sorted(unknown)[:5]}")
+        compact = self.compact_mode
+        neighbor_indexes = self._neighbor_indexes
+        adjacency_list = self.adjacency_list
+        added = False
+        for city1_id, city2_id in city_id_pairs:
+            index1 = city_index[city1_id]
+            index2 = city_index[city2_id]
+            if compact:
+                if neighbor_indexes.has_edge(index1, index2):
+                    continue
+                neighbor_indexes.add_edge(index1, index2)
+            else:
+                neighbors1 = adjacency_list[city1_id]
+                if city2_id in neighbors1:
+                    continue
+                neighbors1.add(city2_id)
+                adjacency_list[city2_id].add(city1_id)
+                neighbor_indexes[index1].append(index2)
+                neighbor_indexes[index2].append(index1)
+            added = True
+        # Rebuilding on demand is cheaper than repairing every cached table once per road.
+        if added and self._route_tables:
+            self._route_tables.clear()
 
     def are_adjacent(self, city1_id: str, city2_id: str) -> bool:
+        if self.compact_mode:
+            index1 = self._city_index.get(city1_id)
+            index2 = self._city_index.get(city2_id)
+            if index1 is None or index2 is None:
+                return False
+            return self._neighbor_indexes.has_edge(index1, index2)
         if city1_id not in self.cities or city2_id not in self.cities:
             return False
         return city2_id in self.adjacency_list.get(city1_id, set())
 
+    def neighbors(self, city_id: str) -> List[str]:
+        index = self._city_index.get(city_id)
+        if index is None:
+            return []
+        city_ids = self.city_ids
+        return [city_ids[neighbor] for neighbor in self._neighbor_indexes[index]]
+
+    def iter_roads(self) -> List[Tuple[str, str]]:
+        # Every road once, ordered so that add_adjacencies rebuilds every neighbour row in its stored order
+        # (the AI and the route search visit neighbours in that order, so saved games must keep it). A road
+        # is emitted once it heads the unvisited part of both its cities' rows; whenever a row advances,
+        # its new head may have become ready.
+        city_ids = self.city_ids
+        rows = [self._neighbor_indexes[index] for index in range(len(city_ids))]
+        heads = [0] * len(rows)
+        pending = deque(range(len(rows)))
+        roads = []
+        while pending:
+            index = pending.popleft()
+            row = rows[index]
+            if heads[index] == len(row):
+                continue
+            neighbor = row[heads[index]]
+            neighbor_row = rows[neighbor]
+            if heads[neighbor] < len(neighbor_row) and neighbor_row[heads[neighbor]] == index:
+                roads.append((city_ids[index], city_ids[neighbor]))
+                heads[index] += 1
+                heads[neighbor] += 1
+                pending.append(index)
+                pending.append(neighbor)
+        if sum(heads) != sum(len(row) for row in rows):
+            raise ValueError(f"Neighbour orders of map '{self.map_id}' are not consistent with any order of adding its roads.")
+        return roads
+
+    def export_adjacency(self) -> Tuple[array, array]:
+        # (offsets, neighbors) over city indexes, keeping each row in its stored order.
+        offsets = array("q", [0])
+        neighbors = array("i")
+        for index in range(len(self.city_ids)):
+            neighbors.extend(self._neighbor_indexes[index])
+            offsets.append(len(neighbors))
+        return offsets, neighbors
+
+    def restore_adjacency(self, offsets: Sequence[int], neighbors: Sequence[int], compact: bool = False):
+        # Inverse of export_adjacency, for a map whose cities were added in the same order and has no roads yet.
+        self._check_editable()
+        city_ids = self.city_ids
+        rows = [list(neighbors[offsets[index]:offsets[index + 1]]) for index in range(len(city_ids))]
+        self._neighbor_indexes = rows
+        self.adjacency_list = {city_id: {city_ids[neighbor] for neighbor in rows[index]} for index, city_id in enumerate(city_ids)}
+        self._route_tables.clear()
+        if compact:
+            self.compact_adjacency()
+
+    def set_city_terrain(self, city_id: str, terrain_type: TerrainType):
+        # For building maps; once a game runs on the map use GameState.set_city_terrain.
+        self._check_editable()
+        city = self.cities[city_id]
+        if city.terrain_type != terrain_type:
+            city.terrain_type = terrain_type
+            self._clear_route_caches()
+
+    # --- Compact graph mode ---
+    # For very large maps the dict-of-sets adjacency is replaced by CSR arrays over dense city indexes.
+    # adjacency_list then becomes a read-only view; add_adjacency keeps working through a small overflow.
+
+    def compact_adjacency(self):
+        if self.compact_mode:
+            return
+        offsets, neighbors = build_csr(self._neighbor_indexes)
+        self._neighbor_indexes = CSRAdjacency(memoryview(offsets), memoryview(neighbors))
+        self.adjacency_list = AdjacencyView(self)
+
+    def save_graph_file(self, path: str):
+        offsets, neighbors = build_csr([self._neighbor_indexes[index] for index in range(len(self.city_ids))])
+        write_graph_file(path, self.city_ids, offsets, neighbors)
+
+    def load_graph_file(self, path: str, city_factory: Optional[Callable[[str], any]] = None):
+        # Memory-maps a graph written by save_graph_file and switches the map to compact mode. Cities named
+        # in the file must already be on the map, unless city_factory is given to create the missing ones.
+        self._check_editable()
+        if any(len(self._neighbor_indexes[index]) for index in range(len(self.city_ids))):
+            raise ValueError(f"Map '{self.map_id}' already has adjacencies; load the graph file into a map without roads.")
+        file_city_ids, offsets, neighbors, mapping = load_graph_file(path)
+        missing_city_ids = [city_id for city_id in file_city_ids if city_id not in self.cities]
+        if missing_city_ids and city_factory is None:
+            raise ValueError(f"Graph file '{path}' references unknown city '{missing_city_ids[0]}'.")
+        # Through add_cities so the new cities are registered in their regions too; the indexes it
+        # extends are rebuilt below in the file's order.
+        self.add_cities([city_factory(city_id) for city_id in missing_city_ids])
+        in_file = set(file_city_ids)
+        extra_city_ids = [city_id for city_id in self.cities if city_id not in in_file]
+        self.city_ids = file_city_ids + extra_city_ids
+        self._city_index = {city_id: index for index, city_id in enumerate(self.city_ids)}
+        adjacency = CSRAdjacency(offsets, neighbors)
+        for _ in extra_city_ids:
+            adjacency.append([])
+        self._neighbor_indexes = adjacency
+        self.adjacency_list = AdjacencyView(self)
+        self._graph_mapping = mapping
+        self._clear_route_caches()
+
+    # --- Route queries ---
+
+    def _clear_route_caches(self):
+        self._entry_costs.clear()
+        self._route_tables.clear()
+
+    def _replace_route_caches(self):
+        # Empties the caches by replacing them, leaving alone the ones a forked game's map still shares.
+        self._entry_costs = {}
+        self._route_tables = OrderedDict()
+
+    @staticmethod
+    def _entry_cost(city_obj, movement_type: Optional[UnitMovementType]) -> int:
+        if movement_type is None:
+            return 1
+        return MOVEMENT_COSTS[movement_type][city_obj.terrain_type]
+
+    def _costs_for(self, movement_type: Optional[UnitMovementType]) -> List[int]:
+        costs = self._entry_costs.get(movement_type)
+        if costs is None:
+            costs = [self._entry_cost(self.cities[city_id], movement_type) for city_id in self.city_ids]
+            self._entry_costs[movement_type] = costs
+        return costs
+
+    def _search_toward(self, target_indexes: Iterable[int], movement_type: Optional[UnitMovementType],
+                       stop_when_settled: Optional[Set[int]] = None) -> Tuple[array, array, array]:
+        # Searches outward from the targets over reversed edges, so dist[i] is the cost of travelling from
+        # city i to its nearest target and via[i] is the first hop on that route. Unit costs use a FIFO
+        # queue (BFS); terrain costs use Dijkstra.
+        count = len(self.city_ids)
+        dist = array("i", [UNREACHABLE]) * count
+        via = array("i", [UNREACHABLE]) * count
+        origin = array("i", [UNREACHABLE]) * count
+        neighbors = self._neighbor_indexes
+        pending = set(stop_when_settled) if stop_when_settled else None
+        if movement_type is None:
+            queue = deque()
+            for target in target_indexes:
+                if dist[target] == UNREACHABLE:
+                    dist[target] = 0
+                    origin[target] = target
+                    queue.append(target)
+            while queue:
+                node = queue.popleft()
+                if pending is not None:
+                    pending.discard(node)
+                    if not pending:
+                        break
+                next_dist = dist[node] + 1
+                node_origin = origin[node]
+                for neighbor in neighbors[node]:
+                    if dist[neighbor] == UNREACHABLE:
+                        dist[neighbor] = next_dist
+                        via[neighbor] = node
+                        origin[neighbor] = node_origin
+                        queue.append(neighbor)
+            return dist, via, origin
+        costs = self._costs_for(movement_type)
+        heap: List[Tuple[int, int]] = []
+        for target in target_indexes:
+            if dist[target] == UNREACHABLE:
+                dist[target] = 0
+                origin[target] = target
+                heap.append((0, target))
+        while heap:
+            node_dist, node = heappop(heap)
+            if node_dist > dist[node]:
+                continue
+            if pending is not None:
+                pending.discard(node)
+                if not pending:
+                    break
+            next_dist = node_dist + costs[node]
+            node_origin = origin[node]
+            for neighbor in neighbors[node]:
+                old_dist = dist[neighbor]
+                if old_dist == UNREACHABLE or next_dist < old_dist:
+                    dist[neighbor] = next_dist
+                    via[neighbor] = node
+                    origin[neighbor] = node_origin
+                    heappush(heap, (next_dist, neighbor))
+        return dist, via, origin
+
+    def _route_table(self, target_index: int, movement_type: Optional[UnitMovementType]) -> RouteTable:
+        key = (target_index, movement_type)
+        table = self._route_tables.get(key)
+        if table is not None:
+            self._route_tables.move_to_end(key)
+            return table
+        dist, via, _ = self._search_toward((target_index,), movement_type)
+        table = (dist, via)
+        self._route_tables[key] = table
+        if len(self._route_tables) > self.route_cache_size:
+            self._route_tables.popitem(last=False)
+        return table
+
+    def _repair_route_tables(self, index1: int, index2: int):
+        # A new road can only shorten routes, so each cached table is repaired by re-running Dijkstra
+        # from the two endpoints instead of being thrown away.
+        neighbors = self._neighbor_indexes
+        count = len(self.city_ids)
+        for (_, movement_type), (dist, via) in self._route_tables.items():
+            if len(dist) < count:
+                missing = count - len(dist)
+                dist.extend(array("i", [UNREACHABLE]) * missing)
+                via.extend(array("i", [UNREACHABLE]) * missing)
+            costs = self._costs_for(movement_type)
+            heap: List[Tuple[int, int]] = []
+            for node, hop in ((index1, index2), (index2, index1)):
+                if dist[hop] == UNREACHABLE:
+                    continue
+                candidate = dist[hop] + costs[hop]
+                if dist[node] == UNREACHABLE or candidate < dist[node]:
+                    dist[node] = candidate
+                    via[node] = hop
+                    heappush(heap, (candidate, node))
+            while heap:
+                node_dist, node = heappop(heap)
+                if node_dist > dist[node]:
+                    continue
+                next_dist = node_dist + costs[node]
+                for neighbor in neighbors[node]:
+                    old_dist = dist[neighbor]
+                    if old_dist == UNREACHABLE or next_dist < old_dist:
+                        dist[neighbor] = next_dist
+                        via[neighbor] = node
+                        heappush(heap, (next_dist, neighbor))
+
+    def _lookup_route(self, source_id: str, target_id: str, movement_type: Optional[UnitMovementType]):
+        source = self._city_index.get(source_id)
+        target = self._city_index.get(target_id)
+        if source is None or target is None:
+            return None, None, None
+        dist, via = self._route_table(target, movement_type)
+        if source >= len(dist) or dist[source] == UNREACHABLE:
+            return None, None, None
+        return source, dist, via
+
+    def route_distance(self, source_id: str, target_id: str, movement_type: Optional[UnitMovementType] = None) -> Optional[int]:
+        source, dist, _ = self._lookup_route(source_id, target_id, movement_type)
+        return dist[source] if source is not None else None
+
+    def next_hop(self, source_id: str, target_id: str, movement_type: Optional[UnitMovementType] = None) -> Optional[str]:
+        source, _, via = self._lookup_route(source_id, target_id, movement_type)
+        if source is None or via[source] == UNREACHABLE:
+            return None
+        return self.city_ids[via[source]]
+
+    def find_path(self, source_id: str, target_id: str, movement_type: Optional[UnitMovementType] = None) -> Optional[List[str]]:
+        # Shortest route as a list of city ids, from source to target inclusive; None if unreachable.
+        source, _, via = self._lookup_route(source_id, target_id, movement_type)
+        if source is None:
+            return None
+        city_ids = self.city_ids
+        path = [source_id]
+        node = source
+        while via[node] != UNREACHABLE:
+            node = via[node]
+            path.append(city_ids[node])
+        return path
+
+    def distances_from_many(self, source_ids: Iterable[str], target_ids: Iterable[str],
+                            movement_type: Optional[UnitMovementType] = None) -> Dict[str, Tuple[int, Optional[str], str]]:
+        # One search for many sources: {source_id: (cost to the nearest target, next hop, that target)}.
+        # Sources that cannot reach any target are left out.
+        city_index = self._city_index
+        targets = [city_index[city_id] for city_id in target_ids if city_id in city_index]
+        sources = {city_id: city_index[city_id] for city_id in source_ids if city_id in city_index}
+        if not targets or not sources:
+            return {}
+        dist, via, origin = self._search_toward(targets, movement_type, stop_when_settled=set(sources.values()))
+        city_ids = self.city_ids
+        results: Dict[str, Tuple[int, Optional[str], str]] = {}
+        for source_id, source in sources.items():
+            if dist[source] == UNREACHABLE:
+                continue
+            hop = via[source]
+            results[source_id] = (dist[source], city_ids[hop] if hop != UNREACHABLE else None, city_ids[origin[source]])
+        return results
+
     def __str__(self):
         return f"Map: {self.map_id}, Cities: {len(self.cities)}, Adjacencies Defined for {len(self.adjacency_list)} cities"
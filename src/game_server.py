@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from game_events import NullEventSink
+from game_state import GameState
+from scenario import load_scenario, scenario_path
+from snapshot import load_snapshot, save_snapshot
+from views import DEFAULT_PAGE_SIZE, ViewQuery, get_page
+
+# Hosts many GameState sessions behind one socket. The protocol is one JSON object per line in each
+# direction; requests on a connection are answered in order:
+#   -> {"id": 1, "op": "create_session", "scenario": "europe_1805", "seed": 7}
+#   <- {"id": 1, "ok": true, "result": {"session": "session_1", "turn": 1, "player_faction_id": "france"}}
+#   -> {"id": 2, "op": "move_unit", "session": "session_1", "unit_id": "fra_guard", "target_city_id": "lyon"}
+#   <- {"id": 2, "ok": true, "result": {"message": "Unit fra_guard ..."}}
+# Game operations answer with the game's own message; ok is false when it is an "Error: ..." message
+# or the request itself is malformed (then "error" replaces "result").
+#
+# Every operation on a session holds that session's lock, so requests from different connections to
+# one game run one at a time. next_turn, scenario loading and eviction run in a thread pool to keep the
+# event loop serving other sessions meanwhile (threads rather than processes: the game state lives
+# here and is mutated in place). Sessions idle for idle_seconds are saved as snapshots in sessions_dir
+# and dropped from memory; the next request to one restores it. Clients pick scenarios by name from
+# SCENARIO_DIR only, never by path on the server host.
+
+
+# Per-request limits on "count", so that one client cannot hold its session and a worker thread for
+# minutes or allocate millions of units in a single request.
+DEFAULT_MAX_TURNS_PER_REQUEST = 100
+DEFAULT_MAX_RECRUITS_PER_REQUEST = 1000
+
+
+class RequestError(Exception):
+    pass
+
+
+def _field(request: Dict[str, Any], name: str, required: bool = True, kind: type = str):
+    value = request.get(name)
+    if value is None:
+        if required:
+            raise RequestError(f"Missing field '{name}'.")
+        return None
+    if not isinstance(value, kind) or (isinstance(value, bool) and kind is not bool):
+        raise RequestError(f"Field '{name}' must be of type {kind.__name__}.")
+    return value
+
+
+def _check_count_limit(request: Dict[str, Any], limit: int):
+    count = request.get("count")
+    if isinstance(count, int) and count > limit:
+        raise RequestError(f"Field 'count' must be at most {limit}.")
+
+
+def _message(message: str) -> Dict[str, Any]:
+    return {"message": message}
+
+
+# op -> function(game_state, request) for the quick operations, run on the event loop.
+GAME_OPS: Dict[str, Callable[[GameState, Dict[str, Any]], Any]] = {
+    "move_unit": lambda game_state, request: game_state.move_unit(
+        _field(request, "unit_id"), _field(request, "target_city_id"), _field(request, "acting_faction_id", False)),
+    "march_unit": lambda game_state, request: game_state.march_unit(
+        _field(request, "unit_id"), _field(request, "target_city_id"), _field(request, "acting_faction_id", False)),
+    "recruit_unit": lambda game_state, request: game_state.recruit_unit(
+        _field(request, "unit_type"), _field(request, "city_id"), _field(request, "general_id", False)),
+    "recruit_units": lambda game_state, request: game_state.recruit_units(
+        _field(request, "unit_type"), _field(request, "city_id"), _field(request, "count", kind=int),
+        _field(request, "general_id", False), _field(request, "acting_faction_id", False)),
+    "declare_war_on_faction": lambda game_state, request: game_state.declare_war_on_faction(
+        _field(request, "declaring_faction_id", False) or game_state.player_faction_id, _field(request, "target_faction_id")),
+    "develop_building_in_city": lambda game_state, request: game_state.develop_building_in_city(
+        _field(request, "city_id"), _field(request, "building_type")),
+    "get_city_details_str": lambda game_state, request: game_state.get_city_details_str(_field(request, "city_id")),
+    "get_region_details_str": lambda game_state, request: game_state.get_region_details_str(_field(request, "region_id")),
+    "get_general_details_str": lambda game_state, request: game_state.get_general_details_str(_field(request, "general_id")),
+    "get_faction_details_str": lambda game_state, request: game_state.get_faction_details_str(_field(request, "faction_id")),
+    "get_diplomacy_summary_str": lambda game_state, request: game_state.get_diplomacy_summary_str(_field(request, "faction_id", False)),
+}
+
+
+def _summary_page(game_state: GameState, request: Dict[str, Any]) -> Dict[str, Any]:
+    query = ViewQuery(_field(request, "kind"), _field(request, "faction_id", False), _field(request, "region_id", False),
+                      _field(request, "sort", False), bool(_field(request, "descending", False, bool)))
+    view_page = get_page(game_state, query, _field(request, "page", False, int) or 1, _field(request, "page_size", False, int) or DEFAULT_PAGE_SIZE)
+    if isinstance(view_page, str):
+        return _message(view_page)
+    return {"page": view_page.page, "pages": view_page.pages, "total": view_page.total, "lines": view_page.lines}
+
+
+def _next_turns(game_state: GameState, count: int) -> Dict[str, Any]:
+    for _ in range(count):
+        game_state.next_turn()
+        game_state.compact_units() # clients only hold ids, never ArmyUnit objects
+    return {"turn": game_state.current_turn}
+
+
+class Session:
+    def __init__(self, session_id: str, game_state: GameState):
+        self.session_id = session_id
+        self.game_state: Optional[GameState] = game_state  # None while evicted to snapshot_path
+        self.snapshot_path: Optional[str] = None
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class GameServer:
+    def __init__(self, sessions_dir: Optional[str] = None, idle_seconds: float = 300.0, workers: Optional[int] = None,
+                 default_scenario: str = "europe_1805", max_turns_per_request: int = DEFAULT_MAX_TURNS_PER_REQUEST,
+                 max_recruits_per_request: int = DEFAULT_MAX_RECRUITS_PER_REQUEST):
+        self.sessions_dir = sessions_dir or os.path.join(tempfile.gettempdir(), "napoleon_sessions")
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        self.idle_seconds = idle_seconds
+        self.default_scenario = default_scenario
+        self.max_turns_per_request = max_turns_per_request
+        self.max_recruits_per_request = max_recruits_per_request
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.sessions: Dict[str, Session] = {}
+        self.stats = {"requests": 0, "errors": 0, "turns": 0, "evictions": 0, "restores": 0}
+        self._next_session_number = 1
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._eviction_task: Optional[asyncio.Task] = None
+
+    # --- Lifecycle ---
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+        if socket_path:
+            self._server = await asyncio.start_unix_server(self._serve_connection, path=socket_path)
+        else:
+            self._server = await asyncio.start_server(self._serve_connection, host, port)
+        self._eviction_task = asyncio.create_task(self._evict_idle_sessions())
+        return self._server
+
+    async def close(self):
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown()
+
+    # --- Connections ---
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # a line over the stream limit
+                    writer.write(json.dumps({"id": None, "ok": False, "error": "Request too long."}).encode() + b"\n")
+                    break
+                if not line:
+                    break
+                response = await self.handle_line(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> Dict[str, Any]:
+        self.stats["requests"] += 1
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            self.stats["errors"] += 1
+            return {"id": None, "ok": False, "error": f"Invalid JSON: {error}"}
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("A request must be a JSON object.")
+            result = await self.handle_request(request)
+        except RequestError as error:
+            self.stats["errors"] += 1
+            return {"id": request_id, "ok": False, "error": str(error)}
+        except Exception as error:
+            # A bug in one request must not take the connection (or the server) down with it.
+            self.stats["errors"] += 1
+            return {"id": request_id, "ok": False, "error": f"Internal error: {error!r}"}
+        ok = not (isinstance(result, dict) and str(result.get("message", "")).startswith("Error"))
+        return {"id": request_id, "ok": ok, "result": result}
+
+    async def handle_request(self, request: Dict[str, Any]) -> Any:
+        op = _field(request, "op")
+        if op == "create_session":
+            return await self._create_session(_field(request, "scenario", False) or self.default_scenario,
+                                              _field(request, "seed", False, int))
+        if op == "list_sessions":
+            now = time.monotonic()
+            return [{"session": session.session_id, "resident": session.game_state is not None,
+                     "idle_seconds": round(now - session.last_used, 3)} for session in self.sessions.values()]
+        if op == "server_stats":
+            return dict(self.stats, sessions=len(self.sessions),
+                        resident=sum(1 for session in self.sessions.values() if session.game_state is not None))
+        if op == "close_session":
+            return await self._close_session(_field(request, "session"))
+        if op != "next_turn" and op != "summary" and op not in GAME_OPS:
+            raise RequestError(f"Unknown op '{op}'.")
+        if op == "next_turn":
+            _check_count_limit(request, self.max_turns_per_request)
+        elif op == "recruit_units":
+            _check_count_limit(request, self.max_recruits_per_request)
+        session = self._session(_field(request, "session"))
+        async with session.lock:
+            game_state = await self._resident(session)
+            try:
+                if op == "next_turn":
+                    count = _field(request, "count", False, int) or 1
+                    if count < 1:
+                        raise RequestError("Field 'count' must be at least 1.")
+                    result = await asyncio.get_running_loop().run_in_executor(self.executor, _next_turns, game_state, count)
+                    self.stats["turns"] += count
+                elif op == "summary":
+                    result = _summary_page(game_state, request)
+                else:
+                    result = _message(GAME_OPS[op](game_state, request))
+            finally:
+                session.last_used = time.monotonic()
+        return result
+
+    # --- Sessions ---
+
+    def _session(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(f"Session '{session_id}' not found.")
+        return session
+
+    async def _create_session(self, scenario: str, seed: Optional[int]) -> Dict[str, Any]:
+        name = scenario[:-len(".jsonl")] if scenario.endswith(".jsonl") else scenario
+        path = scenario_path(name)
+        if not name or name.startswith(".") or os.path.basename(name) != name:
+            raise RequestError(f"Invalid scenario name '{scenario}'.")
+        if not os.path.exists(path):
+            raise RequestError(f"Scenario '{scenario}' not found.")
+        game_state, _ = await asyncio.get_running_loop().run_in_executor(self.executor, load_scenario, path)
+        game_state.set_event_sink(NullEventSink())
+        if seed is not None:
+            game_state.seed = seed
+        session_id = f"session_{self._next_session_number}"
+        self._next_session_number += 1
+        self.sessions[session_id] = Session(session_id, game_state)
+        return {"session": session_id, "turn": game_state.current_turn, "player_faction_id": game_state.player_faction_id}
+
+    async def _close_session(self, session_id: str) -> Dict[str, Any]:
+        session = self._session(session_id)
+        async with session.lock:
+            self.sessions.pop(session_id, None)
+            if session.snapshot_path and os.path.exists(session.snapshot_path):
+                os.remove(session.snapshot_path)
+        return {"closed": session_id}
+
+    async def _resident(self, session: Session) -> GameState:
+        # The session's game, restored from its snapshot if it was evicted. Needs the session lock.
+        if session.game_state is None:
+            game_state = await asyncio.get_running_loop().run_in_executor(self.executor, load_snapshot, session.snapshot_path)
+            game_state.set_event_sink(NullEventSink())
+            session.game_state = game_state
+            self.stats["restores"] += 1
+        return session.game_state
+
+    async def evict(self, session: Session):
+        # Saves the session's game to disk and drops it from memory. Needs the session lock.
+        if session.game_state is None:
+            return
+        path = session.snapshot_path = os.path.join(self.sessions_dir, f"{session.session_id}.snap")
+        await asyncio.get_running_loop().run_in_executor(self.executor, save_snapshot, session.game_state, path)
+        session.game_state = None
+        self.stats["evictions"] += 1
+
+    async def _evict_idle_sessions(self):
+        interval = max(0.05, min(self.idle_seconds / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for session in list(self.sessions.values()):
+                if session.game_state is not None and not session.lock.locked() and now - session.last_used >= self.idle_seconds:
+                    async with session.lock:
+                        # Another request may have used the session while this one waited for the lock.
+                        if session.session_id in self.sessions and time.monotonic() - session.last_used >= self.idle_seconds:
+                            await self.evict(session)
+
+
+async def serve(args: argparse.Namespace):
+    server = GameServer(args.sessions_dir, args.idle_seconds, args.workers, args.scenario, args.max_turns_per_request,
+                        args.max_recruits_per_request)
+    await server.start(args.host, args.port, args.socket)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"Game server listening on {where}; idle sessions are evicted to {server.sessions_dir} after {args.idle_seconds:g}s.")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many game sessions over a JSON lines protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--sessions-dir", help="where idle sessions are saved (default: a directory under the system temp dir)")
+    parser.add_argument("--idle-seconds", type=float, default=300.0, help="evict sessions idle for this long")
+    parser.add_argument("--workers", type=int, default=None, help="threads for next_turn, loading and eviction")
+    parser.add_argument("--scenario", default="europe_1805", help="scenario name (from the scenarios directory) for sessions created without one")
+    parser.add_argument("--max-turns-per-request", type=int, default=DEFAULT_MAX_TURNS_PER_REQUEST,
+                        help="largest count a next_turn request may ask for")
+    parser.add_argument("--max-recruits-per-request", type=int, default=DEFAULT_MAX_RECRUITS_PER_REQUEST,
+                        help="largest count a recruit_units request may ask for")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,310 @@
 
-from typing import Dict, List, Optional, Set, Tuple
+import copy
+import itertools
+import weakref
+from collections import Counter
+from operator import add
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 from army_unit import ArmyUnit 
-from game_enums import UnitType, DiplomaticStatus 
+from unit_table import NO_CODE, UnitTable
+from game_enums import UnitType, UnitMovementType, DiplomaticStatus, TerrainType
 from faction import Faction 
+from diplomacy import DiplomacyMatrix, FactionRelationsView
+from game_events import EventSink, EventType, NullEventSink, PrintEventSink
+from id_index import OrderedIdSet
+from journal import UndoJournal
+import combat_numpy
+import combat_parallel
 import math 
 import random 
+import rng_streams
+from turn_profiler import DEFAULT_PROFILE_HISTORY, TurnProfiler
+from views import DEFAULT_PAGE_SIZE, SECTION_TITLES, section_lines
 
 COMBAT_LATHALITY_FACTOR = 0.15 
 GENERAL_ATTACK_BONUS_DIVISOR = 5.0
 GENERAL_DEFENSE_BONUS_DIVISOR = 5.0
 GENERAL_COMMAND_EFFICIENCY_DIVISOR = 200.0
 CITY_DEFENSE_BONUS_MULTIPLIER = 1.25
+COMBAT_ENGINES = ("python", "numpy", "parallel")
+# Per-turn yield of a city to its owner: economy // CITY_GOLD_DIVISOR gold, population // CITY_FOOD_DIVISOR
+# food and population // CITY_MANPOWER_DIVISOR manpower.
+CITY_GOLD_DIVISOR = 10
+CITY_FOOD_DIVISOR = 250
+CITY_MANPOWER_DIVISOR = 500
+UNIT_MOVEMENT_TYPES: Dict[str, UnitMovementType] = {unit_type.type_id: unit_type.movement_type for unit_type in UnitType}
+
+# One combatant in simulate_battle: (unit_id, soldiers, eff_attack, eff_defense, soldier_multiplier).
+BattleUnit = Tuple[str, int, float, float, float]
+
+
+def simulate_battle(turn: int, city_id: str, defender_faction_id: str, attacker_faction_ids: Tuple[str, ...],
+                    units: List[BattleUnit], num_defenders: int, seed: int, log_events: bool) -> Tuple[List[int], List[int], List[Tuple], int]:
+    # The python engine's combat rounds as a pure function of plain data, so battles can be fought in
+    # worker processes. The first num_defenders units defend. Defenders strike first, then the surviving
+    # attackers; each striker hits a random living enemy. Returns (soldiers after the battle per unit,
+    # indexes of destroyed units in order of destruction, events, number of attacks).
+    rng = random.Random(seed)
+    soldiers = [unit[1] for unit in units]
+    destroyed: List[int] = []
+    events: List[Tuple] = []
+    attacks = 0
+
+    def strike(attacker: int, targets: List[int], defenders_attacking: bool):
+        target = rng.choice(targets)
+        att_eff, multiplier = units[attacker][2], units[attacker][4]
+        soldiers_eff_att = max(1.0, soldiers[attacker] * multiplier)
+        def_eff_target = units[target][3]
+        damage_ratio = att_eff / (att_eff + def_eff_target) if (att_eff + def_eff_target) > 0 else 0.5
+        potential_casualties = soldiers_eff_att * damage_ratio * COMBAT_LATHALITY_FACTOR
+        actual_casualties = math.ceil(potential_casualties * rng.uniform(0.8, 1.2))
+        actual_casualties = max(1, min(actual_casualties, soldiers[target]))
+        if log_events:
+            events.append((EventType.ATTACK, turn, city_id, defenders_attacking, units[attacker][0], soldiers[attacker], att_eff,
+                           soldiers_eff_att, units[target][0], soldiers[target], def_eff_target))
+        soldiers[target] -= actual_casualties
+        if log_events:
+            events.append((EventType.CASUALTIES, turn, city_id, units[target][0], actual_casualties, soldiers[target]))
+        if soldiers[target] == 0:
+            if log_events:
+                events.append((EventType.UNIT_DESTROYED, turn, city_id, units[target][0]))
+            destroyed.append(target)
+            targets.remove(target)
+
+    defenders = [index for index in range(num_defenders) if soldiers[index] > 0]
+    attackers = [index for index in range(num_defenders, len(units)) if soldiers[index] > 0]
+    if defenders and attackers:
+        if log_events:
+            events.append((EventType.ATTACK_PHASE, turn, city_id, True, (defender_faction_id,)))
+        for defender in defenders:
+            if not attackers:
+                break
+            strike(defender, attackers, True)
+            attacks += 1
+    if attackers and defenders:
+        if log_events:
+            events.append((EventType.ATTACK_PHASE, turn, city_id, False, attacker_faction_ids))
+        for attacker in list(attackers):
+            if not defenders:
+                break
+            strike(attacker, defenders, False)
+            attacks += 1
+    return soldiers, destroyed, events, attacks
+
+
+def city_yield(city) -> Tuple[int, int, int]:
+    return (city.economy // CITY_GOLD_DIVISOR, city.population // CITY_FOOD_DIVISOR,
+            city.population // CITY_MANPOWER_DIVISOR)
+
+
+class RegionStats(NamedTuple):
+    # What one faction holds in one region: cities owned, units and soldiers standing there, and the
+    # per-turn yield of those cities.
+    cities: int = 0
+    units: int = 0
+    soldiers: int = 0
+    gold: int = 0
+    food: int = 0
+    manpower: int = 0
+
+
+NO_REGION_STATS = RegionStats()
+
 
 class GameState:
-    def __init__(self, game_map_obj): 
+    def __init__(self, game_map_obj, seed: Optional[int] = None): 
         self.current_turn = 1
+        # All game randomness comes from substreams of this seed (see substream_seed), never from the
+        # global random module, which is only used to pick a seed when none is given.
+        self.seed = seed if seed is not None else random.getrandbits(64)
         self.game_map = game_map_obj 
         self.factions: Dict[str, Faction] = {} 
         self.generals: Dict[str, any] = {} 
-        self.army_units: Dict[str, ArmyUnit] = {} 
+        self.army_units = UnitTable()
         self.player_faction_id: Optional[str] = None
+        self.diplomacy = DiplomacyMatrix()
         self.allowed_building_types = ["market", "barracks"]
+        self.debug_checks = False
+        self.combat_engine = "python"
+        self.battle_workers: Optional[int] = None  # processes for the parallel combat engine; None: one per CPU
+        # (unit_id, is_defending_in_city) -> (eff_attack, eff_defense, soldier_multiplier); soldiers are applied per call.
+        self._stats_cache: Dict[Tuple[str, bool], Tuple[float, float, float]] = {}
+        self.stats_cache_hits = 0
+        self.stats_cache_misses = 0
+        # Cities whose garrison holds units of a faction at war with the owner; only these are visited by the combat phase.
+        self.contested_city_ids = OrderedIdSet()
+        self._city_faction_unit_counts: Dict[str, Dict[str, int]] = {}
+        # faction_id -> (gold, food, manpower) yield of its cities per turn, updated when a city changes hands or
+        # its economy or population changes (set_city_economy/set_city_population), so the economy phase
+        # does not visit cities.
+        self.faction_income: Dict[str, Tuple[int, int, int]] = {}
+        # region_id -> faction_id -> RegionStats, kept up to date by every change of city ownership or
+        # output, unit location, soldiers and unit removal, so region queries never visit cities or units.
+        self.region_stats: Dict[str, Dict[str, RegionStats]] = {}
+        # unit_id -> final destination of a multi-hop march; one hop is taken at the start of each turn.
+        self.unit_destinations: Dict[str, str] = {}
+        # Entities changed since the last snapshot (see snapshot.py); unit rows and diplomacy track their own changes.
+        self.dirty_city_ids: Set[str] = set()
+        self.dirty_faction_ids: Set[str] = set()
+        self.dirty_general_ids: Set[str] = set()
+        # Change counters for cached views (see views.py), bumped whenever a faction, city or general changes;
+        # units keep theirs in the unit table (UnitTable.version).
+        self.entity_versions: Dict[str, int] = {"factions": 0, "cities": 0, "generals": 0}
+        self.view_cache = None  # views.ViewCache, created on first use
+        # Transactions and forks (see begin/fork). _owned is None while this state shares nothing with a fork;
+        # otherwise it holds the cities, generals and containers this state has copied for itself.
+        self.journal: Optional[UndoJournal] = None
+        self._owned: Optional[Dict[int, Any]] = None
+        self._forks = None
+        self._is_fork = False
+        self.event_sink: EventSink = PrintEventSink()
+        # faction_id -> AI object (see ai.py) for AI factions not run by the built-in random AI.
+        self.ai_players: Dict[str, Any] = {}
+        self.ai_planner = None  # plans AI turns elsewhere, e.g. ai.ParallelPlanner; None plans them here
+        self.profiler: Optional[TurnProfiler] = None  # see enable_profiling
+        self.replay_log = None  # replay.ReplayLog recording this game's AI orders and turns, if any
+        self.event_sink.bind(self)
+        game_map_obj._game_ref = weakref.ref(self)
+
+    def set_event_sink(self, sink: EventSink):
+        sink.bind(self)
+        self.event_sink = sink
+
+    # --- Turn profiling ---
+
+    def enable_profiling(self, history: Optional[int] = None) -> TurnProfiler:
+        # Times every phase of the following turns and keeps the last `history` profiles. An existing
+        # profiler is kept, with its profiles and any cProfile capture; history None leaves its length as is.
+        if self.profiler is None:
+            self.profiler = TurnProfiler(DEFAULT_PROFILE_HISTORY if history is None else history)
+        elif history is not None:
+            self.profiler.set_history_length(history)
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def get_turn_profile(self, turn: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        # The profile of the given turn, or of the last profiled turn; None if it is not in the history.
+        if self.profiler is None or not self.profiler.history:
+            return None
+        if turn is None:
+            return self.profiler.history[-1]
+        for profile in reversed(self.profiler.history):
+            if profile["turn"] == turn:
+                return profile
+        return None
+
+    def substream_seed(self, kind: str, key: str) -> int:
+        # Seed of the random stream for (kind, current turn, key), e.g. ("battle", city_id) or ("ai", faction_id).
+        return rng_streams.substream_seed(self.seed, kind, self.current_turn, key)
+
+    def set_combat_engine(self, engine_name: str) -> str:
+        if engine_name not in COMBAT_ENGINES:
+            return f"Error: Unknown combat engine '{engine_name}'. Available engines: {', '.join(COMBAT_ENGINES)}"
+        if engine_name == "numpy" and not combat_numpy.numpy_available():
+            return "Error: The numpy combat engine requires numpy to be installed."
+        self.combat_engine = engine_name
+        return f"Combat engine set to {engine_name}."
+
+    def set_faction_ai(self, faction_id: str, ai_player) -> str:
+        faction = self.factions.get(faction_id)
+        if not faction:
+            return f"Error: Faction '{faction_id}' not found."
+        if faction_id == self.player_faction_id:
+            return f"Error: {faction.short_name} is the player's faction and has no AI."
+        previous = self.ai_players.pop(faction_id, None)
+        if previous is not None and previous is not ai_player:
+            previous.close()
+        if ai_player is None:
+            return f"{faction.short_name} now uses the default random AI."
+        self.ai_players[faction_id] = ai_player
+        return f"{faction.short_name} is now controlled by the {ai_player.name} AI."
+
+    def set_ai_planner(self, planner):
+        if self.ai_planner is not None and self.ai_planner is not planner:
+            self.ai_planner.close()
+        self.ai_planner = planner
 
     def add_faction(self, faction_obj: Faction):
+        # Every registered pair starts out at PEACE with relation 0, which is the matrix default, so
+        # registration costs O(1) amortized instead of writing a relation for every existing faction.
         self.factions[faction_obj.faction_id] = faction_obj
-        for other_faction_id in self.factions:
-            if other_faction_id != faction_obj.faction_id:
-                if other_faction_id not in faction_obj.diplomatic_relations:
-                    self.set_diplomatic_status(faction_obj.faction_id, other_faction_id, DiplomaticStatus.PEACE, 0)
-                other_faction = self.factions[other_faction_id]
-                if faction_obj.faction_id not in other_faction.diplomatic_relations:
-                     self.set_diplomatic_status(other_faction_id, faction_obj.faction_id, DiplomaticStatus.PEACE, 0)
+        self.dirty_faction_ids.add(faction_obj.faction_id)
+        self.entity_versions["factions"] += 1
+        self.faction_income.setdefault(faction_obj.faction_id, (0, 0, 0))
+        self.diplomacy.register(faction_obj.faction_id)
+        preset_relations = faction_obj.diplomatic_relations
+        faction_obj.diplomatic_relations = FactionRelationsView(self.diplomacy, faction_obj.faction_id)
+        if isinstance(preset_relations, dict):
+            for other_faction_id, relation in preset_relations.items():
+                if other_faction_id in self.factions:
+                    self.set_diplomatic_status(faction_obj.faction_id, other_faction_id, relation["status"], relation.get("relation_value", 0))
 
     def get_faction(self, faction_id: str) -> Optional[Faction]: 
         return self.factions.get(faction_id)
 
     def add_general(self, general_obj):
+        if self.journal is not None and general_obj.general_id not in self.generals:
+            self.journal.record(self.generals.pop, general_obj.general_id)
         self.generals[general_obj.general_id] = general_obj
+        self.dirty_general_ids.add(general_obj.general_id)
+        self.entity_versions["generals"] += 1
         if general_obj.faction_id:
             faction = self.factions.get(general_obj.faction_id)
             if faction:
-                faction.generals_list_ids.append(general_obj.general_id)
+                self._writable(faction, "generals_list_ids").add(general_obj.general_id)
+                self.dirty_faction_ids.add(faction.faction_id)
 
     def add_army_unit(self, unit_obj: ArmyUnit): 
-        self.army_units[unit_obj.unit_id] = unit_obj
+        self.army_units.add(unit_obj)
         if unit_obj.owning_faction_id:
              faction = self.factions.get(unit_obj.owning_faction_id)
              if faction:
-                faction.army_units_list_ids.append(unit_obj.unit_id)
+                self._writable(faction, "army_units_list_ids").add(unit_obj.unit_id)
+                self.dirty_faction_ids.add(faction.faction_id)
 
     def _remove_unit(self, unit_id_to_remove: str):
         unit = self.army_units.pop(unit_id_to_remove, None)
         if unit:
+            self._invalidate_unit_stats(unit_id_to_remove)
+            if unit_id_to_remove in self.unit_destinations:
+                del self._writable_destinations()[unit_id_to_remove]
             if unit.owning_faction_id and unit.owning_faction_id in self.factions:
                 faction = self.factions[unit.owning_faction_id]
-                if unit_id_to_remove in faction.army_units_list_ids:
-                    faction.army_units_list_ids.remove(unit_id_to_remove)
+                self._writable(faction, "army_units_list_ids").discard(unit_id_to_remove)
+                self.dirty_faction_ids.add(faction.faction_id)
             if unit.current_location_city_id and unit.current_location_city_id in self.game_map.cities:
-                city = self.game_map.cities[unit.current_location_city_id]
-                if unit_id_to_remove in city.garrisoned_units:
-                    city.garrisoned_units.remove(unit_id_to_remove)
+                self._writable_garrison(unit.current_location_city_id).discard(unit_id_to_remove)
+                self._track_unit_presence(unit.current_location_city_id, unit.owning_faction_id, -1)
+                self._add_region_stats(self.game_map.cities[unit.current_location_city_id].region_id, unit.owning_faction_id,
+                                       RegionStats(units=-1, soldiers=-unit.soldiers))
+
+    def damage_unit(self, unit_id: str, damage: int) -> bool:
+        # ArmyUnit.take_damage for a unit in this game, keeping the region soldier counts in step.
+        # Returns True if the unit is left with no soldiers; removing it is up to the caller.
+        unit = self.army_units[unit_id]
+        lost = min(damage, unit.soldiers)
+        unit.soldiers -= lost
+        city_id = unit.current_location_city_id
+        if city_id and city_id in self.game_map.cities:
+            self._add_region_stats(self.game_map.cities[city_id].region_id, unit.owning_faction_id, RegionStats(soldiers=-lost))
+        return unit.soldiers == 0
 
     def assign_city_to_faction(self, city_id: str, faction_id: str):
         city = self.game_map.get_city(city_id)
         new_faction_obj = self.factions.get(faction_id)
         if city and new_faction_obj:
+            self._move_city_income(city, city.current_owner_faction_id, faction_id)
             if city.current_owner_faction_id and city.current_owner_faction_id in self.factions:
                 old_owner_faction = self.factions[city.current_owner_faction_id]
-                if city_id in old_owner_faction.controlled_cities_ids:
-                    old_owner_faction.controlled_cities_ids.remove(city_id)
-            city.current_owner_faction_id = faction_id
-            if city_id not in new_faction_obj.controlled_cities_ids:
-                new_faction_obj.controlled_cities_ids.append(city_id)
+                self._writable(old_owner_faction, "controlled_cities_ids").discard(city_id)
+                self.dirty_faction_ids.add(old_owner_faction.faction_id)
+            self._set(self._writable_city(city_id), "current_owner_faction_id", faction_id)
+            self._writable(new_faction_obj, "controlled_cities_ids").add(city_id)
+            self.dirty_faction_ids.add(faction_id)
+            self.dirty_city_ids.add(city_id)
+            self._refresh_contested_city(city_id)
             # print(f"INFO: City {city.name} (ID: {city_id}) is now controlled by {new_faction_obj.name}.") # Reduce verbosity for assign
         elif not city:
             print(f"ERROR: Cannot assign city {city_id} - city not found.")
@@ -82,39 +315,563 @@ class GameState:
         general = self.generals.get(general_id)
         city = self.game_map.get_city(city_id)
         if general and city:
-            general.current_location_city_id = city_id
+            self._set(self._writable_general(general_id), "current_location_city_id", city_id)
+            self.dirty_general_ids.add(general_id)
 
     def place_unit_in_city(self, unit_id: str, city_id: str):
         unit = self.army_units.get(unit_id)
         city = self.game_map.get_city(city_id)
         if unit and city:
+            previous_city = self.game_map.get_city(unit.current_location_city_id) if unit.current_location_city_id else None
+            if previous_city is city and unit_id in city.garrisoned_units:
+                return # already there; re-adding would move it to the end of the garrison
+            if previous_city:
+                self._writable_garrison(previous_city.city_id).discard(unit_id)
+                self._track_unit_presence(previous_city.city_id, unit.owning_faction_id, -1)
             unit.current_location_city_id = city_id
-            if unit_id not in city.garrisoned_units:
-                city.garrisoned_units.append(unit_id)
+            self._writable_garrison(city_id).add(unit_id)
+            self._invalidate_unit_stats(unit_id)
+            self._track_unit_presence(city_id, unit.owning_faction_id, 1)
+            self._move_region_units(unit.owning_faction_id, previous_city.region_id if previous_city else None, city.region_id,
+                                    unit.soldiers)
+
+    # --- Batch APIs for scenario loading ---
+    # Each call validates every referenced id once for the whole batch and raises ValueError on bad
+    # input, then inserts without the per-item lookups of add_*/place_*/assign_*.
+
+    def add_factions(self, faction_objs: List[Faction]):
+        duplicates = [faction.faction_id for faction in faction_objs if faction.faction_id in self.factions]
+        if duplicates:
+            raise ValueError(f"Factions already exist: {duplicates[:5]}")
+        self.diplomacy.reserve(len(self.diplomacy) + len(faction_objs))
+        for faction_obj in faction_objs:
+            self.add_faction(faction_obj)
+
+    def add_generals(self, general_objs: List):
+        # Generals may carry current_location_city_id already set; it is validated here.
+        unknown_factions = {general.faction_id for general in general_objs if general.faction_id and general.faction_id not in self.factions}
+        unknown_cities = {general.current_location_city_id for general in general_objs
+                          if general.current_location_city_id and general.current_location_city_id not in self.game_map.cities}
+        if unknown_factions or unknown_cities:
+            raise ValueError(f"Generals reference unknown factions {sorted(unknown_factions)[:5]} or cities {sorted(unknown_cities)[:5]}")
+        self.entity_versions["generals"] += 1
+        for general_obj in general_objs:
+            if self.journal is not None and general_obj.general_id not in self.generals:
+                self.journal.record(self.generals.pop, general_obj.general_id)
+            self.generals[general_obj.general_id] = general_obj
+            self.dirty_general_ids.add(general_obj.general_id)
+            if general_obj.faction_id:
+                self._writable(self.factions[general_obj.faction_id], "generals_list_ids").add(general_obj.general_id)
+                self.dirty_faction_ids.add(general_obj.faction_id)
+
+    def assign_cities(self, city_faction_pairs: List[Tuple[str, str]]):
+        cities = self.game_map.cities
+        unknown = {city_id for city_id, _ in city_faction_pairs if city_id not in cities} | \
+                  {faction_id for _, faction_id in city_faction_pairs if faction_id not in self.factions}
+        if unknown:
+            raise ValueError(f"City assignments reference unknown cities or factions: {sorted(unknown)[:5]}")
+        controlled = {faction_id: self._writable(faction, "controlled_cities_ids") for faction_id, faction in self.factions.items()}
+        for city_id, faction_id in city_faction_pairs:
+            city = self._writable_city(city_id)
+            self._move_city_income(city, city.current_owner_faction_id, faction_id)
+            if city.current_owner_faction_id in controlled:
+                controlled[city.current_owner_faction_id].discard(city_id)
+                self.dirty_faction_ids.add(city.current_owner_faction_id)
+            self._set(city, "current_owner_faction_id", faction_id)
+            controlled[faction_id].add(city_id)
+            self.dirty_faction_ids.add(faction_id)
+            self.dirty_city_ids.add(city_id)
+        for city_id in dict.fromkeys(city_id for city_id, _ in city_faction_pairs):
+            self._refresh_contested_city(city_id)
+
+    # --- Income ledger ---
+
+    def _move_city_income(self, city, from_faction_id: Optional[str], to_faction_id: Optional[str]):
+        # Moves the city's yield from one faction's ledger entry to another's (either may be None), and
+        # the city with its yield from one faction's region stats to the other's.
+        if from_faction_id == to_faction_id:
+            return
+        gold, food, manpower = city_yield(city)
+        self._add_region_stats(city.region_id, from_faction_id, RegionStats(-1, 0, 0, -gold, -food, -manpower))
+        self._add_region_stats(city.region_id, to_faction_id, RegionStats(1, 0, 0, gold, food, manpower))
+        ledger = self.faction_income
+        self._journal_container(ledger)
+        if from_faction_id in ledger:
+            old_gold, old_food, old_manpower = ledger[from_faction_id]
+            ledger[from_faction_id] = (old_gold - gold, old_food - food, old_manpower - manpower)
+        if to_faction_id in ledger:
+            old_gold, old_food, old_manpower = ledger[to_faction_id]
+            ledger[to_faction_id] = (old_gold + gold, old_food + food, old_manpower + manpower)
+
+    def _set_city_output(self, city_id: str, attr: str, value: int) -> str:
+        city = self.game_map.get_city(city_id)
+        if not city:
+            return f"Error: City with ID '{city_id}' not found."
+        if value < 0:
+            return f"Error: {attr.capitalize()} cannot be negative."
+        owner = city.current_owner_faction_id
+        self._move_city_income(city, owner, None)
+        city = self._writable_city(city_id)
+        self._set(city, attr, value)
+        self._move_city_income(city, None, owner)
+        self.dirty_city_ids.add(city_id)
+        return f"City {city.name} {attr} set to {value}."
+
+    def set_city_economy(self, city_id: str, economy: int) -> str:
+        return self._set_city_output(city_id, "economy", economy)
+
+    def set_city_population(self, city_id: str, population: int) -> str:
+        return self._set_city_output(city_id, "population", population)
+
+    def set_city_terrain(self, city_id: str, terrain_type: TerrainType) -> str:
+        # Terrain is saved with the city, so it changes here (marked dirty for snapshot deltas, journaled)
+        # rather than through GameMap.set_city_terrain, which is for building maps.
+        city = self.game_map.get_city(city_id)
+        if not city:
+            return f"Error: City with ID '{city_id}' not found."
+        if city.terrain_type != terrain_type:
+            if self.journal is not None:
+                self.journal.record(self.game_map._replace_route_caches)  # undone after the terrain itself
+            self._set(self._writable_city(city_id), "terrain_type", terrain_type)
+            self.game_map._replace_route_caches()
+            self.dirty_city_ids.add(city_id)
+        return f"City {city.name} terrain set to {terrain_type.value}."
+
+    def rebuild_income_ledger(self):
+        # Recomputes faction_income from the cities (after restoring a snapshot).
+        ledger = {faction_id: [0, 0, 0] for faction_id in self.factions}
+        for city in self.game_map.cities.values():
+            totals = ledger.get(city.current_owner_faction_id)
+            if totals is not None:
+                gold, food, manpower = city_yield(city)
+                totals[0] += gold
+                totals[1] += food
+                totals[2] += manpower
+        self.faction_income = {faction_id: tuple(totals) for faction_id, totals in ledger.items()}
+
+    def add_unit_rows(self, rows: List[Tuple]):
+        # Bulk add_army_unit + place_unit_in_city. Rows are in UnitTable.row_values order:
+        # (unit_id, unit_type_id, base_attack, base_defense, owning_faction_id, soldiers, max_soldiers, morale,
+        #  leading_general_id, current_location_city_id).
+        cities = self.game_map.cities
+        unknown_factions = {row[4] for row in rows if row[4] is not None and row[4] not in self.factions}
+        unknown_generals = {row[8] for row in rows if row[8] is not None and row[8] not in self.generals}
+        unknown_cities = {row[9] for row in rows if row[9] is not None and row[9] not in cities}
+        if unknown_factions or unknown_generals or unknown_cities:
+            raise ValueError(f"Units reference unknown factions {sorted(unknown_factions)[:5]}, "
+                             f"generals {sorted(unknown_generals)[:5]} or cities {sorted(unknown_cities)[:5]}")
+        try:
+            self.army_units.extend_rows(rows)
+        except KeyError as error:
+            raise ValueError(str(error)) from None
+        presence: Dict[str, Dict[Optional[str], int]] = {}
+        region_soldiers: Dict[Tuple[str, str], List[int]] = {}
+        armies = {faction_id: self._writable(self.factions[faction_id], "army_units_list_ids")
+                  for faction_id in dict.fromkeys(row[4] for row in rows) if faction_id is not None}
+        garrisons = {city_id: self._writable_garrison(city_id) for city_id in dict.fromkeys(row[9] for row in rows) if city_id is not None}
+        for row in rows:
+            unit_id, faction_id, city_id = row[0], row[4], row[9]
+            if faction_id is not None:
+                armies[faction_id].add(unit_id)
+            if city_id is not None:
+                garrisons[city_id].add(unit_id)
+                city_presence = presence.setdefault(city_id, {})
+                city_presence[faction_id] = city_presence.get(faction_id, 0) + 1
+                totals = region_soldiers.setdefault((cities[city_id].region_id, faction_id), [0, 0])
+                totals[0] += 1
+                totals[1] += row[5]
+        self.dirty_faction_ids.update(armies)
+        self.dirty_city_ids.update(presence)
+        for city_id, faction_counts in presence.items():
+            counts = self._writable_counts(city_id)
+            new_faction_present = False
+            for faction_id, count in faction_counts.items():
+                previous = counts.get(faction_id, 0)
+                counts[faction_id] = previous + count
+                new_faction_present = new_faction_present or previous == 0
+            # More units of factions already present cannot change whether the city is contested.
+            if new_faction_present:
+                self._refresh_contested_city(city_id)
+        for (region_id, faction_id), (units, soldiers) in region_soldiers.items():
+            self._add_region_stats(region_id, faction_id, RegionStats(units=units, soldiers=soldiers))
+
+    def _track_unit_presence(self, city_id: str, faction_id: Optional[str], delta: int):
+        # Every garrison change goes through here, so it is also where cities are marked dirty.
+        self.dirty_city_ids.add(city_id)
+        counts = self._writable_counts(city_id)
+        new_count = counts.get(faction_id, 0) + delta
+        if new_count > 0:
+            counts[faction_id] = new_count
+        else:
+            counts.pop(faction_id, None)
+        self._refresh_contested_city(city_id)
+
+    def _is_city_contested(self, city_id: str) -> bool:
+        city = self.game_map.get_city(city_id)
+        owner_id = city.current_owner_faction_id if city else None
+        if not owner_id:
+            return False
+        return any(fid != owner_id and self.is_at_war(owner_id, fid) for fid in self._city_faction_unit_counts.get(city_id, ()))
+
+    def _refresh_contested_city(self, city_id: str):
+        contested = self._is_city_contested(city_id)
+        if contested != (city_id in self.contested_city_ids):
+            contested_city_ids = self._writable_index(self, "contested_city_ids")
+            self._journal_container(contested_city_ids)
+            if contested:
+                contested_city_ids.add(city_id)
+            else:
+                contested_city_ids.discard(city_id)
+
+    def rebuild_unit_presence_counts(self):
+        # Recomputes the per-city faction unit counts from the unit table (after restoring a snapshot).
+        table = self.army_units
+        live_rows = list(table._row_by_id.values())
+        if table.dead_rows:
+            pairs = Counter((table.city_codes[row], table.faction_codes[row]) for row in live_rows)
+        else:
+            pairs = Counter(zip(table.city_codes, table.faction_codes))
+        self._city_faction_unit_counts = {}
+        for (city_code, faction_code), count in pairs.items():
+            if city_code != NO_CODE:
+                counts = self._city_faction_unit_counts.setdefault(table.cities.lookup(city_code), {})
+                counts[table.factions.lookup(faction_code)] = count
+
+    # --- Region index ---
+
+    def _add_region_stats(self, region_id: str, faction_id: Optional[str], delta: RegionStats):
+        if faction_id is None:
+            return
+        stats = self._writable_region(region_id)
+        current = stats.get(faction_id)
+        updated = RegionStats._make(map(add, current, delta)) if current is not None else delta
+        if any(updated):
+            stats[faction_id] = updated
+        else:
+            del stats[faction_id]
+
+    def _move_region_units(self, faction_id: Optional[str], from_region_id: Optional[str], to_region_id: str, soldiers: int):
+        # One unit with its soldiers moves between regions; from_region_id is None for a unit that was in no city.
+        if from_region_id == to_region_id:
+            return
+        if from_region_id is not None:
+            self._add_region_stats(from_region_id, faction_id, RegionStats(units=-1, soldiers=-soldiers))
+        self._add_region_stats(to_region_id, faction_id, RegionStats(units=1, soldiers=soldiers))
+
+    def _track_soldier_losses(self, region_id: str, losses: Dict[str, int]):
+        # Battle casualties per faction in one region; the destroyed units themselves leave through _remove_unit.
+        for faction_id, lost in losses.items():
+            if lost:
+                self._add_region_stats(region_id, faction_id, RegionStats(soldiers=-lost))
+
+    def _computed_region_stats(self) -> Dict[str, Dict[str, RegionStats]]:
+        totals: Dict[str, Dict[str, List[int]]] = {}
+        cities = self.game_map.cities
+        for city in cities.values():
+            if city.current_owner_faction_id is not None:
+                entry = totals.setdefault(city.region_id, {}).setdefault(city.current_owner_faction_id, [0] * len(RegionStats._fields))
+                gold, food, manpower = city_yield(city)
+                entry[0] += 1
+                entry[3] += gold
+                entry[4] += food
+                entry[5] += manpower
+        table = self.army_units
+        for row in table._row_by_id.values():
+            city = cities.get(table.cities.lookup(table.city_codes[row]))
+            faction_id = table.factions.lookup(table.faction_codes[row])
+            if city is not None and faction_id is not None:
+                entry = totals.setdefault(city.region_id, {}).setdefault(faction_id, [0] * len(RegionStats._fields))
+                entry[1] += 1
+                entry[2] += table.soldiers[row]
+        return {region_id: {faction_id: RegionStats._make(entry) for faction_id, entry in stats.items() if any(entry)}
+                for region_id, stats in totals.items()}
+
+    def rebuild_region_stats(self):
+        # Recomputes region_stats from the cities and the unit table (after restoring a snapshot).
+        self.region_stats = self._computed_region_stats()
+
+    # Region queries cost one dict lookup per region (get_region_totals: one entry per faction present there)
+    # whatever the number of cities and units, so the AI and the summaries can call them freely.
+
+    def get_region_stats(self, region_id: str, faction_id: str) -> RegionStats:
+        return self.region_stats.get(region_id, {}).get(faction_id, NO_REGION_STATS)
+
+    def get_region_factions(self, region_id: str) -> Dict[str, RegionStats]:
+        # faction_id -> RegionStats for every faction owning a city or keeping units in the region.
+        return dict(self.region_stats.get(region_id, {}))
+
+    def get_region_totals(self, region_id: str) -> RegionStats:
+        # Sums over the factions in the region; unowned cities and units of no faction are not counted.
+        stats = self.region_stats.get(region_id)
+        if not stats:
+            return NO_REGION_STATS
+        return RegionStats._make(map(sum, zip(*stats.values())))
+
+    def get_region_ownership_share(self, region_id: str, faction_id: str) -> float:
+        # Share of the region's cities (owned or not) that the faction owns, in [0, 1].
+        region_city_ids = self.game_map.regions.get(region_id)
+        if not region_city_ids:
+            return 0.0
+        return self.get_region_stats(region_id, faction_id).cities / len(region_city_ids)
+
+    # --- Transactions and forks ---
+    # begin() starts recording an undo journal of every change made through GameState methods and ArmyUnit
+    # setters; rollback() undoes them newest first, commit() keeps them. Transactions nest. fork() returns a
+    # copy-on-write GameState: it shares cities, generals, unit columns, id sets, diplomacy and the game-wide
+    # indexes with this one, and each side copies an object or index only when it first changes it. Rollback
+    # costs time proportional to what changed; a fork costs O(factions + ids changed since the last snapshot),
+    # plus one copy of each game-wide index (e.g. the city dict) that a side goes on to change.
+    # Not covered: adding factions, the event log, and the random number generators, which keep advancing so
+    # repeated lookaheads do not replay the same dice. Terrain changes go through set_city_terrain; other map
+    # edits (cities, roads) raise RuntimeError while a transaction is open or forks share the map.
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.journal is not None
+
+    def begin(self):
+        if self.journal is None:
+            self.journal = UndoJournal()
+            self.army_units.journal = self.journal
+            self.army_units._update_barrier()
+        self.journal.begin()
+
+    def commit(self):
+        if self.journal is None:
+            raise RuntimeError("commit() without begin().")
+        self.journal.commit()
+        if not self.journal.depth:
+            self._close_journal()
+
+    def rollback(self) -> int:
+        # Returns the number of journal entries undone.
+        if self.journal is None:
+            raise RuntimeError("rollback() without begin().")
+        undone = self.journal.rollback()
+        self._stats_cache.clear()
+        self._invalidate_views()
+        if not self.journal.depth:
+            self._close_journal()
+        return undone
+
+    def _invalidate_views(self):
+        # For changes made without the write helpers below (journal rollback), which cannot tell what changed.
+        for kind in self.entity_versions:
+            self.entity_versions[kind] += 1
+        self.army_units.version += 1
+
+    def _close_journal(self):
+        self.journal = None
+        self.army_units.journal = None
+        self.army_units._update_barrier()
+
+    def fork(self) -> "GameState":
+        # The fork logs no events; give it a sink with set_event_sink if needed.
+        if self.journal is not None:
+            raise RuntimeError("Commit or roll back the open transaction before forking.")
+        child = copy.copy(self)
+        child.game_map = copy.copy(self.game_map)
+        child.game_map._game_ref = weakref.ref(child)
+        child.generals = dict(self.generals)
+        child.army_units = self.army_units.fork()
+        child.diplomacy = self.diplomacy.copy()
+        child.factions = {}
+        for faction_id, faction in self.factions.items():
+            # Faction scalars are copied right away (there are few factions); their id sets stay shared.
+            faction_copy = copy.copy(faction)
+            faction_copy.diplomatic_relations = FactionRelationsView(child.diplomacy, faction_id)
+            child.factions[faction_id] = faction_copy
+        # The city dict, unit destinations, contested cities, presence counts and region stats stay shared
+        # until each side first changes them (see _writable_index).
+        child.faction_income = dict(self.faction_income)
+        child._stats_cache = {}
+        child.dirty_city_ids = set(self.dirty_city_ids)
+        child.dirty_faction_ids = set(self.dirty_faction_ids)
+        child.dirty_general_ids = set(self.dirty_general_ids)
+        child.entity_versions = dict(self.entity_versions)
+        child.view_cache = None
+        child.event_sink = NullEventSink()
+        child.profiler = None
+        child.replay_log = None
+        child._owned = {}
+        child._forks = None
+        child._is_fork = True
+        if self._forks is None:
+            self._forks = weakref.WeakSet()
+        self._forks.add(child)
+        self._owned = {}
+        return child
+
+    def map_edit_blocker(self) -> Optional[str]:
+        # Why the map cannot be edited now, or None (see GameMap._check_editable).
+        if self.journal is not None:
+            return "a transaction is open"
+        if self._is_fork:
+            return "it belongs to a fork, which shares cities and roads with its parent"
+        if self._forks:
+            return "forks of this game share its cities and roads"
+        return None
+
+    def _owns(self, obj) -> bool:
+        owned = self._owned
+        if owned is None or id(obj) in owned:
+            return True
+        if not self._is_fork and not self._forks:
+            # Every fork of this state is gone, so nothing is shared any more.
+            self._owned = None
+            return True
+        return False
+
+    def _take(self, obj):
+        self._owned[id(obj)] = obj
+        return obj
+
+    def _set(self, obj, attr: str, value):
+        # setattr on an object this state owns, recorded in the journal.
+        if self.journal is not None:
+            self.journal.record(setattr, obj, attr, getattr(obj, attr))
+        setattr(obj, attr, value)
+
+    def _journal_container(self, container):
+        if self.journal is not None:
+            self.journal.save_container(container)
+
+    def _writable(self, owner, attr: str):
+        # owner.attr (an id set or dict) ready to be changed: copied if still shared, saved for rollback.
+        container = getattr(owner, attr)
+        self.entity_versions["factions"] += 1  # only factions' id sets are changed through here
+        if not self._owns(container):
+            container = self._take(container.copy())
+            setattr(owner, attr, container)
+        self._journal_container(container)
+        return container
 
-    def display_summary(self):
+    def _writable_index(self, owner, attr: str):
+        # A game-wide index (owner.attr) shared with forks: copied the first time this side changes it.
+        container = getattr(owner, attr)
+        if not self._owns(container):
+            container = self._take(container.copy())
+            setattr(owner, attr, container)
+        return container
+
+    def _writable_destinations(self) -> Dict[str, str]:
+        destinations = self._writable_index(self, "unit_destinations")
+        self._journal_container(destinations)
+        return destinations
+
+    def _writable_city(self, city_id: str):
+        city = self.game_map.cities[city_id]
+        self.entity_versions["cities"] += 1
+        if not self._owns(city):
+            city = self._take(copy.copy(city))
+            city.garrisoned_units = self._take(city.garrisoned_units.copy())
+            self._writable_index(self.game_map, "cities")[city_id] = city
+        return city
+
+    def _writable_garrison(self, city_id: str) -> OrderedIdSet:
+        garrison = self._writable_city(city_id).garrisoned_units
+        self._journal_container(garrison)
+        return garrison
+
+    def _writable_general(self, general_id: str):
+        general = self.generals[general_id]
+        self.entity_versions["generals"] += 1
+        if not self._owns(general):
+            general = self.generals[general_id] = self._take(copy.copy(general))
+        return general
+
+    def _writable_counts(self, city_id: str) -> Dict[Optional[str], int]:
+        all_counts = self._writable_index(self, "_city_faction_unit_counts")
+        counts = all_counts.get(city_id)
+        if counts is None:
+            counts = all_counts[city_id] = {}
+            if self._owned is not None:
+                self._take(counts)
+            if self.journal is not None:
+                self.journal.record(all_counts.pop, city_id)
+            return counts
+        if not self._owns(counts):
+            counts = all_counts[city_id] = self._take(dict(counts))
+        self._journal_container(counts)
+        return counts
+
+    def _writable_region(self, region_id: str) -> Dict[str, RegionStats]:
+        all_stats = self._writable_index(self, "region_stats")
+        stats = all_stats.get(region_id)
+        if stats is None:
+            stats = all_stats[region_id] = {}
+            if self._owned is not None:
+                self._take(stats)
+            if self.journal is not None:
+                self.journal.record(all_stats.pop, region_id)
+            return stats
+        if not self._owns(stats):
+            stats = all_stats[region_id] = self._take(dict(stats))
+        self._journal_container(stats)
+        return stats
+
+    def verify_indexes(self) -> List[str]:
+        problems = []
+        for unit_id, unit in self.army_units.items():
+            faction = self.factions.get(unit.owning_faction_id) if unit.owning_faction_id else None
+            if faction and unit_id not in faction.army_units_list_ids:
+                problems.append(f"Unit {unit_id} missing from army index of faction {unit.owning_faction_id}.")
+            city = self.game_map.get_city(unit.current_location_city_id) if unit.current_location_city_id else None
+            if city and unit_id not in city.garrisoned_units:
+                problems.append(f"Unit {unit_id} missing from garrison index of city {city.city_id}.")
+        for city_id, city in self.game_map.cities.items():
+            for unit_id in city.garrisoned_units:
+                unit = self.army_units.get(unit_id)
+                if not unit or unit.current_location_city_id != city_id:
+                    problems.append(f"City {city_id} garrison lists unit {unit_id} which is not located there.")
+            present_counts: Dict[str, int] = {}
+            for unit_id in city.garrisoned_units:
+                unit = self.army_units.get(unit_id)
+                if unit:
+                    present_counts[unit.owning_faction_id] = present_counts.get(unit.owning_faction_id, 0) + 1
+            if present_counts != self._city_faction_unit_counts.get(city_id, {}):
+                problems.append(f"City {city_id} faction presence counts {self._city_faction_unit_counts.get(city_id, {})} do not match garrison {present_counts}.")
+            if self._is_city_contested(city_id) != (city_id in self.contested_city_ids):
+                problems.append(f"City {city_id} contested flag is out of date.")
+        for faction_id, faction in self.factions.items():
+            for unit_id in faction.army_units_list_ids:
+                unit = self.army_units.get(unit_id)
+                if not unit or unit.owning_faction_id != faction_id:
+                    problems.append(f"Faction {faction_id} army index lists unit {unit_id} which it does not own.")
+            for city_id in faction.controlled_cities_ids:
+                city = self.game_map.get_city(city_id)
+                if not city or city.current_owner_faction_id != faction_id:
+                    problems.append(f"Faction {faction_id} city index lists city {city_id} which it does not control.")
+            for general_id in faction.generals_list_ids:
+                general = self.generals.get(general_id)
+                if not general or general.faction_id != faction_id:
+                    problems.append(f"Faction {faction_id} general index lists general {general_id} which it does not own.")
+            expected_income = [0, 0, 0]
+            for city_id in faction.controlled_cities_ids:
+                city = self.game_map.get_city(city_id)
+                if city:
+                    expected_income = [total + amount for total, amount in zip(expected_income, city_yield(city))]
+            if tuple(expected_income) != self.faction_income.get(faction_id):
+                problems.append(f"Faction {faction_id} income ledger {self.faction_income.get(faction_id)} does not match its cities {tuple(expected_income)}.")
+        expected_regions = self._computed_region_stats()
+        for region_id in dict.fromkeys(itertools.chain(expected_regions, self.region_stats)):
+            stats = self.region_stats.get(region_id, {})
+            if stats != expected_regions.get(region_id, {}):
+                problems.append(f"Region {region_id} stats {stats} do not match its cities and units {expected_regions.get(region_id, {})}.")
+        return problems
+
+    def display_summary(self, page_size: Optional[int] = None, page: int = 1):
+        # page_size None lists every entity; otherwise each section shows that page (see views.py).
         print(f"--- Game State: Turn {self.current_turn} ---")
         print(f"Map: {self.game_map.map_id} with {len(self.game_map.cities)} cities.")
         if self.player_faction_id:
             player_faction = self.factions.get(self.player_faction_id)
             if player_faction:
                  print(f"Player is controlling: {player_faction.name}")
-        print("\nFactions:")
-        for faction_id, faction_obj in self.factions.items():
-            print(f"- {faction_obj.name} (ID: {faction_id}), Capital: {faction_obj.capital_city_id or 'N/A'}, Treasury: {faction_obj.treasury}")
-        print("\nCities:")
-        for city_id, city_obj in self.game_map.cities.items():
-            owner_name = "Unowned"
-            if city_obj.current_owner_faction_id and city_obj.current_owner_faction_id in self.factions:
-                owner_name = self.factions[city_obj.current_owner_faction_id].short_name
-            garrison_count = len(city_obj.garrisoned_units)
-            print(f"- {city_obj.name} (ID: {city_id}), Owner: {owner_name}, Garrison: {garrison_count} units")
-        print("\nGenerals:")
-        for general_id, general_obj in self.generals.items():
-            print(f"- {general_obj.name} (ID: {general_id}), Faction: {general_obj.faction_id or 'N/A'}, Location: {general_obj.current_location_city_id or 'Field'}, CMD:{general_obj.command} ATK:{general_obj.attack_skill} DEF:{general_obj.defense_skill}")
-        print("\nArmy Units:")
-        for unit_id, unit_obj in self.army_units.items():
-            print(f"- {str(unit_obj)}")
+        for kind, title in SECTION_TITLES.items():
+            print(f"\n{title}:")
+            for line in section_lines(self, kind, page, page_size):
+                print(line)
 
     def get_city_details_str(self, city_id: str) -> str:
         city = self.game_map.get_city(city_id)
@@ -148,6 +905,24 @@ class GameState:
         details.append(f"Adjacent Cities: {adj_str}")
         return "\n".join(details)
 
+    def get_region_details_str(self, region_id: str) -> str:
+        region_city_ids = self.game_map.regions.get(region_id)
+        if not region_city_ids:
+            return f"Error: Region with ID '{region_id}' not found."
+        totals = self.get_region_totals(region_id)
+        details = [f"--- Region Details: {region_id} ---"]
+        details.append(f"Cities: {len(region_city_ids)} ({len(region_city_ids) - totals.cities} unowned)")
+        details.append(f"Income per Turn: {totals.gold} gold, {totals.food} food, {totals.manpower} manpower")
+        details.append(f"Units: {totals.units}, Soldiers: {totals.soldiers}")
+        faction_lines = []
+        for faction_id, stats in self.region_stats.get(region_id, {}).items():
+            faction = self.factions.get(faction_id)
+            name = faction.short_name if faction else faction_id
+            faction_lines.append(f"  - {name}: {stats.cities} cities ({stats.cities / len(region_city_ids):.0%}), "
+                                 f"{stats.units} units, {stats.soldiers} soldiers, income {stats.gold} gold, {stats.food} food, {stats.manpower} manpower")
+        details.append("Factions: " + ("\n" + "\n".join(faction_lines) if faction_lines else "None"))
+        return "\n".join(details)
+
     def get_general_details_str(self, general_id: str) -> str:
         general = self.generals.get(general_id)
         if not general:
@@ -173,7 +948,7 @@ class GameState:
         details.append(f"Current Location: {location_name}")
         return "\n".join(details)
 
-    def get_faction_details_str(self, faction_id: str) -> str:
+    def get_faction_details_str(self, faction_id: str, unit_limit: int = DEFAULT_PAGE_SIZE) -> str:
         faction = self.factions.get(faction_id)
         if not faction:
             return f"Error: Faction with ID '{faction_id}' not found."
@@ -194,20 +969,26 @@ class GameState:
         details.append(f"Treasury: {faction.treasury}")
         details.append(f"Food Reserves: {faction.food_reserves}")
         details.append(f"Manpower Pool: {faction.manpower_pool}")
+        gold, food, manpower = self.faction_income.get(faction_id, (0, 0, 0))
+        details.append(f"Income per Turn: {gold} gold, {food} food, {manpower} manpower")
         controlled_cities_str = "None"
         if faction.controlled_cities_ids:
-            city_names = [self.game_map.get_city(c_id).name if self.game_map.get_city(c_id) else c_id for c_id in faction.controlled_cities_ids]
-            controlled_cities_str = ", ".join(city_names)
+            cities = self.game_map.cities
+            controlled_cities_str = ", ".join(city.name if (city := cities.get(c_id)) else c_id for c_id in faction.controlled_cities_ids)
         details.append(f"Controlled Cities: {controlled_cities_str}")
         generals_str = "None"
         if faction.generals_list_ids:
-            general_names = [self.generals.get(g_id).name if self.generals.get(g_id) else g_id for g_id in faction.generals_list_ids]
-            generals_str = ", ".join(general_names)
+            generals_str = ", ".join(general.name if (general := self.generals.get(g_id)) else g_id for g_id in faction.generals_list_ids)
         details.append(f"Generals: {generals_str}")
         army_units_str = "None"
-        if faction.army_units_list_ids:
-            unit_descs = [str(self.army_units.get(u_id)) if self.army_units.get(u_id) else u_id for u_id in faction.army_units_list_ids]
-            army_units_str = "\n  - " + "\n  - ".join(unit_descs) if unit_descs else "None"
+        unit_count = len(faction.army_units_list_ids)
+        if unit_count:
+            # Only the first units are listed; the summary units view pages through the rest.
+            unit_descs = [str(unit) if (unit := self.army_units.get(u_id)) else u_id
+                          for u_id in itertools.islice(faction.army_units_list_ids, unit_limit)]
+            army_units_str = "\n  - " + "\n  - ".join(unit_descs)
+            if unit_count > len(unit_descs):
+                army_units_str += f"\n  ... {unit_count - len(unit_descs)} more; see 'summary units faction {faction_id}'"
         details.append(f"Army Units: {army_units_str}")
         return "\n".join(details)
 
@@ -234,14 +1015,64 @@ class GameState:
             return f"Error: Unit {unit_id} ({unit.unit_type_id}) is already in {target_city.name}."
         if not self.game_map.are_adjacent(current_city_id, target_city_id):
             return f"Error: Unit {unit_id} ({unit.unit_type_id}) cannot move from {current_city_obj.name} to {target_city.name}. Cities are not adjacent."
-        if unit_id in current_city_obj.garrisoned_units:
-            current_city_obj.garrisoned_units.remove(unit_id)
+        self._writable_garrison(current_city_id).discard(unit_id)
+        self._track_unit_presence(current_city_id, unit.owning_faction_id, -1)
         unit.current_location_city_id = target_city_id
-        if unit_id not in target_city.garrisoned_units:
-            target_city.garrisoned_units.append(unit_id)
+        self._writable_garrison(target_city_id).add(unit_id)
+        self._invalidate_unit_stats(unit_id)
+        self._track_unit_presence(target_city_id, unit.owning_faction_id, 1)
+        self._move_region_units(unit.owning_faction_id, current_city_obj.region_id, target_city.region_id, unit.soldiers)
         moved_by_str = self.factions[controller_faction_id].short_name if controller_faction_id in self.factions else controller_faction_id
         return f"Unit {unit_id} ({unit.unit_type_id}) successfully moved from {current_city_obj.name} to {target_city.name} by {moved_by_str}."
 
+    def _movement_type_of(self, unit: ArmyUnit) -> UnitMovementType:
+        return UNIT_MOVEMENT_TYPES.get(unit.unit_type_id, UnitMovementType.FOOT)
+
+    def march_unit(self, unit_id: str, target_city_id: str, acting_faction_id: Optional[str] = None) -> str:
+        # Like move_unit, but the target may be any reachable city: the unit takes the first hop of the
+        # cheapest route now and keeps marching one hop per turn until it arrives.
+        unit = self.army_units.get(unit_id)
+        if not unit:
+            return f"Error: Unit with ID '{unit_id}' not found."
+        target_city = self.game_map.get_city(target_city_id)
+        if not target_city:
+            return f"Error: Target city with ID '{target_city_id}' not found."
+        current_city_id = unit.current_location_city_id
+        if not current_city_id or current_city_id == target_city_id or self.game_map.are_adjacent(current_city_id, target_city_id):
+            if unit_id in self.unit_destinations:
+                del self._writable_destinations()[unit_id]
+            return self.move_unit(unit_id, target_city_id, acting_faction_id)
+        path = self.game_map.find_path(current_city_id, target_city_id, self._movement_type_of(unit))
+        if not path:
+            return f"Error: Unit {unit_id} ({unit.unit_type_id}) has no route from {current_city_id} to {target_city.name}."
+        move_result = self.move_unit(unit_id, path[1], acting_faction_id)
+        if move_result.startswith("Error"):
+            return move_result
+        self._writable_destinations()[unit_id] = target_city_id
+        route_names = " -> ".join(self.game_map.cities[city_id].name for city_id in path[1:])
+        return f"{move_result} Marching on to {target_city.name} via {route_names} ({len(path) - 2} more turn(s))."
+
+    def _advance_marching_units(self):
+        destinations = self._writable_destinations()
+        sink = self.event_sink
+        for unit_id, destination_id in list(destinations.items()):
+            unit = self.army_units.get(unit_id)
+            if not unit or not unit.current_location_city_id:
+                del destinations[unit_id]
+                continue
+            from_city_id = unit.current_location_city_id
+            hop_city_id = self.game_map.next_hop(from_city_id, destination_id, self._movement_type_of(unit))
+            if hop_city_id is None:
+                del destinations[unit_id]
+                if sink.enabled:
+                    sink.emit((EventType.UNIT_MARCH_HALTED, self.current_turn, unit_id, from_city_id, destination_id))
+                continue
+            move_result = self.move_unit(unit_id, hop_city_id, acting_faction_id=unit.owning_faction_id)
+            if hop_city_id == destination_id or move_result.startswith("Error"):
+                del destinations[unit_id]
+            if sink.enabled:
+                sink.emit((EventType.UNIT_MARCHED, self.current_turn, unit_id, from_city_id, hop_city_id, destination_id, move_result))
+
     def develop_building_in_city(self, city_id: str, building_type: str) -> str:
         city = self.game_map.get_city(city_id)
         if not city:
@@ -250,34 +1081,56 @@ class GameState:
             return f"Error: Building type '{building_type}' is not allowed. Allowed types: {', '.join(self.allowed_building_types)}"
         return f"{city.name} has started development of {building_type}. (Note: This is a prototype, actual construction not yet implemented.)"
 
-    def recruit_unit(self, unit_type_str: str, city_id: str, general_id_str: Optional[str] = None) -> str:
+    def _check_recruitment(self, faction_id: Optional[str], unit_type_str: str, city_id: str, general_id_str: Optional[str]):
+        # Returns an error message, or (faction, city, unit_type) when faction_id may recruit that unit
+        # type in city_id, led by general_id_str if given.
         city = self.game_map.get_city(city_id)
         if not city:
             return f"Error: City with ID '{city_id}' not found for recruitment."
-        player_faction = self.factions.get(self.player_faction_id)
-        if not player_faction or city.current_owner_faction_id != self.player_faction_id:
-            return f"Error: City {city.name} is not controlled by your faction ({self.player_faction_id})."
-        if city_id != player_faction.capital_city_id:
-            capital_name = self.game_map.get_city(player_faction.capital_city_id).name if player_faction.capital_city_id and self.game_map.get_city(player_faction.capital_city_id) else 'N/A'
+        faction = self.factions.get(faction_id)
+        if not faction or city.current_owner_faction_id != faction_id:
+            return f"Error: City {city.name} is not controlled by your faction ({faction_id})."
+        if city_id != faction.capital_city_id:
+            capital_name = self.game_map.get_city(faction.capital_city_id).name if faction.capital_city_id and self.game_map.get_city(faction.capital_city_id) else 'N/A'
             return f"Error: Units can currently only be recruited in your capital city ({capital_name})."
         unit_type_enum = UnitType.from_string(unit_type_str)
         if not unit_type_enum:
             allowed_types_list = [ut.type_id for ut in UnitType if ut not in [UnitType.FLEET_CHANNEL, UnitType.INFANTRY_DIVISION]] 
             return f"Error: Invalid unit type '{unit_type_str}'. Allowed types: {', '.join(allowed_types_list)}"
-        soldiers = unit_type_enum.default_soldiers
-        base_atk = unit_type_enum.base_attack
-        base_def = unit_type_enum.base_defense
-        new_unit_id = f"{self.player_faction_id}_unit_{len(self.army_units) + sum(1 for u in self.army_units.values() if u.owning_faction_id == self.player_faction_id) + 1}"
-        assigned_general_id = None
         if general_id_str:
             general_to_assign = self.generals.get(general_id_str)
             if not general_to_assign:
                 return f"Error: General with ID '{general_id_str}' not found."
-            if general_to_assign.faction_id != self.player_faction_id:
+            if general_to_assign.faction_id != faction_id:
                 return f"Error: General {general_to_assign.name} does not belong to your faction."
             if general_to_assign.current_location_city_id != city_id:
                 return f"Error: General {general_to_assign.name} is not in {city.name} to lead the new unit."
-            assigned_general_id = general_id_str
+        return faction, city, unit_type_enum
+
+    def _allocate_unit_ids(self, faction: Faction, count: int) -> List[str]:
+        # The faction's next `count` unit ids. The counter only grows, so ids of destroyed units are not
+        # handed out again; numbers already taken (e.g. by scenario units) are skipped.
+        number = faction.next_unit_number
+        unit_ids = []
+        while len(unit_ids) < count:
+            unit_id = f"{faction.faction_id}_unit_{number}"
+            if unit_id not in self.army_units:
+                unit_ids.append(unit_id)
+            number += 1
+        self._set(faction, "next_unit_number", number)
+        self.dirty_faction_ids.add(faction.faction_id)
+        return unit_ids
+
+    def recruit_unit(self, unit_type_str: str, city_id: str, general_id_str: Optional[str] = None) -> str:
+        checked = self._check_recruitment(self.player_faction_id, unit_type_str, city_id, general_id_str)
+        if isinstance(checked, str):
+            return checked
+        player_faction, city, unit_type_enum = checked
+        soldiers = unit_type_enum.default_soldiers
+        base_atk = unit_type_enum.base_attack
+        base_def = unit_type_enum.base_defense
+        new_unit_id = self._allocate_unit_ids(player_faction, 1)[0]
+        assigned_general_id = general_id_str or None
         new_unit = ArmyUnit(unit_id=new_unit_id, unit_type_id=unit_type_enum.type_id, 
                             base_attack=base_atk, base_defense=base_def,
                             owning_faction_id=self.player_faction_id, soldiers=soldiers, 
@@ -289,6 +1142,26 @@ class GameState:
             recruit_msg += f" Led by General {self.generals[assigned_general_id].name}."
         return recruit_msg
 
+    def recruit_units(self, unit_type_str: str, city_id: str, count: int, general_id_str: Optional[str] = None,
+                      acting_faction_id: Optional[str] = None) -> str:
+        # recruit_unit for `count` units at once, for the player or (with acting_faction_id) any faction,
+        # e.g. an AI. The city, capital and general are checked once and the units are added in one batch.
+        faction_id = acting_faction_id if acting_faction_id else self.player_faction_id
+        if count < 1:
+            return f"Error: Cannot recruit {count} units."
+        checked = self._check_recruitment(faction_id, unit_type_str, city_id, general_id_str)
+        if isinstance(checked, str):
+            return checked
+        faction, city, unit_type_enum = checked
+        soldiers = unit_type_enum.default_soldiers
+        unit_ids = self._allocate_unit_ids(faction, count)
+        self.add_unit_rows([(unit_id, unit_type_enum.type_id, unit_type_enum.base_attack, unit_type_enum.base_defense, faction_id,
+                             soldiers, soldiers, 100, general_id_str or None, city_id) for unit_id in unit_ids])
+        recruit_msg = f"Successfully recruited {count} {unit_type_enum.type_id} ({unit_ids[0]} to {unit_ids[-1]}) in {city.name} for {faction.name}."
+        if general_id_str:
+            recruit_msg += f" Led by General {self.generals[general_id_str].name}."
+        return recruit_msg
+
     def set_diplomatic_status(self, faction1_id: str, faction2_id: str, status: DiplomaticStatus, relation_value: int = 0):
         f1 = self.factions.get(faction1_id)
         f2 = self.factions.get(faction2_id)
@@ -297,10 +1170,18 @@ class GameState:
             return
         if faction1_id == faction2_id:
              return
-        f1.diplomatic_relations[faction2_id] = {"status": status, "relation_value": relation_value, "treaties": []}
-        f2.diplomatic_relations[faction1_id] = {"status": status, "relation_value": relation_value, "treaties": []}
+        if self.journal is not None:
+            self.journal.record(self.diplomacy.restore_pair, faction1_id, faction2_id, *self.diplomacy.pair_state(faction1_id, faction2_id))
+        self.diplomacy.set_status(faction1_id, faction2_id, status, relation_value)
+        for owner, other_id in ((f1, faction2_id), (f2, faction1_id)):
+            for city_id in owner.controlled_cities_ids:
+                if other_id in self._city_faction_unit_counts.get(city_id, ()):
+                    self._refresh_contested_city(city_id)
         # print(f"DEBUG: Set diplomacy: {f1.short_name} and {f2.short_name} are now {status.value} (Relation: {relation_value})")
 
+    def is_at_war(self, faction1_id: str, faction2_id: str) -> bool:
+        return self.diplomacy.is_at_war(faction1_id, faction2_id)
+
     def get_diplomacy_summary_str(self, focus_faction_id_param: Optional[str] = None) -> str:
         focus_faction_id = focus_faction_id_param if focus_faction_id_param else self.player_faction_id
         if not focus_faction_id or focus_faction_id not in self.factions:
@@ -341,39 +1222,88 @@ class GameState:
         if declaring_faction_id == target_faction_id:
             return f"Error: Cannot declare war on oneself ({declarer.name})."
 
-        current_relation = declarer.diplomatic_relations.get(target_faction_id)
-        if current_relation and current_relation.get("status") == DiplomaticStatus.WAR:
+        if self.is_at_war(declaring_faction_id, target_faction_id):
             return f"Error: {declarer.name} is already at war with {target.name}."
         
         self.set_diplomatic_status(declaring_faction_id, target_faction_id, DiplomaticStatus.WAR, -100)
         return f"{declarer.name} has declared war on {target.name}! Relations are now {DiplomaticStatus.WAR.value} (-100)."
 
-    def _calculate_effective_stats(self, unit: ArmyUnit, is_defending_in_city: bool) -> Tuple[float, float, float]:
+    def _calculate_stat_multipliers(self, unit: ArmyUnit, is_defending_in_city: bool) -> Tuple[float, float, float]:
         eff_attack = float(unit.base_attack)
         eff_defense = float(unit.base_defense)
-        eff_soldiers_for_attack = float(unit.soldiers)
+        soldier_multiplier = 1.0
         general = self.generals.get(unit.leading_general_id) if unit.leading_general_id else None
         if general:
             eff_attack += general.attack_skill / GENERAL_ATTACK_BONUS_DIVISOR
             eff_defense += general.defense_skill / GENERAL_DEFENSE_BONUS_DIVISOR
-            eff_soldiers_for_attack *= (1 + general.command / GENERAL_COMMAND_EFFICIENCY_DIVISOR)
+            soldier_multiplier = 1 + general.command / GENERAL_COMMAND_EFFICIENCY_DIVISOR
         if is_defending_in_city:
             eff_defense *= CITY_DEFENSE_BONUS_MULTIPLIER
-        return max(1.0, eff_attack), max(1.0, eff_defense), max(1.0, eff_soldiers_for_attack)
+        return max(1.0, eff_attack), max(1.0, eff_defense), soldier_multiplier
 
-    def _resolve_battle_in_city(self, city_obj) -> List[str]:
-        battle_log = []
+    def _cached_stat_multipliers(self, unit: ArmyUnit, is_defending_in_city: bool) -> Tuple[float, float, float]:
+        cache_key = (unit.unit_id, is_defending_in_city)
+        multipliers = self._stats_cache.get(cache_key)
+        if multipliers is None:
+            self.stats_cache_misses += 1
+            multipliers = self._calculate_stat_multipliers(unit, is_defending_in_city)
+            self._stats_cache[cache_key] = multipliers
+        else:
+            self.stats_cache_hits += 1
+        return multipliers
+
+    def _calculate_effective_stats(self, unit: ArmyUnit, is_defending_in_city: bool) -> Tuple[float, float, float]:
+        eff_attack, eff_defense, soldier_multiplier = self._cached_stat_multipliers(unit, is_defending_in_city)
+        return eff_attack, eff_defense, max(1.0, unit.soldiers * soldier_multiplier)
+
+    def _invalidate_unit_stats(self, unit_id: str):
+        self._stats_cache.pop((unit_id, True), None)
+        self._stats_cache.pop((unit_id, False), None)
+
+    def get_stats_cache_info(self) -> Dict[str, int]:
+        return {"hits": self.stats_cache_hits, "misses": self.stats_cache_misses, "size": len(self._stats_cache)}
+
+    def assign_general_to_unit(self, unit_id: str, general_id: Optional[str]) -> str:
+        unit = self.army_units.get(unit_id)
+        if not unit:
+            return f"Error: Unit with ID '{unit_id}' not found."
+        if general_id and general_id not in self.generals:
+            return f"Error: General with ID '{general_id}' not found."
+        unit.leading_general_id = general_id
+        self._invalidate_unit_stats(unit_id)
+        if general_id:
+            return f"Unit {unit_id} is now led by General {self.generals[general_id].name}."
+        return f"Unit {unit_id} no longer has a leading general."
+
+    def set_general_skills(self, general_id: str, command: Optional[int] = None, attack_skill: Optional[int] = None, defense_skill: Optional[int] = None) -> str:
+        general = self.generals.get(general_id)
+        if not general:
+            return f"Error: General with ID '{general_id}' not found."
+        general = self._writable_general(general_id)
+        if command is not None:
+            self._set(general, "command", command)
+        if attack_skill is not None:
+            self._set(general, "attack_skill", attack_skill)
+        if defense_skill is not None:
+            self._set(general, "defense_skill", defense_skill)
+        self.dirty_general_ids.add(general_id)
+        # Skill changes are rare, so drop every cached entry rather than tracking which units each general leads.
+        self._stats_cache.clear()
+        return f"General {general.name} now has CMD:{general.command} ATK:{general.attack_skill} DEF:{general.defense_skill}."
+
+    def _prepare_battle(self, city_obj, announce: bool = True) -> Optional[Tuple[Dict[str, List[ArmyUnit]], str, List[str]]]:
+        sink = self.event_sink
+        log_events = sink.enabled
+        turn = self.current_turn
+        city_id = city_obj.city_id
         present_unit_ids = list(city_obj.garrisoned_units)
         units_in_city = [self.army_units[uid] for uid in present_unit_ids if uid in self.army_units and self.army_units[uid].soldiers > 0]
         if not units_in_city:
-            return battle_log
-        factions_present: Set[str] = set(unit.owning_faction_id for unit in units_in_city)
+            return None
+        factions_present = list(dict.fromkeys(unit.owning_faction_id for unit in units_in_city))  # in garrison order, not hash order
         if len(factions_present) <= 1:
-            return battle_log 
-        battle_log.append(f"\n--- Battle in {city_obj.name} (ID: {city_obj.city_id}, Turn {self.current_turn}) ---")
+            return None
         original_owner_id = city_obj.current_owner_faction_id
-        original_owner_name = self.factions[original_owner_id].short_name if original_owner_id and original_owner_id in self.factions else 'Unowned'
-        battle_log.append(f"  City originally owned by: {original_owner_name}")
         
         units_by_faction: Dict[str, List[ArmyUnit]] = {faction_id: [] for faction_id in factions_present}
         for unit in units_in_city:
@@ -387,83 +1317,81 @@ class GameState:
         # Attackers are those at WAR with the defender and present in the city
         attacker_faction_ids = []
         if defender_faction_id and defender_faction_id in self.factions: # If there is a defender
-            defender_faction_obj = self.factions[defender_faction_id]
             for fid in factions_present:
-                if fid != defender_faction_id and fid in defender_faction_obj.diplomatic_relations and \ 
-                   defender_faction_obj.diplomatic_relations[fid].get("status") == DiplomaticStatus.WAR:
+                if fid != defender_faction_id and self.diplomacy.is_at_war(defender_faction_id, fid):
                     attacker_faction_ids.append(fid)
         elif not defender_faction_id: # Unowned city, all factions present are potential belligerents
-            # Simplification: if unowned, first faction in list becomes temp defender, others attackers IF at war with them
-            # This needs better rules for multi-way battles in neutral/unowned cities.
-            # For now, if unowned, we might skip complex battle or have a simpler free-for-all. 
-            # Let's assume for now: if unowned, first listed faction becomes pseudo-defender, others are attackers.
-            # This isn't great. Let's assume for now battles only trigger if there IS an owner.
-            if not factions_present: # Should be caught by earlier check, but for safety
-                return battle_log
-            # Fallback: if unowned city has multiple factions, they are all hostile to each other for this battle? (too complex for v1)
-            # For now, if city is unowned, any two factions present that are at WAR with each other might fight.
-            # Let's simplify: If unowned, and two factions are present AND at WAR, they fight.
-            # Still, the defender/attacker dynamic is tricky. Defaulting to no battle if unowned for this iteration.
-             battle_log.append(f"  City {city_obj.name} is Unowned. Complex battle resolution for unowned cities not yet implemented. Skipping.")
-             return battle_log
-
-        if not attacker_faction_ids and defender_faction_id: # Defender exists, but no one at WAR with them is present
-            battle_log.append(f"  Units from multiple factions present, but no factions at WAR with owner {original_owner_name}. No battle.")
-            return battle_log
-        if not defender_faction_id and attacker_faction_ids: # Attackers present but city was unowned and we skipped above.
-             battle_log.append(f"  Attackers present in unowned city {city_obj.name}, but battle resolution for this not yet fully defined. Skipping.")
-             return battle_log
-        if not defender_faction_id and not attacker_faction_ids: # Should be caught by len(factions_present) <=1
-            return battle_log
-
-        battle_log.append(f"  Defending Faction: {self.factions[defender_faction_id].short_name if defender_faction_id else 'N/A'}")
-        battle_log.append(f"  Attacking Factions: {[self.factions[fid].short_name for fid in attacker_faction_ids if fid in self.factions]}")
-
-        # Combat Round Logic (as before, but now attackers are only those at WAR with defender)
-        if defender_faction_id and defender_faction_id in units_by_faction:
-            current_defender_units = [u for u in units_by_faction[defender_faction_id] if u.soldiers > 0]
-            all_attacker_units_for_targeting = [u for fid in attacker_faction_ids for u in units_by_faction.get(fid, []) if u.soldiers > 0]
-            if current_defender_units and all_attacker_units_for_targeting:
-                battle_log.append(f"  -- Defender's ({self.factions[defender_faction_id].short_name}) Attack Phase --")
-                for def_unit in current_defender_units:
-                    if not all_attacker_units_for_targeting: break
-                    target_att_unit = random.choice(all_attacker_units_for_targeting)
-                    att_eff, _, soldiers_eff_att = self._calculate_effective_stats(def_unit, True)
-                    _, def_eff_target, _ = self._calculate_effective_stats(target_att_unit, False)
-                    damage_ratio = att_eff / (att_eff + def_eff_target) if (att_eff + def_eff_target) > 0 else 0.5
-                    potential_casualties = soldiers_eff_att * damage_ratio * COMBAT_LATHALITY_FACTOR
-                    actual_casualties = math.ceil(potential_casualties * random.uniform(0.8, 1.2))
-                    actual_casualties = max(1, min(actual_casualties, target_att_unit.soldiers))
-                    battle_log.append(f"    D:{def_unit.unit_id}({def_unit.soldiers}) [EA:{att_eff:.1f} ES:{soldiers_eff_att:.0f}] attacks A:{target_att_unit.unit_id}({target_att_unit.soldiers}) [ED:{def_eff_target:.1f}]")
-                    destroyed = target_att_unit.take_damage(actual_casualties)
-                    battle_log.append(f"      {target_att_unit.unit_id} takes {actual_casualties} casualties. {target_att_unit.soldiers} remain.")
-                    if destroyed:
-                        battle_log.append(f"      Unit {target_att_unit.unit_id} has been destroyed!")
-                        self._remove_unit(target_att_unit.unit_id)
-                        all_attacker_units_for_targeting = [u for u in all_attacker_units_for_targeting if u.unit_id != target_att_unit.unit_id]
-        all_attacker_units_for_attacking = [u for fid in attacker_faction_ids for u in units_by_faction.get(fid, []) if u.unit_id in self.army_units and self.army_units[u.unit_id].soldiers > 0]
-        if all_attacker_units_for_attacking:
-            current_defender_units_for_targeting = [u for u in units_by_faction.get(defender_faction_id, []) if u.unit_id in self.army_units and self.army_units[u.unit_id].soldiers > 0]
-            if current_defender_units_for_targeting:
-                battle_log.append(f"  -- Attackers' ({', '.join([self.factions[fid].short_name for fid in attacker_faction_ids if fid in self.factions])}) Attack Phase --")
-                for att_unit in all_attacker_units_for_attacking:
-                    if not current_defender_units_for_targeting: break
-                    target_def_unit = random.choice(current_defender_units_for_targeting)
-                    att_eff, _, soldiers_eff_att = self._calculate_effective_stats(att_unit, False)
-                    _, def_eff_target, _ = self._calculate_effective_stats(target_def_unit, True)
-                    damage_ratio = att_eff / (att_eff + def_eff_target) if (att_eff + def_eff_target) > 0 else 0.5
-                    potential_casualties = soldiers_eff_att * damage_ratio * COMBAT_LATHALITY_FACTOR
-                    actual_casualties = math.ceil(potential_casualties * random.uniform(0.8, 1.2))
-                    actual_casualties = max(1, min(actual_casualties, target_def_unit.soldiers))
-                    battle_log.append(f"    A:{att_unit.unit_id}({att_unit.soldiers}) [EA:{att_eff:.1f} ES:{soldiers_eff_att:.0f}] attacks D:{target_def_unit.unit_id}({target_def_unit.soldiers}) [ED:{def_eff_target:.1f}]")
-                    destroyed = target_def_unit.take_damage(actual_casualties)
-                    battle_log.append(f"      {target_def_unit.unit_id} takes {actual_casualties} casualties. {target_def_unit.soldiers} remain.")
-                    if destroyed:
-                        battle_log.append(f"      Unit {target_def_unit.unit_id} has been destroyed!")
-                        self._remove_unit(target_def_unit.unit_id)
-                        current_defender_units_for_targeting = [u for u in current_defender_units_for_targeting if u.unit_id != target_def_unit.unit_id]
+            # Battles only trigger if there IS an owner; multi-way battles in unowned cities need better rules.
+            if log_events:
+                sink.emit((EventType.BATTLE_SKIPPED, turn, city_id, None))
+            return None
+
+        if not attacker_faction_ids: # Defender exists, but no one at WAR with them is present
+            if log_events:
+                sink.emit((EventType.BATTLE_SKIPPED, turn, city_id, defender_faction_id))
+            return None
+
+        if announce and log_events:
+            sink.emit((EventType.BATTLE_STARTED, turn, city_id, defender_faction_id, tuple(attacker_faction_ids)))
+        return units_by_faction, defender_faction_id, attacker_faction_ids
+
+    def _battle_spec(self, city_obj) -> Optional[Tuple]:
+        # Everything simulate_battle needs for one city, plus the ArmyUnit views to write results back to.
+        battle = self._prepare_battle(city_obj, announce=False)
+        if battle is None:
+            return None
+        units_by_faction, defender_faction_id, attacker_faction_ids = battle
+        defender_units = [u for u in units_by_faction.get(defender_faction_id, []) if u.soldiers > 0]
+        attacker_units = [u for fid in attacker_faction_ids for u in units_by_faction.get(fid, []) if u.soldiers > 0]
+        battle_units = []
+        for unit in defender_units:
+            battle_units.append((unit.unit_id, unit.soldiers) + self._cached_stat_multipliers(unit, True))
+        for unit in attacker_units:
+            battle_units.append((unit.unit_id, unit.soldiers) + self._cached_stat_multipliers(unit, False))
+        city_id = city_obj.city_id
+        args = (self.current_turn, city_id, defender_faction_id, tuple(attacker_faction_ids), battle_units, len(defender_units),
+                self.substream_seed("battle", city_id), self.event_sink.enabled)
+        return city_obj, units_by_faction, defender_faction_id, attacker_faction_ids, defender_units + attacker_units, args
+
+    def _apply_battle(self, spec: Tuple, result: Tuple[List[int], List[int], List[Tuple], int]):
+        city_obj, units_by_faction, defender_faction_id, attacker_faction_ids, units, _ = spec
+        soldiers_after, destroyed, events, attacks = result
+        if self.profiler is not None:
+            self._count_battle(attacks, len(destroyed))
+        sink = self.event_sink
+        if sink.enabled:
+            sink.emit((EventType.BATTLE_STARTED, self.current_turn, city_obj.city_id, defender_faction_id, tuple(attacker_faction_ids)))
+            for event in events:
+                sink.emit(event)
+        losses: Dict[str, int] = {}
+        for unit, soldiers in zip(units, soldiers_after):
+            if unit.soldiers != soldiers:
+                faction_id = unit.owning_faction_id
+                losses[faction_id] = losses.get(faction_id, 0) + unit.soldiers - soldiers
+                unit.soldiers = soldiers
+        self._track_soldier_losses(city_obj.region_id, losses)
+        for index in destroyed:
+            self._remove_unit(units[index].unit_id)
+        self._settle_battle(city_obj, units_by_faction, defender_faction_id, attacker_faction_ids)
+
+    def _count_battle(self, attacks: int, units_destroyed: int):
+        profiler = self.profiler
+        profiler.count("battles")
+        profiler.count("attacks", attacks)
+        profiler.count("units_destroyed", units_destroyed)
+
+    def _resolve_battle_in_city(self, city_obj):
+        spec = self._battle_spec(city_obj)
+        if spec is not None:
+            self._apply_battle(spec, simulate_battle(*spec[-1]))
+
+    def _settle_battle(self, city_obj, units_by_faction: Dict[str, List[ArmyUnit]], original_owner_id: str, attacker_faction_ids: List[str]):
+        sink = self.event_sink
+        log_events = sink.enabled
+        turn = self.current_turn
+        city_id = city_obj.city_id
         defender_units_after_battle = [u for u in units_by_faction.get(original_owner_id, []) if u.unit_id in self.army_units and self.army_units[u.unit_id].soldiers > 0]
-        if original_owner_id and not defender_units_after_battle:
+        if not defender_units_after_battle:
             surviving_attacker_factions_map: Dict[str, int] = {}
             for fid in attacker_faction_ids:
                 faction_units = [u for u in units_by_faction.get(fid, []) if u.unit_id in self.army_units and self.army_units[u.unit_id].soldiers > 0]
@@ -472,116 +1400,182 @@ class GameState:
             if surviving_attacker_factions_map:
                 new_owner_id = max(surviving_attacker_factions_map, key=surviving_attacker_factions_map.get)
                 if new_owner_id != original_owner_id:
-                    battle_log.append(f"  DEFENDERS WIPED OUT! {city_obj.name} has been occupied by {self.factions[new_owner_id].name}!")
-                    self.assign_city_to_faction(city_obj.city_id, new_owner_id)
-            else: 
-                battle_log.append(f"  All forces in {city_obj.name} have been wiped out. City remains with {original_owner_name}.")
-        elif original_owner_id: 
-             battle_log.append(f"  {original_owner_name} holds {city_obj.name}.")
-        elif not original_owner_id: # Unowned city, check if any single ATTACKING faction (previously defined) remains
-            surviving_factions_in_unowned_city_at_war_with_each_other_or_st : Dict[str, int] = {}
-            for fid_attacker in attacker_faction_ids: # Only consider those who were part of initial conflict logic for unowned cities if we get here
-                faction_units = [u for u in units_by_faction.get(fid_attacker, []) if u.unit_id in self.army_units and self.army_units[u.unit_id].soldiers > 0]
-                if faction_units:
-                    surviving_factions_in_unowned_city_at_war_with_each_other_or_st[fid_attacker] = sum(u.soldiers for u in faction_units)
-            if len(surviving_factions_in_unowned_city_at_war_with_each_other_or_st) == 1:
-                new_owner_id = list(surviving_factions_in_unowned_city_at_war_with_each_other_or_st.keys())[0]
-                battle_log.append(f"  {city_obj.name} was unowned and is now claimed by {self.factions[new_owner_id].name}!")
-                self.assign_city_to_faction(city_obj.city_id, new_owner_id)
-            else:
-                battle_log.append(f"  {city_obj.name} remains unowned or contested among multiple survivors.")
-        battle_log.append(f"--- Battle in {city_obj.name} resolved. ---")
-        return battle_log
+                    if log_events:
+                        sink.emit((EventType.CITY_CAPTURED, turn, city_id, original_owner_id, new_owner_id))
+                    if self.profiler is not None:
+                        self.profiler.count("cities_captured")
+                    self.assign_city_to_faction(city_id, new_owner_id)
+            elif log_events:
+                sink.emit((EventType.CITY_HELD, turn, city_id, original_owner_id, False))
+        elif log_events:
+            sink.emit((EventType.CITY_HELD, turn, city_id, original_owner_id, True))
+        if log_events:
+            sink.emit((EventType.BATTLE_ENDED, turn, city_id))
 
     def _resolve_all_city_battles(self):
-        all_battle_logs = []
-        for city_id in list(self.game_map.cities.keys()): 
+        if self.combat_engine == "numpy":
+            combat_numpy.resolve_battles(self, list(self.contested_city_ids))
+            return
+        if self.combat_engine == "parallel":
+            combat_parallel.resolve_battles(self, list(self.contested_city_ids), self.battle_workers)
+            return
+        # Battles are timed one by one only here; the numpy and parallel engines fight them together.
+        profiler = self.profiler
+        for city_id in list(self.contested_city_ids):
             city_obj = self.game_map.get_city(city_id)
             if city_obj:
-                log_entries = self._resolve_battle_in_city(city_obj)
-                if log_entries:
-                    all_battle_logs.extend(log_entries)
-        if all_battle_logs:
-            print("\n=== Combat Phase Report ===")
-            for log_entry in all_battle_logs:
-                print(log_entry)
-            print("=========================")
-
-    def _process_ai_faction_turn(self, faction_id: str):
-        faction = self.factions.get(faction_id)
-        if not faction or faction_id == self.player_faction_id:
-            return
-        ai_log = [f"\n--- AI Turn: {faction.short_name} (ID: {faction_id}) ---"]
-        action_taken = False
-        ai_units_in_cities = [u for u_id in faction.army_units_list_ids 
-                              if (u := self.army_units.get(u_id)) and 
-                                 u.current_location_city_id and 
+                self._resolve_battle_in_city(city_obj)
+                if profiler is not None:
+                    profiler.add_time("battle_seconds", city_id, profiler.end_phase("battles"))
+
+    def _route_to_nearest_enemy_city(self, faction_id: str, unit: ArmyUnit) -> Optional[Tuple[int, str, str]]:
+        enemy_city_ids = [city_id for enemy_id in self.diplomacy.enemies_of(faction_id) if enemy_id in self.factions
+                          for city_id in self.factions[enemy_id].controlled_cities_ids]
+        if not enemy_city_ids:
+            return None
+        routes = self.game_map.distances_from_many((unit.current_location_city_id,), enemy_city_ids, self._movement_type_of(unit))
+        route = routes.get(unit.current_location_city_id)
+        if not route or route[1] is None:
+            return None
+        return route
+
+    # --- AI turns: planning and applying ---
+    # Every AI faction plans its orders against the same turn-start state, then the orders are applied
+    # one faction after another. Planning only reads state and each faction gets its own (turn, faction)
+    # seed, so plans are the same whether they are made here or by an ai_planner in other processes
+    # (see ai.ParallelPlanner).
+
+    def _plan_default_ai_turn(self, faction_id: str, rng: random.Random) -> List[Tuple[str, str]]:
+        # The built-in AI: one random unit attacks an adjacent enemy city, otherwise steps toward the
+        # nearest one, otherwise wanders into any adjacent city its faction does not own.
+        ai_units_in_cities = [u for u_id in self.factions[faction_id].army_units_list_ids
+                              if (u := self.army_units.get(u_id)) and
+                                 u.current_location_city_id and
                                  u.soldiers > 0]
         if not ai_units_in_cities:
-            ai_log.append(f"  AI {faction.short_name} has no units in any city to move.")
-        else:
-            unit_to_move = random.choice(ai_units_in_cities)
-            current_city_id = unit_to_move.current_location_city_id
-            current_city_name = self.game_map.cities[current_city_id].name if current_city_id in self.game_map.cities else current_city_id
-            target_cities_war = []
-            target_cities_other = []
-            if current_city_id and current_city_id in self.game_map.adjacency_list:
-                for adj_city_id in self.game_map.adjacency_list[current_city_id]:
-                    adj_city_obj = self.game_map.get_city(adj_city_id)
-                    if not adj_city_obj: continue
-                    if adj_city_obj.current_owner_faction_id and \
-                       adj_city_obj.current_owner_faction_id != faction_id and \
-                       adj_city_obj.current_owner_faction_id in faction.diplomatic_relations and \
-                       faction.diplomatic_relations[adj_city_obj.current_owner_faction_id].get("status") == DiplomaticStatus.WAR:
-                        target_cities_war.append(adj_city_id)
-                    elif adj_city_obj.current_owner_faction_id != faction_id : # Move to non-enemy cities too
-                        target_cities_other.append(adj_city_id)
-                chosen_target_city_id = None
-                if target_cities_war:
-                    chosen_target_city_id = random.choice(target_cities_war)
-                    ai_log.append(f"  AI {faction.short_name} unit {unit_to_move.unit_id} in {current_city_name} is targeting enemy city: {chosen_target_city_id}!")
-                elif target_cities_other:
-                    chosen_target_city_id = random.choice(target_cities_other)
-                    ai_log.append(f"  AI {faction.short_name} unit {unit_to_move.unit_id} in {current_city_name} randomly targets adjacent city: {chosen_target_city_id}.")
-                if chosen_target_city_id:
-                    move_result = self.move_unit(unit_to_move.unit_id, chosen_target_city_id, acting_faction_id=faction_id)
-                    ai_log.append(f"    Move Result: {move_result}")
-                    action_taken = True
-                else:
-                    ai_log.append(f"  AI {faction.short_name}: Unit {unit_to_move.unit_id} in {current_city_name} has no valid adjacent cities to move to (or only own cities adjacent).")
+            return []
+        unit_to_move = rng.choice(ai_units_in_cities)
+        target_cities_war = []
+        target_cities_other = []
+        for adj_city_id in self.game_map.neighbors(unit_to_move.current_location_city_id):
+            adj_owner_id = self.game_map.cities[adj_city_id].current_owner_faction_id
+            if adj_owner_id and adj_owner_id != faction_id and self.diplomacy.is_at_war(faction_id, adj_owner_id):
+                target_cities_war.append(adj_city_id)
+            elif adj_owner_id != faction_id: # Move to non-enemy cities too
+                target_cities_other.append(adj_city_id)
+        if target_cities_war:
+            return [(unit_to_move.unit_id, rng.choice(target_cities_war))]
+        route = self._route_to_nearest_enemy_city(faction_id, unit_to_move)
+        if route:
+            return [(unit_to_move.unit_id, route[1])]
+        if target_cities_other:
+            return [(unit_to_move.unit_id, rng.choice(target_cities_other))]
+        return []
+
+    def plan_ai_turn(self, faction_id: str, seed: int) -> List[Tuple[str, str]]:
+        # (unit_id, target_city_id) moves for one AI faction. Leaves the game unchanged.
+        rng = random.Random(seed)
+        ai_player = self.ai_players.get(faction_id)
+        if ai_player is not None:
+            return ai_player.plan_orders(self, faction_id, rng)
+        return self._plan_default_ai_turn(faction_id, rng)
+
+    def _plan_ai_turns(self) -> Dict[str, List[Tuple[str, str]]]:
+        jobs = [(faction_id, self.substream_seed("ai", faction_id)) for faction_id in self.factions if faction_id != self.player_faction_id]
+        if self.ai_planner is not None:
+            return self.ai_planner.plan(self, jobs)
+        profiler = self.profiler
+        if profiler is None:
+            return {faction_id: self.plan_ai_turn(faction_id, seed) for faction_id, seed in jobs}
+        orders = {}
+        for faction_id, seed in jobs:
+            orders[faction_id] = self.plan_ai_turn(faction_id, seed)
+            profiler.add_time("ai_factions", faction_id, profiler.end_phase("ai_planning"))
+        return orders
+
+    def _apply_ai_orders(self, faction_id: str, orders: List[Tuple[str, str]]):
+        # move_unit validates each order against the current state: the unit must still exist, belong to
+        # the faction and stand next to the target. Rejected orders are reported and skipped.
+        sink = self.event_sink
+        log_events = sink.enabled
+        turn = self.current_turn
+        if log_events:
+            sink.emit((EventType.AI_TURN_STARTED, turn, faction_id))
+        for unit_id, target_city_id in orders:
+            unit = self.army_units.get(unit_id)
+            from_city_id = unit.current_location_city_id if unit else None
+            move_result = self.move_unit(unit_id, target_city_id, acting_faction_id=faction_id)
+            if log_events:
+                target_city = self.game_map.get_city(target_city_id)
+                target_owner_id = target_city.current_owner_faction_id if target_city else None
+                targets_enemy = bool(target_owner_id) and target_owner_id != faction_id and self.diplomacy.is_at_war(faction_id, target_owner_id)
+                sink.emit((EventType.AI_MOVE, turn, faction_id, unit_id, from_city_id, target_city_id, targets_enemy, move_result))
+        if not orders and log_events:
+            if self.factions[faction_id].army_units_list_ids:
+                sink.emit((EventType.AI_IDLE, turn, faction_id))
             else:
-                ai_log.append(f"  AI {faction.short_name}: Unit {unit_to_move.unit_id} in {current_city_name} - city has no adjacencies defined.")
-        if not action_taken and not ai_units_in_cities:
-             pass 
-        elif not action_taken and ai_units_in_cities:
-            ai_log.append(f"  AI {faction.short_name} took no action with its units this turn.")
-        if len(ai_log) > 1:
-            for entry in ai_log:
-                print(entry)
+                sink.emit((EventType.AI_NO_UNITS, turn, faction_id))
+
+    def _run_economy_phase(self):
+        # Pays every faction its ledger income at once; the cost depends on the number of factions only.
+        # Cities change hands only in the combat phase, so paying before the moves gives the same amounts.
+        sink = self.event_sink
+        log_events = sink.enabled
+        self.entity_versions["factions"] += 1
+        for faction_id, (gold, food, manpower) in self.faction_income.items():
+            faction = self.factions[faction_id]
+            self._set(faction, "treasury", faction.treasury + gold)
+            self._set(faction, "food_reserves", faction.food_reserves + food)
+            self._set(faction, "manpower_pool", faction.manpower_pool + manpower)
+            if log_events:
+                sink.emit((EventType.INCOME, self.current_turn, faction_id, gold, faction.treasury))
+
+    def compact_units(self) -> bool:
+        # Reclaims the rows of destroyed units once they outnumber the living ones. This renumbers rows, so
+        # every ArmyUnit obtained earlier becomes invalid: only call it where none are held, e.g. between turns
+        # in a loop that owns the game. Returns whether it compacted.
+        if self.journal is not None or self.army_units.dead_rows <= len(self.army_units):
+            return False
+        self.army_units.compact()
+        return True
 
     def next_turn(self):
-        self.current_turn += 1
-        print(f"\n--- Advanced to Turn {self.current_turn} ---")
-        if self.player_faction_id and self.player_faction_id in self.factions:
-            player_faction_obj = self.factions[self.player_faction_id]
-            income = 0
-            for city_id_in_faction in list(player_faction_obj.controlled_cities_ids):
-                city = self.game_map.get_city(city_id_in_faction)
-                if city:
-                    income += city.economy // 10 
-            player_faction_obj.treasury += income
-            print(f"  {player_faction_obj.short_name} received {income} gold. Treasury: {player_faction_obj.treasury}")
-        print("\n-- AI Factions Processing --")
+        self._set(self, "current_turn", self.current_turn + 1)
+        self._stats_cache.clear()
+        sink = self.event_sink
+        log_events = sink.enabled
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start_turn(self.current_turn)
+        if log_events:
+            sink.emit((EventType.TURN_STARTED, self.current_turn))
+        self._run_economy_phase()
+        if profiler is not None:
+            profiler.end_phase("economy")
+        if self.unit_destinations:
+            self._advance_marching_units()
+        if profiler is not None:
+            profiler.end_phase("marching")
+        if log_events:
+            sink.emit((EventType.AI_PHASE_STARTED, self.current_turn))
+        ai_orders = self._plan_ai_turns()
+        if self.replay_log is not None:
+            self.replay_log.record_ai_orders(self, ai_orders)
+        if profiler is not None:
+            profiler.end_phase("ai_planning")
         for faction_id_ai in self.factions:
             if faction_id_ai != self.player_faction_id:
-                self._process_ai_faction_turn(faction_id_ai)
-                ai_faction_obj = self.factions[faction_id_ai]
-                ai_income = 0
-                for city_id_ai in list(ai_faction_obj.controlled_cities_ids):
-                    city_ai = self.game_map.get_city(city_id_ai)
-                    if city_ai:
-                        ai_income += city_ai.economy // 10 
-                ai_faction_obj.treasury += ai_income
-        print("--------------------------")
+                self._apply_ai_orders(faction_id_ai, ai_orders[faction_id_ai])
+                if profiler is not None:
+                    profiler.add_time("ai_factions", faction_id_ai, profiler.end_phase("ai_orders"))
         self._resolve_all_city_battles()
+        if profiler is not None:
+            profiler.end_phase("battles")
+        if self.debug_checks:
+            problems = self.verify_indexes()
+            assert not problems, "Index consistency check failed:\n" + "\n".join(problems)
+        if profiler is not None:
+            profiler.end_turn()
+        if self.replay_log is not None:
+            self.replay_log.record_turn_end(self)
 
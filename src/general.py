@@ -1,4 +1,3 @@
-'''
 from typing import Optional
 
 class General:
@@ -14,4 +13,3 @@ class General:
 
     def __str__(self):
         return f"General: {self.name} (ID: {self.general_id}), Faction: {self.faction_id or 'None'}, Location: {self.current_location_city_id or 'N/A'}"
-'''
\ No newline at end of file
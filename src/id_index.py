@@ -0,0 +1,50 @@
+from typing import Dict, Iterable, Iterator
+
+
+class OrderedIdSet:
+    # Insertion-ordered set of entity ids backed by a dict, so membership, add and discard are O(1)
+    # while iteration keeps the order entities were added in (used for all display output).
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._ids: Dict[str, None] = dict.fromkeys(ids)
+
+    def add(self, item_id: str):
+        self._ids[item_id] = None
+
+    def discard(self, item_id: str):
+        self._ids.pop(item_id, None)
+
+    def remove(self, item_id: str):
+        del self._ids[item_id]
+
+    def copy(self) -> "OrderedIdSet":
+        clone = OrderedIdSet.__new__(OrderedIdSet)
+        clone._ids = self._ids.copy()
+        return clone
+
+    def clear(self):
+        self._ids.clear()
+
+    def update(self, item_ids: Iterable[str]):
+        self._ids.update(item_ids._ids if isinstance(item_ids, OrderedIdSet) else dict.fromkeys(item_ids))
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __bool__(self) -> bool:
+        return bool(self._ids)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OrderedIdSet):
+            return list(self._ids) == list(other._ids)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"OrderedIdSet({list(self._ids)!r})"
@@ -0,0 +1,60 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from id_index import OrderedIdSet
+
+
+class UndoJournal:
+    # Undo log for GameState transactions. Each entry is (undo_function, *args) and entries are undone
+    # newest first. Containers (dicts, OrderedIdSets) are saved whole on their first change in a
+    # transaction level, which keeps their iteration order exact after a rollback. Levels nest:
+    # commit() folds a level into the one around it, rollback() undoes just the innermost level.
+    __slots__ = ("entries", "_marks", "_saved")
+
+    def __init__(self):
+        self.entries: List[Tuple] = []
+        self._marks: List[int] = []
+        self._saved: List[Dict[int, Any]] = []  # per level: id(container) -> container
+
+    @property
+    def depth(self) -> int:
+        return len(self._marks)
+
+    def begin(self):
+        self._marks.append(len(self.entries))
+        self._saved.append({})
+
+    def record(self, undo: Callable, *args):
+        self.entries.append((undo, *args))
+
+    def save_container(self, container):
+        saved = self._saved[-1]
+        if id(container) not in saved:
+            saved[id(container)] = container
+            self.entries.append((_restore_container, container, container.copy()))
+
+    def commit(self):
+        self._marks.pop()
+        saved = self._saved.pop()
+        if self._marks:
+            self._saved[-1].update(saved)
+        else:
+            self.entries.clear()
+
+    def rollback(self) -> int:
+        # Returns the number of entries undone.
+        mark = self._marks.pop()
+        self._saved.pop()
+        entries = self.entries
+        undone = len(entries) - mark
+        while len(entries) > mark:
+            undo, *args = entries.pop()
+            undo(*args)
+        return undone
+
+
+def _restore_container(container, saved):
+    if isinstance(container, OrderedIdSet):
+        container._ids = saved._ids  # the saved copy is private to the journal, so take its dict over
+    else:
+        container.clear()
+        container.update(saved)
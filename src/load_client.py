@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from scenario import load_scenario, scenario_path
+
+# Load generator for game_server.py. Each connection creates its own session and then sends requests
+# back to back (a closed loop) for the given duration: mostly detail queries, some unit moves, and a
+# next_turn every turn_every requests. Ids for the requests come from a local copy of the same
+# scenario. Prints the request rate and latency percentiles, overall and per op.
+
+QUERY_WEIGHT, MOVE_WEIGHT = 8, 2
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _latency_stats(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {"count": len(latencies), "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000, "max_ms": (latencies[-1] if latencies else 0.0) * 1000}
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 1
+
+    async def request(self, op: str, **fields) -> Dict[str, Any]:
+        request = {"id": self.next_id, "op": op, **fields}
+        self.next_id += 1
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _connect(host: str, port: int, socket_path: Optional[str]) -> _Connection:
+    if socket_path:
+        return _Connection(*await asyncio.open_unix_connection(socket_path))
+    return _Connection(*await asyncio.open_connection(host, port))
+
+
+def _scenario_ids(scenario: str) -> Dict[str, Any]:
+    game_state, _ = load_scenario(scenario if scenario.endswith(".jsonl") else scenario_path(scenario))
+    player_id = game_state.player_faction_id
+    return {"cities": list(game_state.game_map.cities), "generals": list(game_state.generals), "factions": list(game_state.factions),
+            "player_units": list(game_state.factions[player_id].army_units_list_ids) if player_id else []}
+
+
+async def _run_client(host: str, port: int, socket_path: Optional[str], scenario: str, ids: Dict[str, Any], duration: float,
+                      turn_every: int, seed: int, latencies: Dict[str, List[float]], failures: List[str]):
+    rng = random.Random(seed)
+    connection = await _connect(host, port, socket_path)
+    try:
+        created = await connection.request("create_session", scenario=scenario, seed=seed)
+        if not created["ok"]:
+            failures.append(created["error"])
+            return
+        session = created["result"]["session"]
+        deadline = time.perf_counter() + duration
+        sent = 0
+        while time.perf_counter() < deadline:
+            sent += 1
+            if turn_every and sent % turn_every == 0:
+                op, fields = "next_turn", {}
+            elif ids["player_units"] and rng.randrange(QUERY_WEIGHT + MOVE_WEIGHT) < MOVE_WEIGHT:
+                op, fields = "move_unit", {"unit_id": rng.choice(ids["player_units"]), "target_city_id": rng.choice(ids["cities"])}
+            else:
+                op, fields = rng.choice((("get_city_details_str", {"city_id": rng.choice(ids["cities"])}),
+                                         ("get_faction_details_str", {"faction_id": rng.choice(ids["factions"])}),
+                                         ("get_general_details_str", {"general_id": rng.choice(ids["generals"])})))
+            start = time.perf_counter()
+            response = await connection.request(op, session=session, **fields)
+            latencies.setdefault(op, []).append(time.perf_counter() - start)
+            # Rejected moves are normal game play; only protocol errors count as failures.
+            if "error" in response:
+                failures.append(f"{op}: {response['error']}")
+        await connection.request("close_session", session=session)
+    finally:
+        await connection.close()
+
+
+async def run_load(host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None, connections: int = 8,
+                   duration: float = 10.0, turn_every: int = 20, scenario: str = "europe_1805", seed: int = 0) -> Dict[str, Any]:
+    ids = _scenario_ids(scenario)
+    latencies: Dict[str, List[float]] = {}
+    failures: List[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_run_client(host, port, socket_path, scenario, ids, duration, turn_every, seed + index, latencies, failures)
+                           for index in range(connections)))
+    elapsed = time.perf_counter() - start
+    all_latencies = [latency for op_latencies in latencies.values() for latency in op_latencies]
+    return {"connections": connections, "seconds": elapsed, "requests": len(all_latencies),
+            "requests_per_second": len(all_latencies) / elapsed if elapsed else 0.0, "failures": len(failures),
+            "first_failures": failures[:5], "latency": _latency_stats(all_latencies),
+            "by_op": {op: _latency_stats(op_latencies) for op, op_latencies in sorted(latencies.items())}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure game_server.py throughput and latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--connections", type=int, default=8, help="concurrent clients, one session each")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per client")
+    parser.add_argument("--turn-every", type=int, default=20, help="send next_turn every n requests (0: never)")
+    parser.add_argument("--scenario", default="europe_1805")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+    report = asyncio.run(run_load(args.host, args.port, args.socket, args.connections, args.duration, args.turn_every,
+                                  args.scenario, args.seed))
+    latency = report["latency"]
+    print(f"{report['requests']} requests from {report['connections']} connections in {report['seconds']:.2f}s: "
+          f"{report['requests_per_second']:.0f} req/s, p50 {latency['p50_ms']:.2f}ms, p99 {latency['p99_ms']:.2f}ms, "
+          f"max {latency['max_ms']:.2f}ms, {report['failures']} failures")
+    for op, stats in report["by_op"].items():
+        print(f"  {op:<26} {stats['count']:>8} requests, p50 {stats['p50_ms']:.2f}ms, p99 {stats['p99_ms']:.2f}ms")
+    for failure in report["first_failures"]:
+        print(f"  failure: {failure}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(report, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,14 @@
 
-from faction import Faction
-from city import City
-from general import General
-from army_unit import ArmyUnit
-from game_map import GameMap
+from ai import AI_TYPES, make_ai
 from game_state import GameState
-from game_enums import UnitType, DiplomaticStatus 
-
-def setup_initial_state() -> GameState:
-    # 1. Create Game Map
-    europe_map = GameMap(map_id="europe_1805")
-
-    # 2. Create Cities and add to map
-    paris = City(city_id="paris", name="Paris", region_id="ile_de_france")
-    london = City(city_id="london", name="London", region_id="greater_london")
-    vienna = City(city_id="vienna", name="Vienna", region_id="austria_proper")
-    berlin = City(city_id="berlin", name="Berlin", region_id="brandenburg")
-    marseille = City(city_id="marseille", name="Marseille", region_id="provence")
-    lyon = City(city_id="lyon", name="Lyon", region_id="rhone_alpes")
-
-    europe_map.add_city(paris)
-    europe_map.add_city(london)
-    europe_map.add_city(vienna)
-    europe_map.add_city(berlin)
-    europe_map.add_city(marseille)
-    europe_map.add_city(lyon)
-
-    # Define Adjacencies
-    europe_map.add_adjacency("paris", "lyon")
-    europe_map.add_adjacency("lyon", "marseille")
-    europe_map.add_adjacency("paris", "berlin")
-    europe_map.add_adjacency("berlin", "vienna")
-    europe_map.add_adjacency("london", "paris") 
-    europe_map.add_adjacency("vienna", "lyon")  
-
-    # 3. Create Game State
-    game = GameState(game_map_obj=europe_map)
-
-    # 4. Create Factions and add to game state
-    france = Faction(faction_id="france", name="French Empire", short_name="France", capital_city_id="paris")
-    game.add_faction(france)
-    britain = Faction(faction_id="britain", name="Great Britain", short_name="Britain", capital_city_id="london")
-    game.add_faction(britain)
-    austria = Faction(faction_id="austria", name="Austrian Empire", short_name="Austria", capital_city_id="vienna")
-    game.add_faction(austria)
-    prussia = Faction(faction_id="prussia", name="Kingdom of Prussia", short_name="Prussia", capital_city_id="berlin")
-    game.add_faction(prussia)
-    
-    game.player_faction_id = "france"
-
-    # Set Initial Diplomatic Status (after all factions are added)
-    game.set_diplomatic_status("france", "britain", DiplomaticStatus.WAR, -100)
-    game.set_diplomatic_status("france", "austria", DiplomaticStatus.WAR, -80)
-    game.set_diplomatic_status("france", "prussia", DiplomaticStatus.PEACE, -20) 
-    game.set_diplomatic_status("britain", "austria", DiplomaticStatus.ALLIANCE, 70)
-    game.set_diplomatic_status("britain", "prussia", DiplomaticStatus.PEACE, 30) 
-    game.set_diplomatic_status("austria", "prussia", DiplomaticStatus.PEACE, 10) 
-
-    # 5. Assign cities to factions
-    game.assign_city_to_faction("paris", "france")
-    game.assign_city_to_faction("lyon", "france")
-    game.assign_city_to_faction("marseille", "france")
-    game.assign_city_to_faction("london", "britain")
-    game.assign_city_to_faction("vienna", "austria")
-    game.assign_city_to_faction("berlin", "prussia")
-
-    # 6. Create Generals and add to game state
-    napoleon = General(general_id="napoleon", name="Napoleon Bonaparte", faction_id="france", command=95, attack_skill=90, defense_skill=80)
-    france.leader_general_id = "napoleon"
-    davout = General(general_id="davout", name="Louis Davout", faction_id="france", command=85, attack_skill=80, defense_skill=75)
-    nelson = General(general_id="nelson", name="Horatio Nelson", faction_id="britain", command=90, attack_skill=70, defense_skill=60)
-    britain.leader_general_id = "nelson"
-    archduke_charles = General(general_id="archduke_charles", name="Archduke Charles", faction_id="austria", command=80, attack_skill=75, defense_skill=80)
-    austria.leader_general_id = "archduke_charles"
-    blucher = General(general_id="blucher", name="Gebhard von Blucher", faction_id="prussia", command=82, attack_skill=80, defense_skill=70)
-    prussia.leader_general_id = "blucher"
-
-    game.add_general(napoleon)
-    game.add_general(davout)
-    game.add_general(nelson)
-    game.add_general(archduke_charles)
-    game.add_general(blucher)
-
-    # 7. Place Generals in cities
-    game.place_general_in_city("napoleon", "paris")
-    game.place_general_in_city("davout", "lyon")
-    game.place_general_in_city("nelson", "london")
-    game.place_general_in_city("archduke_charles", "vienna")
-    game.place_general_in_city("blucher", "berlin")
- 
-    ut_inf_corps = UnitType.INFANTRY_CORPS
-    ut_guard_corps = UnitType.GUARD_CORPS
-    ut_inf_div = UnitType.INFANTRY_DIVISION
-    # ut_fleet = UnitType.FLEET_CHANNEL 
-
-    fra_corps_1 = ArmyUnit(unit_id="fra_corps_1", unit_type_id=ut_inf_corps.type_id, base_attack=ut_inf_corps.base_attack, base_defense=ut_inf_corps.base_defense, owning_faction_id="france", soldiers=ut_inf_corps.default_soldiers, leading_general_id="davout")
-    fra_guard = ArmyUnit(unit_id="fra_guard", unit_type_id=ut_guard_corps.type_id, base_attack=ut_guard_corps.base_attack, base_defense=ut_guard_corps.base_defense, owning_faction_id="france", soldiers=ut_guard_corps.default_soldiers, leading_general_id="napoleon")
-    bri_army_1 = ArmyUnit(unit_id="bri_army_1", unit_type_id=ut_inf_corps.type_id, base_attack=ut_inf_corps.base_attack, base_defense=ut_inf_corps.base_defense, owning_faction_id="britain", soldiers=18000, leading_general_id="nelson") 
-    aus_army_1 = ArmyUnit(unit_id="aus_army_1", unit_type_id=ut_inf_div.type_id, base_attack=ut_inf_div.base_attack, base_defense=ut_inf_div.base_defense, owning_faction_id="austria", soldiers=ut_inf_div.default_soldiers, leading_general_id="archduke_charles")
-    pru_corps_1 = ArmyUnit(unit_id="pru_corps_1", unit_type_id=ut_inf_corps.type_id, base_attack=ut_inf_corps.base_attack, base_defense=ut_inf_corps.base_defense, owning_faction_id="prussia", soldiers=22000, leading_general_id="blucher")
-
-    game.add_army_unit(fra_corps_1)
-    game.add_army_unit(fra_guard)
-    game.add_army_unit(bri_army_1) 
-    game.add_army_unit(aus_army_1)
-    game.add_army_unit(pru_corps_1)
-
-    # 9. Place units in cities
-    game.place_unit_in_city("fra_corps_1", "lyon")
-    game.place_unit_in_city("fra_guard", "paris")
-    game.place_unit_in_city("bri_army_1", "london")
-    game.place_unit_in_city("aus_army_1", "vienna")
-    game.place_unit_in_city("pru_corps_1", "berlin")
-
+from scenario import load_scenario, scenario_path
+from turn_profiler import format_history, format_profile
+from views import DEFAULT_PAGE_SIZE, format_page, get_page, parse_summary_args
+
+def setup_initial_state(scenario_name: str = "europe_1805") -> GameState:
+    # The 1805 Europe setup (cities, roads, factions, diplomacy, generals and units) lives in
+    # scenarios/europe_1805.jsonl; see scenario.py for the format.
+    game, _ = load_scenario(scenario_path(scenario_name))
     return game
 
 def game_loop(game_state: GameState):
@@ -121,13 +17,19 @@ def game_loop(game_state: GameState):
     print("  info city <city_id>                - Show details for a city (e.g., info city paris)")
     print("  info general <gen_id>              - Show details for a general (e.g., info general napoleon)")
     print("  info faction <faction_id>          - Show details for a faction (e.g., info faction france)")
+    print("  info region <region_id>            - Show who holds a region: cities, soldiers and income per faction")
     print("  info diplomacy [faction_id]        - Show diplomatic relations (e.g., info diplomacy or info diplomacy france)")
     print("  declare war <target_faction_id>    - Declare war on another faction (e.g., declare war prussia)")
-    print("  move unit <unit_id> to <city_id>   - Move YOUR unit to an ADJACENT city (e.g., move unit fra_guard to lyon)")
+    print("  move unit <unit_id> to <city_id>   - Move YOUR unit; distant cities are reached one hop per turn (e.g., move unit fra_guard to vienna)")
     print("  develop city <id> <b_type>         - Start development in a city (e.g., develop city paris market). Allowed: market, barracks")
     print("  recruit unit <u_type> in <city_id> [with <gen_id>] - Recruit a new unit in YOUR CAPITAL (e.g., recruit unit infantry_corps in paris with napoleon)")
     print("                                     Allowed unit types: infantry_corps, guard_corps, cavalry_squadron, artillery_battery, militia")
-    print("  summary                          - Display current game state summary")
+    print("  recruit units <count> <u_type> in <city_id> [with <gen_id>] - Recruit several units at once (e.g., recruit units 10 militia in paris)")
+    print("  ai <faction_id> <random|greedy|mcts> [budget_ms] - Choose the AI that plays a faction (e.g., ai austria mcts 50)")
+    print("  profile [on [history]|off|history|capture <first> <last> [file]|report] - Time each phase of the turns (e.g., profile on, then profile)")
+    print("  summary [--page <n>] [--page-size <n>] - Display current game state summary, one page of each section")
+    print("  summary <factions|cities|generals|units> [faction|owner <id>] [region <id>] [sort <field> [desc]] [--page <n>]")
+    print("                                     - Page through one section (e.g., summary units faction france sort soldiers desc)")
     print("  next turn                        - Advance to the next turn (triggers AI moves & auto-combat if applicable)")
     print("  exit                             - Exit the game")
 
@@ -144,10 +46,18 @@ def game_loop(game_state: GameState):
             print("Exiting game...")
             break
         elif action == "summary":
-            game_state.display_summary()
+            request = parse_summary_args(parts[1:])
+            if isinstance(request, str):
+                print(request)
+            elif request.query is None:
+                game_state.display_summary(request.page_size, request.page)
+            else:
+                view_page = get_page(game_state, request.query, request.page, request.page_size)
+                print(view_page if isinstance(view_page, str) else format_page(view_page))
         elif action == "next" and len(parts) > 1 and parts[1] == "turn":
             game_state.next_turn()
-            game_state.display_summary() 
+            game_state.compact_units()
+            game_state.display_summary(DEFAULT_PAGE_SIZE)
         elif action == "info" and len(parts) >= 2:
             sub_command = parts[1]
             if sub_command == "city" and len(parts) == 3:
@@ -156,15 +66,17 @@ def game_loop(game_state: GameState):
                 print(game_state.get_general_details_str(parts[2]))
             elif sub_command == "faction" and len(parts) == 3:
                 print(game_state.get_faction_details_str(parts[2]))
+            elif sub_command == "region" and len(parts) == 3:
+                print(game_state.get_region_details_str(parts[2]))
             elif sub_command == "diplomacy":
                 focus_faction_param = parts[2] if len(parts) == 3 else None
                 print(game_state.get_diplomacy_summary_str(focus_faction_param))
             else:
-                print(f"Unknown or incomplete info command: 'info {sub_command} ...'. Supported: city <id>, general <id>, faction <id>, diplomacy [faction_id]")
+                print(f"Unknown or incomplete info command: 'info {sub_command} ...'. Supported: city <id>, general <id>, faction <id>, region <id>, diplomacy [faction_id]")
         elif action == "move" and len(parts) == 5 and parts[1] == "unit" and parts[3] == "to":
             unit_id_to_move = parts[2]
             target_city_id_for_move = parts[4]
-            print(game_state.move_unit(unit_id_to_move, target_city_id_for_move))
+            print(game_state.march_unit(unit_id_to_move, target_city_id_for_move))
         elif action == "move" and (len(parts) < 5 or parts[1] != "unit" or parts[3] != "to"):
              print("Invalid move command. Format: move unit <unit_id> to <target_city_id>")
         elif action == "develop" and len(parts) == 4 and parts[1] == "city":
@@ -185,8 +97,58 @@ def game_loop(game_state: GameState):
                 print("Invalid recruit command format. Use: recruit unit <type> in <city_id> [with <general_id>]")
                 continue
             print(game_state.recruit_unit(unit_type_to_recruit, city_id_for_recruit, general_id_for_recruit))
+        elif action == "recruit" and len(parts) in (6, 8) and parts[1] == "units" and parts[2].isdigit() and parts[4] == "in":
+            if len(parts) == 8 and parts[6] != "with":
+                print("Invalid recruit command format. Use: recruit units <count> <type> in <city_id> [with <general_id>]")
+                continue
+            general_id_for_recruit = parts[7] if len(parts) == 8 else None
+            print(game_state.recruit_units(parts[3], parts[5], int(parts[2]), general_id_for_recruit))
         elif action == "recruit" : 
-            print("Invalid recruit command. Format: recruit unit <type> in <city_id> [with <general_id>]")
+            print("Invalid recruit command. Format: recruit unit <type> in <city_id> [with <general_id>] or recruit units <count> <type> in <city_id> [with <general_id>]")
+        elif action == "ai" and len(parts) in (3, 4) and (parts[2] == "random" or parts[2] in AI_TYPES):
+            options = {}
+            if len(parts) == 4:
+                if parts[2] != "mcts" or not parts[3].isdigit():
+                    print("Invalid ai command. Only mcts takes a budget, in whole milliseconds (e.g., ai austria mcts 50)")
+                    continue
+                options["budget_ms"] = int(parts[3])
+            print(game_state.set_faction_ai(parts[1], make_ai(parts[2], **options)))
+        elif action == "ai":
+            print(f"Invalid ai command. Format: ai <faction_id> <random|{'|'.join(AI_TYPES)}> [budget_ms]")
+        elif action == "profile" and len(parts) == 1:
+            profile = game_state.get_turn_profile()
+            if profile:
+                print(format_profile(profile))
+            else:
+                print("No turn has been profiled yet. Use 'profile on' and advance a turn.")
+        elif action == "profile" and parts[1] == "on" and len(parts) <= 3:
+            if len(parts) == 3 and (not parts[2].isdigit() or int(parts[2]) < 1):
+                print("Invalid profile command. History length must be a positive whole number (e.g., profile on 50)")
+                continue
+            profiler = game_state.enable_profiling(int(parts[2]) if len(parts) == 3 else None)
+            print(f"Profiling enabled; keeping the last {profiler.history.maxlen} turns.")
+        elif action == "profile" and parts[1] == "off" and len(parts) == 2:
+            game_state.disable_profiling()
+            print("Profiling disabled.")
+        elif action == "profile" and parts[1] == "history" and len(parts) == 2:
+            if game_state.profiler and game_state.profiler.history:
+                print(format_history(list(game_state.profiler.history)))
+            else:
+                print("No turn has been profiled yet. Use 'profile on' and advance a turn.")
+        elif action == "profile" and parts[1] == "capture" and len(parts) in (4, 5) and parts[2].isdigit() and parts[3].isdigit():
+            first_turn, last_turn = int(parts[2]), int(parts[3])
+            if first_turn > last_turn:
+                print("Invalid profile capture. The first turn must not come after the last turn.")
+                continue
+            game_state.enable_profiling().capture(first_turn, last_turn, parts[4] if len(parts) == 5 else None)
+            print(f"cProfile will capture turns {first_turn} to {last_turn}; see 'profile report' afterwards.")
+        elif action == "profile" and parts[1] == "report" and len(parts) == 2:
+            if game_state.profiler:
+                print(game_state.profiler.cprofile_report())
+            else:
+                print("Profiling is off. Use 'profile capture <first> <last>' first.")
+        elif action == "profile":
+            print("Invalid profile command. Format: profile [on [history]|off|history|capture <first_turn> <last_turn> [file]|report]")
         elif action == "declare" and len(parts) == 3 and parts[1] == "war":
             target_faction_id_for_war = parts[2]
             print(game_state.declare_war_on_faction(game_state.player_faction_id, target_faction_id_for_war))
@@ -200,7 +162,7 @@ if __name__ == "__main__":
     print("Setting up Napoleon Game Prototype v0.1.13 (with declare war command)...")
     current_game_state = setup_initial_state()
     print("\n--- Initial Game State Summary ---")
-    current_game_state.display_summary()
+    current_game_state.display_summary(DEFAULT_PAGE_SIZE)
     game_loop(current_game_state)
 
     print("\nPrototype simulation finished.")
@@ -0,0 +1,152 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Graph file layout (little-endian):
+#   header   8s magic, u64 city_count, u64 neighbor_count, u64 id_block_bytes
+#   offsets  i64 * (city_count + 1)
+#   neighbors i32 * neighbor_count     (each row in the map's neighbour order)
+#   id block utf-8 city ids joined by "\n"
+GRAPH_FILE_MAGIC = b"NAPCSR01"
+_HEADER = struct.Struct("<8sQQQ")
+
+
+class CSRAdjacency:
+    # Compressed sparse row adjacency over dense city indexes: the neighbours of city i are
+    # neighbors[offsets[i]:offsets[i + 1]], in the same order as the list-of-lists rows they came from.
+    # Roads added after the CSR was built, and cities appended after it, live in a small overflow dict
+    # so the arrays themselves are never rewritten. Long rows get a sorted copy for has_edge on first use.
+    def __init__(self, offsets: Sequence[int], neighbors: Sequence[int]):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.base_count = len(offsets) - 1
+        self._count = self.base_count
+        self._extra: Dict[int, List[int]] = {}
+        self._sorted_rows: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Sequence[int]:
+        if index < self.base_count:
+            row = self.neighbors[self.offsets[index]:self.offsets[index + 1]]
+        else:
+            row = ()
+        extra = self._extra.get(index)
+        if extra:
+            return list(row) + extra
+        return row
+
+    def append(self, row: List[int]):
+        # Called for a newly added city, mirroring list-of-lists adjacency.
+        if row:
+            self._extra[self._count] = list(row)
+        self._count += 1
+
+    def add_edge(self, index1: int, index2: int):
+        self._extra.setdefault(index1, []).append(index2)
+        self._extra.setdefault(index2, []).append(index1)
+
+    def has_edge(self, index1: int, index2: int) -> bool:
+        if index1 < self.base_count:
+            start, end = self.offsets[index1], self.offsets[index1 + 1]
+            if end - start <= 16:
+                if index2 in self.neighbors[start:end]:
+                    return True
+            else:
+                row = self._sorted_rows.get(index1)
+                if row is None:
+                    row = self._sorted_rows[index1] = array("i", sorted(self.neighbors[start:end]))
+                position = bisect_left(row, index2)
+                if position < len(row) and row[position] == index2:
+                    return True
+        extra = self._extra.get(index1)
+        return bool(extra) and index2 in extra
+
+    @property
+    def overflow_edges(self) -> int:
+        return sum(len(row) for row in self._extra.values()) // 2
+
+
+class AdjacencyView:
+    # Read-only stand-in for the old Dict[str, Set[str]] adjacency_list when the map is in compact mode.
+    __slots__ = ("_game_map",)
+
+    def __init__(self, game_map):
+        self._game_map = game_map
+
+    def __getitem__(self, city_id: str) -> List[str]:
+        game_map = self._game_map
+        city_ids = game_map.city_ids
+        return [city_ids[neighbor] for neighbor in game_map._neighbor_indexes[game_map._city_index[city_id]]]
+
+    def get(self, city_id: str, default=None):
+        if city_id not in self._game_map._city_index:
+            return default
+        return self[city_id]
+
+    def __contains__(self, city_id) -> bool:
+        return city_id in self._game_map._city_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._game_map.city_ids)
+
+    def __len__(self) -> int:
+        return len(self._game_map.city_ids)
+
+    def keys(self):
+        return list(self._game_map.city_ids)
+
+    def items(self):
+        return [(city_id, self[city_id]) for city_id in self._game_map.city_ids]
+
+
+def build_csr(rows: Sequence[Sequence[int]]) -> Tuple[array, array]:
+    offsets = array("q", [0])
+    neighbors = array("i")
+    for row in rows:
+        neighbors.extend(dict.fromkeys(row))
+        offsets.append(len(neighbors))
+    return offsets, neighbors
+
+
+def write_graph_file(path: str, city_ids: List[str], offsets: Sequence[int], neighbors: Sequence[int]):
+    id_block = "\n".join(city_ids).encode("utf-8")
+    offsets = array("q", offsets)
+    neighbors = array("i", neighbors)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        neighbors.byteswap()
+    with open(path, "wb") as graph_file:
+        graph_file.write(_HEADER.pack(GRAPH_FILE_MAGIC, len(city_ids), len(neighbors), len(id_block)))
+        offsets.tofile(graph_file)
+        neighbors.tofile(graph_file)
+        graph_file.write(id_block)
+
+
+def load_graph_file(path: str):
+    # Returns (city_ids, offsets, neighbors, mapping). On little-endian hosts offsets and neighbors are
+    # zero-copy memoryviews into the mapping, which must stay open while they are in use.
+    with open(path, "rb") as graph_file:
+        mapping = mmap.mmap(graph_file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, city_count, neighbor_count, id_bytes = _HEADER.unpack_from(mapping, 0)
+    if magic != GRAPH_FILE_MAGIC:
+        mapping.close()
+        raise ValueError(f"'{path}' is not a Napoleon graph file.")
+    offsets_start = _HEADER.size
+    neighbors_start = offsets_start + 8 * (city_count + 1)
+    ids_start = neighbors_start + 4 * neighbor_count
+    view = memoryview(mapping)
+    if sys.byteorder == "little":
+        offsets = view[offsets_start:neighbors_start].cast("q")
+        neighbors = view[neighbors_start:ids_start].cast("i")
+    else:
+        offsets = array("q", view[offsets_start:neighbors_start].tobytes())
+        neighbors = array("i", view[neighbors_start:ids_start].tobytes())
+        offsets.byteswap()
+        neighbors.byteswap()
+    city_ids = bytes(view[ids_start:ids_start + id_bytes]).decode("utf-8").split("\n") if city_count else []
+    return city_ids, offsets, neighbors, mapping
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from command_script import NextTurnOrder, parse_command, run_commands
+from game_events import NullEventSink
+from game_state import GameState
+from scenario import load_scenario, scenario_path
+from snapshot import load_snapshot, restore_snapshot_bytes, save_snapshot, snapshot_bytes, state_hash
+from views import DEFAULT_PAGE_SIZE
+
+# Event-sourced replay log. While a ReplayLog is attached (GameState.replay_log), it records every
+# player command given through run_command, the orders the AI planned each turn and every turn
+# boundary, as one JSON object per line:
+#   {"type": "start", "turn": 1, "seed": 7, "scenario": "europe_1805", "hash": "..."}
+#   {"type": "command", "turn": 1, "command": "move unit fra_guard to ulm"}
+#   {"type": "ai", "turn": 2, "orders": {"austria": [["aut_unit_1", "vienna"]]}}
+#   {"type": "turn", "turn": 2, "hash": "...", "checkpoint": false}
+# Replaying the entries against the starting state reproduces the game, since everything else a turn
+# does is drawn from the game seed; the AI is not re-run, its recorded orders are fed back instead, so
+# replays are exact even for time-budgeted AIs. A full checkpoint is taken every checkpoint_every
+# turns (in memory, or as snapshot files in checkpoint_dir), so seeking to a turn restores the nearest
+# checkpoint before it and replays at most checkpoint_every - 1 turns.
+
+
+def _checkpoint_file(checkpoint_dir: str, turn: int) -> str:
+    return os.path.join(checkpoint_dir, f"turn_{turn:06d}.full")
+
+
+class _RecordedOrders:
+    # AI planner (GameState.set_ai_planner protocol) that hands out the orders recorded for the turn.
+
+    def __init__(self):
+        self.orders: Dict[str, List[Tuple[str, str]]] = {}
+
+    def plan(self, game_state: GameState, jobs: List[Tuple[str, int]]) -> Dict[str, List[Tuple[str, str]]]:
+        return {faction_id: self.orders.get(faction_id, []) for faction_id, _ in jobs}
+
+    def close(self):
+        pass
+
+
+class ReplayLog:
+    def __init__(self, path: Optional[str] = None, checkpoint_every: int = 10, checkpoint_dir: Optional[str] = None,
+                 hash_every: int = 1, compress_checkpoints: bool = False):
+        # path: also write the entries to this JSON lines file, flushed at every turn boundary.
+        # hash_every: store a state hash on every n-th turn entry (0 for none); verify compares them.
+        if checkpoint_every < 1:
+            raise ValueError(f"checkpoint_every must be at least 1, got {checkpoint_every}")
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_dir = checkpoint_dir
+        self.hash_every = hash_every
+        self.compress_checkpoints = compress_checkpoints
+        self.entries: List[Dict[str, Any]] = []
+        # turn -> (index of the first entry after the checkpoint, snapshot bytes or None when on disk)
+        self.checkpoints: Dict[int, Tuple[int, Optional[bytes]]] = {}
+        self._file = None
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+    # --- Recording ---
+
+    def start(self, game_state: GameState, scenario: Optional[str] = None):
+        # Attaches the log to game_state and checkpoints the starting state. scenario (a name or .jsonl
+        # path) lets a log loaded without its checkpoints rebuild the start from the scenario instead.
+        if game_state.replay_log is not None:
+            raise RuntimeError("This game already has a replay log attached.")
+        if self.entries:
+            raise RuntimeError("This replay log has already recorded a game.")
+        if self.path:
+            self._file = open(self.path, "w", encoding="utf-8")
+        entry = {"type": "start", "turn": game_state.current_turn, "seed": game_state.seed, "hash": state_hash(game_state)}
+        if scenario:
+            entry["scenario"] = scenario
+        self._append(entry)
+        self._checkpoint(game_state)
+        self._flush()
+        game_state.replay_log = self
+
+    def stop(self, game_state: GameState):
+        if game_state.replay_log is self:
+            game_state.replay_log = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def run_command(self, game_state: GameState, command: str) -> Dict[str, Any]:
+        # Executes one script command (see command_script) and records it. "next turn" is not recorded
+        # as a command: the turns it plays are recorded by the next_turn hooks.
+        if game_state.replay_log is not self:
+            raise RuntimeError("run_command needs the game this log is attached to.")
+        if not isinstance(parse_command(command), NextTurnOrder):
+            self.record_command(game_state, command)
+        return run_commands(game_state, [command])[0]
+
+    def record_command(self, game_state: GameState, command: str):
+        self._append({"type": "command", "turn": game_state.current_turn, "command": command})
+
+    def record_ai_orders(self, game_state: GameState, ai_orders: Dict[str, List[Tuple[str, str]]]):
+        orders = {faction_id: [list(order) for order in faction_orders] for faction_id, faction_orders in ai_orders.items() if faction_orders}
+        if orders:
+            self._append({"type": "ai", "turn": game_state.current_turn, "orders": orders})
+
+    def record_turn_end(self, game_state: GameState):
+        turn = game_state.current_turn
+        entry: Dict[str, Any] = {"type": "turn", "turn": turn}
+        if self.hash_every and turn % self.hash_every == 0:
+            entry["hash"] = state_hash(game_state)
+        checkpoint = turn % self.checkpoint_every == 0
+        entry["checkpoint"] = checkpoint
+        self._append(entry)
+        if checkpoint:
+            self._checkpoint(game_state)
+        self._flush()
+
+    def _append(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        if self._file is not None:
+            self._file.write(json.dumps(entry) + "\n")
+
+    def _flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def _checkpoint(self, game_state: GameState):
+        turn = game_state.current_turn
+        if self.checkpoint_dir:
+            # Side copies: the game's own delta chain (dirty flags) is left alone.
+            save_snapshot(game_state, _checkpoint_file(self.checkpoint_dir, turn), self.compress_checkpoints, clear_dirty=False)
+            self.checkpoints[turn] = (len(self.entries), None)
+        else:
+            self.checkpoints[turn] = (len(self.entries), snapshot_bytes(game_state, self.compress_checkpoints))
+
+    # --- Loading ---
+
+    @classmethod
+    def load(cls, path: str, checkpoint_dir: Optional[str] = None) -> "ReplayLog":
+        # A log read back from its file, for seek and verify. Without checkpoint_dir only the start can
+        # be restored (from the recorded scenario), so every seek replays from the first turn.
+        log = cls(checkpoint_dir=checkpoint_dir)
+        with open(path, "r", encoding="utf-8") as log_file:
+            log.entries = [json.loads(line) for line in log_file if line.strip()]
+        if not log.entries or log.entries[0]["type"] != "start":
+            raise ValueError(f"'{path}' is not a replay log: it does not begin with a start entry.")
+        for index, entry in enumerate(log.entries):
+            if index == 0 or (entry["type"] == "turn" and entry.get("checkpoint")):
+                if checkpoint_dir and os.path.exists(_checkpoint_file(checkpoint_dir, entry["turn"])):
+                    log.checkpoints[entry["turn"]] = (index + 1, None)
+        if log.start_turn not in log.checkpoints:
+            if "scenario" not in log.entries[0]:
+                raise ValueError(f"'{path}' has neither a starting checkpoint nor a scenario to start from.")
+            log.checkpoints[log.start_turn] = (1, None)
+        return log
+
+    @property
+    def start_turn(self) -> int:
+        return self.entries[0]["turn"]
+
+    @property
+    def last_turn(self) -> int:
+        return self.entries[-1]["turn"] if self.entries else 0
+
+    # --- Replaying ---
+
+    def _restore_checkpoint(self, turn: int) -> GameState:
+        data = self.checkpoints[turn][1]
+        if data is not None:
+            game_state = restore_snapshot_bytes(data, self.compress_checkpoints)
+        elif self.checkpoint_dir and os.path.exists(_checkpoint_file(self.checkpoint_dir, turn)):
+            game_state = load_snapshot(_checkpoint_file(self.checkpoint_dir, turn))
+        else:
+            header = self.entries[0]
+            scenario = header["scenario"]
+            game_state, _ = load_scenario(scenario if scenario.endswith(".jsonl") else scenario_path(scenario))
+            game_state.seed = header["seed"]
+        return game_state
+
+    def seek(self, turn: int, event_sink=None) -> GameState:
+        # A new GameState as it stood at the start of turn (after its next_turn, before its commands).
+        if not self.entries:
+            raise ValueError("The replay log is empty.")
+        if not self.start_turn <= turn <= self.last_turn:
+            raise ValueError(f"Turn {turn} is outside the recorded turns {self.start_turn}..{self.last_turn}.")
+        base_turn = max(checkpoint_turn for checkpoint_turn in self.checkpoints if checkpoint_turn <= turn)
+        game_state = self._restore_checkpoint(base_turn)
+        game_state.set_event_sink(event_sink or NullEventSink())
+        self._replay(game_state, self.checkpoints[base_turn][0], until_turn=turn)
+        return game_state
+
+    def verify(self, event_sink=None) -> List[str]:
+        # Replays the whole log from the start and compares the state hash at every hashed turn; returns
+        # one message per mismatch (empty when the replay reproduces the recorded game).
+        game_state = self._restore_checkpoint(self.start_turn)
+        game_state.set_event_sink(event_sink or NullEventSink())
+        problems = []
+        if state_hash(game_state) != self.entries[0]["hash"]:
+            problems.append(f"Turn {self.start_turn}: the starting state differs from the recorded one.")
+        problems.extend(self._replay(game_state, 1, check_hashes=True))
+        return problems
+
+    def _replay(self, game_state: GameState, start_index: int, until_turn: Optional[int] = None,
+                check_hashes: bool = False) -> List[str]:
+        problems = []
+        planner = _RecordedOrders()
+        saved_planner, game_state.ai_planner = game_state.ai_planner, planner
+        try:
+            for entry in self.entries[start_index:]:
+                if until_turn is not None and game_state.current_turn >= until_turn:
+                    break
+                kind = entry["type"]
+                if kind == "command":
+                    # A command that failed when recorded fails the same way here, changing nothing.
+                    run_commands(game_state, [entry["command"]])
+                elif kind == "ai":
+                    planner.orders = {faction_id: [tuple(order) for order in orders] for faction_id, orders in entry["orders"].items()}
+                elif kind == "turn":
+                    game_state.next_turn()
+                    planner.orders = {}
+                    if game_state.current_turn != entry["turn"]:
+                        problems.append(f"Turn {entry['turn']}: the replay reached turn {game_state.current_turn} instead.")
+                        break
+                    if check_hashes and "hash" in entry and state_hash(game_state) != entry["hash"]:
+                        problems.append(f"Turn {entry['turn']}: state hash differs from the recorded game.")
+        finally:
+            game_state.ai_planner = saved_planner
+        return problems
+
+
+def record_script(game_state: GameState, lines: Iterable[str], log: ReplayLog, scenario: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Runs a command script (see command_script) with every command recorded in log.
+    log.start(game_state, scenario)
+    try:
+        results = []
+        for line in lines:
+            text = line.strip()
+            if text and not text.startswith("#"):
+                results.append(log.run_command(game_state, text))
+        return results
+    finally:
+        log.stop(game_state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, seek and verify event-sourced game replay logs.")
+    commands = parser.add_subparsers(dest="action", required=True)
+    record = commands.add_parser("record", help="run a command script and record it")
+    record.add_argument("log")
+    record.add_argument("script", help="command file, or - for standard input")
+    record.add_argument("--scenario", default="europe_1805")
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("--checkpoints", metavar="DIR", help="write checkpoints here (default: none are kept on disk)")
+    record.add_argument("--checkpoint-every", type=int, default=10)
+    record.add_argument("--compress", action="store_true", help="compress checkpoints")
+    seek = commands.add_parser("seek", help="rebuild the state at a turn and print its summary")
+    seek.add_argument("log")
+    seek.add_argument("turn", type=int)
+    seek.add_argument("--checkpoints", metavar="DIR")
+    verify = commands.add_parser("verify", help="replay the whole log and compare state hashes")
+    verify.add_argument("log")
+    verify.add_argument("--checkpoints", metavar="DIR")
+    args = parser.parse_args()
+
+    if args.action == "record":
+        game_state, _ = load_scenario(args.scenario if args.scenario.endswith(".jsonl") else scenario_path(args.scenario))
+        game_state.seed = args.seed
+        game_state.set_event_sink(NullEventSink())
+        log = ReplayLog(args.log, args.checkpoint_every, args.checkpoints, compress_checkpoints=args.compress)
+        if args.script == "-":
+            results = record_script(game_state, sys.stdin, log, args.scenario)
+        else:
+            with open(args.script, "r", encoding="utf-8") as script_file:
+                results = record_script(game_state, script_file, log, args.scenario)
+        failed = sum(1 for result in results if not result["ok"])
+        print(f"Recorded {len(results)} commands ({failed} failed) up to turn {game_state.current_turn} in {args.log}.")
+        return
+    log = ReplayLog.load(args.log, args.checkpoints)
+    if args.action == "seek":
+        start = time.perf_counter()
+        try:
+            game_state = log.seek(args.turn)
+        except ValueError as error:
+            parser.error(str(error))
+        elapsed = time.perf_counter() - start
+        game_state.display_summary(DEFAULT_PAGE_SIZE)
+        print(f"Reached turn {game_state.current_turn} in {elapsed * 1000:.1f}ms.")
+    else:
+        start = time.perf_counter()
+        problems = log.verify()
+        elapsed = time.perf_counter() - start
+        for problem in problems:
+            print(problem)
+        print(f"Verified turns {log.start_turn}..{log.last_turn} in {elapsed:.2f}s: "
+              f"{'OK' if not problems else f'{len(problems)} mismatches'}.")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
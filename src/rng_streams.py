@@ -0,0 +1,17 @@
+import hashlib
+import random
+
+# Counter-based random streams. A game has one 64-bit seed; the stream for a key such as
+# ("battle", turn, city_id) is seeded with a hash of the seed and the key, so every stream can be
+# produced directly, in any order and in any process, without stepping a shared generator. Results
+# therefore do not depend on the order in which cities or factions are evaluated.
+
+
+def substream_seed(seed: int, *key) -> int:
+    # Keys are ints and strings, whose repr is stable across processes and hash seeds.
+    digest = hashlib.blake2b(repr((seed,) + key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def substream(seed: int, *key) -> random.Random:
+    return random.Random(substream_seed(seed, *key))
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from city import City
+from faction import Faction
+from game_enums import DiplomaticStatus, TerrainType, UnitType
+from game_map import GameMap
+from game_state import GameState
+from general import General
+
+# A scenario is a JSON Lines file: one record per line, each with a "type" field. The first record is the
+# "scenario" header; after that records may come in any order as long as everything a record refers to
+# was defined on an earlier line. Consecutive records of one type are inserted in batches.
+#
+#   {"type": "scenario", "map_id": "europe_1805", "player_faction": "france"}
+#   {"type": "city", "id": "paris", "name": "Paris", "region": "ile_de_france", "terrain": "plains"}
+#   {"type": "road", "from": "paris", "to": "lyon"}
+#   {"type": "faction", "id": "france", "name": "French Empire", "short_name": "France", "capital": "paris", "leader": "napoleon"}
+#   {"type": "diplomacy", "factions": ["france", "britain"], "status": "War", "relation": -100}
+#   {"type": "owner", "city": "paris", "faction": "france"}
+#   {"type": "general", "id": "napoleon", "name": "Napoleon Bonaparte", "faction": "france", "command": 95, "attack": 90, "defense": 80, "city": "paris"}
+#   {"type": "unit", "id": "fra_guard", "unit_type": "guard_corps", "faction": "france", "soldiers": 15000, "general": "napoleon", "city": "paris"}
+#
+# Optional fields default to what the equivalent add_* call would use (unit stats come from the UnitType).
+# Road order matters: each city lists its neighbours in the order its roads were added, and the AI and the
+# route search visit them in that order, so save_scenario writes roads in an order that rebuilds every list.
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+DEFAULT_BATCH_SIZE = 10000
+RECORD_TYPES = ("scenario", "city", "road", "faction", "diplomacy", "owner", "general", "unit")
+UNIT_TYPES_BY_ID: Dict[str, UnitType] = {unit_type.type_id: unit_type for unit_type in UnitType}
+_decode_line = json.JSONDecoder().decode
+
+
+def scenario_path(name: str) -> str:
+    return os.path.join(SCENARIO_DIR, f"{name}.jsonl")
+
+
+def iter_scenario_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as scenario_file:
+        for line_number, line in enumerate(scenario_file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = _decode_line(line)
+            if record.get("type") not in RECORD_TYPES:
+                raise ValueError(f"{path}:{line_number}: unknown record type {record.get('type')!r}")
+            yield record
+
+
+def _city_from_record(record: Dict[str, Any]) -> City:
+    city = City(city_id=record["id"], name=record.get("name", record["id"]), region_id=record.get("region", ""))
+    if "terrain" in record:
+        city.terrain_type = TerrainType(record["terrain"])
+    for field in ("population", "economy", "industry"):
+        if field in record:
+            setattr(city, field, record[field])
+    return city
+
+
+def _faction_from_record(record: Dict[str, Any]) -> Faction:
+    faction = Faction(faction_id=record["id"], name=record.get("name", record["id"]), short_name=record.get("short_name", record["id"]),
+                      leader_id=record.get("leader"), capital_city_id=record.get("capital"))
+    for field in ("treasury", "food_reserves", "manpower_pool", "next_unit_number"):
+        if field in record:
+            setattr(faction, field, record[field])
+    return faction
+
+
+def _general_from_record(record: Dict[str, Any]) -> General:
+    general = General(general_id=record["id"], name=record.get("name", record["id"]), faction_id=record.get("faction"),
+                      command=record.get("command", 50), attack_skill=record.get("attack", 50), defense_skill=record.get("defense", 50))
+    general.current_location_city_id = record.get("city")
+    return general
+
+
+def _unit_row_from_record(record: Dict[str, Any]) -> Tuple:
+    unit_type = UNIT_TYPES_BY_ID.get(record["unit_type"]) or UnitType.from_string(record["unit_type"])
+    if unit_type is None:
+        raise ValueError(f"Unit '{record['id']}' has unknown unit type '{record['unit_type']}'.")
+    soldiers = record.get("soldiers", unit_type.default_soldiers)
+    return (record["id"], unit_type.type_id, record.get("attack", unit_type.base_attack), record.get("defense", unit_type.base_defense),
+            record.get("faction"), soldiers, record.get("max_soldiers", soldiers), record.get("morale", 100),
+            record.get("general"), record.get("city"))
+
+
+def _insert_batch(game_state: GameState, record_type: str, records: List[Dict[str, Any]]):
+    if record_type == "city":
+        game_state.game_map.add_cities([_city_from_record(record) for record in records])
+    elif record_type == "road":
+        game_state.game_map.add_adjacencies([(record["from"], record["to"]) for record in records])
+    elif record_type == "faction":
+        game_state.add_factions([_faction_from_record(record) for record in records])
+    elif record_type == "diplomacy":
+        for record in records:
+            faction1_id, faction2_id = record["factions"]
+            game_state.set_diplomatic_status(faction1_id, faction2_id, DiplomaticStatus(record["status"]), record.get("relation", 0))
+    elif record_type == "owner":
+        game_state.assign_cities([(record["city"], record["faction"]) for record in records])
+    elif record_type == "general":
+        game_state.add_generals([_general_from_record(record) for record in records])
+    elif record_type == "unit":
+        game_state.add_unit_rows([_unit_row_from_record(record) for record in records])
+
+
+def load_scenario(path: str, batch_size: int = DEFAULT_BATCH_SIZE, track_memory: bool = False) -> Tuple[GameState, Dict[str, Dict[str, float]]]:
+    # Streams the file, inserting at most batch_size records at a time. Returns the game state and a
+    # per-phase report {record_type: {"records", "seconds", "peak_bytes"}}; peak_bytes is only measured
+    # (with tracemalloc, which slows loading down) when track_memory is set.
+    report: Dict[str, Dict[str, float]] = {}
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    game_state: Optional[GameState] = None
+    pending_type: Optional[str] = None
+    pending: List[Dict[str, Any]] = []
+    clock = time.perf_counter()
+
+    def flush():
+        nonlocal clock
+        if pending:
+            _insert_batch(game_state, pending_type, pending)
+        now = time.perf_counter()
+        phase = report.setdefault(pending_type, {"records": 0, "seconds": 0.0, "peak_bytes": 0})
+        phase["records"] += len(pending)
+        phase["seconds"] += now - clock
+        if track_memory:
+            phase["peak_bytes"] = max(phase["peak_bytes"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        pending.clear()
+        clock = time.perf_counter()
+
+    try:
+        for record in iter_scenario_records(path):
+            record_type = record["type"]
+            if record_type == "scenario":
+                if game_state is not None:
+                    raise ValueError(f"{path}: more than one scenario header.")
+                game_state = GameState(game_map_obj=GameMap(map_id=record["map_id"]))
+                game_state.player_faction_id = record.get("player_faction")
+                game_state.current_turn = record.get("turn", game_state.current_turn)
+                pending_type = record_type
+                flush()
+                continue
+            if game_state is None:
+                raise ValueError(f"{path}: the first record must be the scenario header.")
+            if pending and (record_type != pending_type or len(pending) >= batch_size):
+                flush()
+            pending_type = record_type
+            pending.append(record)
+        if game_state is None:
+            raise ValueError(f"{path}: empty scenario file.")
+        flush()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return game_state, report
+
+
+def save_scenario(game_state: GameState, path: str):
+    # Writes the current state in scenario format (everything load_scenario understands).
+    game_map = game_state.game_map
+    with open(path, "w", encoding="utf-8") as scenario_file:
+        def write(record: Dict[str, Any]):
+            scenario_file.write(json.dumps(record, separators=(", ", ": ")) + "\n")
+
+        write({"type": "scenario", "map_id": game_map.map_id, "player_faction": game_state.player_faction_id, "turn": game_state.current_turn})
+        for city_id in game_map.city_ids:
+            city = game_map.cities[city_id]
+            record = {"type": "city", "id": city.city_id, "name": city.name, "region": city.region_id}
+            if city.terrain_type != TerrainType.PLAINS:
+                record["terrain"] = city.terrain_type.value
+            for field, default in (("population", 50000), ("economy", 100), ("industry", 50)):
+                if getattr(city, field) != default:
+                    record[field] = getattr(city, field)
+            write(record)
+        for city1_id, city2_id in game_map.iter_roads():
+            write({"type": "road", "from": city1_id, "to": city2_id})
+        for faction in game_state.factions.values():
+            record = {"type": "faction", "id": faction.faction_id, "name": faction.name, "short_name": faction.short_name}
+            if faction.capital_city_id:
+                record["capital"] = faction.capital_city_id
+            if faction.leader_general_id:
+                record["leader"] = faction.leader_general_id
+            for field, default in (("treasury", 1000), ("food_reserves", 500), ("manpower_pool", 10000), ("next_unit_number", 1)):
+                if getattr(faction, field) != default:
+                    record[field] = getattr(faction, field)
+            write(record)
+        faction_ids = list(game_state.factions)
+        for position, faction1_id in enumerate(faction_ids):
+            for faction2_id in faction_ids[position + 1:]:
+                status = game_state.diplomacy.status(faction1_id, faction2_id)
+                relation = game_state.diplomacy.relation_value(faction1_id, faction2_id)
+                if status != DiplomaticStatus.PEACE or relation != 0:
+                    write({"type": "diplomacy", "factions": [faction1_id, faction2_id], "status": status.value, "relation": relation})
+        for faction in game_state.factions.values():
+            for city_id in faction.controlled_cities_ids:
+                write({"type": "owner", "city": city_id, "faction": faction.faction_id})
+        for general in game_state.generals.values():
+            record = {"type": "general", "id": general.general_id, "name": general.name, "faction": general.faction_id,
+                      "command": general.command, "attack": general.attack_skill, "defense": general.defense_skill}
+            if general.current_location_city_id:
+                record["city"] = general.current_location_city_id
+            write(record)
+        for unit in game_state.army_units.values():
+            record = {"type": "unit", "id": unit.unit_id, "unit_type": unit.unit_type_id, "faction": unit.owning_faction_id, "soldiers": unit.soldiers}
+            unit_type = UnitType.from_string(unit.unit_type_id)
+            if unit_type is None or unit.base_attack != unit_type.base_attack or unit.base_defense != unit_type.base_defense:
+                record["attack"], record["defense"] = unit.base_attack, unit.base_defense
+            if unit.max_soldiers != unit.soldiers:
+                record["max_soldiers"] = unit.max_soldiers
+            if unit.morale != 100:
+                record["morale"] = unit.morale
+            if unit.leading_general_id:
+                record["general"] = unit.leading_general_id
+            if unit.current_location_city_id:
+                record["city"] = unit.current_location_city_id
+            write(record)
+
+
+def format_load_report(report: Dict[str, Dict[str, float]]) -> List[str]:
+    lines = []
+    for record_type, phase in report.items():
+        line = f"  {record_type:<10} {phase['records']:>9} records  {phase['seconds'] * 1000:>9.1f}ms"
+        if phase["peak_bytes"]:
+            line += f"  peak {phase['peak_bytes'] / 2**20:>8.1f} MiB"
+        lines.append(line)
+    lines.append(f"  {'total':<10} {sum(phase['records'] for phase in report.values()):>9} records  "
+                 f"{sum(phase['seconds'] for phase in report.values()) * 1000:>9.1f}ms")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a scenario file and report per-phase load time and peak memory.")
+    parser.add_argument("path", nargs="?", default=scenario_path("europe_1805"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--track-memory", action="store_true")
+    args = parser.parse_args()
+    game_state, report = load_scenario(args.path, batch_size=args.batch_size, track_memory=args.track_memory)
+    print(f"Loaded {args.path}: {len(game_state.game_map.cities)} cities, {len(game_state.factions)} factions, "
+          f"{len(game_state.generals)} generals, {len(game_state.army_units)} units")
+    for line in format_load_report(report):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import math
+import random
+from collections import deque
+from typing import List, Tuple
+
+from city import City
+from faction import Faction
+from game_enums import DiplomaticStatus, TerrainType, UnitType
+from game_events import NullEventSink
+from game_map import GameMap
+from game_state import GameState
+from general import General
+from scenario import save_scenario
+
+# Procedural scenarios for benchmarks and stress tests. Cities sit on a jittered square grid and roads
+# join nearby cities, so the map has fronts and local structure rather than random long edges. Each
+# faction's territory is grown outward from its capital (multi-source breadth-first search), regions
+# are square blocks of the grid, and units are spread over their own faction's cities. Everything is
+# drawn from one seed, so a given set of parameters always produces the same scenario.
+
+TERRAIN_WEIGHTS = ((TerrainType.PLAINS, 60), (TerrainType.FOREST, 20), (TerrainType.MOUNTAIN, 10), (TerrainType.CITY, 10))
+LAND_UNIT_TYPES = [unit_type for unit_type in UnitType if unit_type != UnitType.FLEET_CHANNEL]
+
+
+def _grid_roads(num_cities: int, avg_degree: float, rng: random.Random) -> List[Tuple[int, int]]:
+    # Every row is a chain and the first column joins the rows, so the map is connected; the remaining
+    # roads are drawn from the other grid and diagonal neighbours, then from cities two steps away.
+    width = max(1, math.isqrt(num_cities - 1) + 1)
+    target = max(num_cities - 1, int(num_cities * avg_degree / 2))
+    roads = []
+    optional = []
+    for index in range(num_cities):
+        x, y = index % width, index // width
+        for dx, dy, required in ((1, 0, True), (0, 1, x == 0), (1, 1, False), (-1, 1, False),
+                                 (2, 0, False), (0, 2, False), (2, 1, False), (1, 2, False)):
+            nx, ny = x + dx, y + dy
+            neighbor = ny * width + nx
+            if 0 <= nx < width and neighbor < num_cities:
+                (roads if required else optional).append((index, neighbor))
+    rng.shuffle(optional)
+    roads.extend(optional[:max(0, target - len(roads))])
+    return roads
+
+
+def _grow_territories(num_cities: int, roads: List[Tuple[int, int]], capitals: List[int]) -> List[int]:
+    # Owner index of every city: breadth-first from all capitals at once, so territories are contiguous.
+    neighbors: List[List[int]] = [[] for _ in range(num_cities)]
+    for a, b in roads:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    owner = [-1] * num_cities
+    queue = deque()
+    for faction_index, capital in enumerate(capitals):
+        owner[capital] = faction_index
+        queue.append(capital)
+    while queue:
+        city = queue.popleft()
+        for neighbor in neighbors[city]:
+            if owner[neighbor] < 0:
+                owner[neighbor] = owner[city]
+                queue.append(neighbor)
+    return owner
+
+
+def generate_scenario(num_cities: int = 10000, avg_degree: float = 3.0, num_factions: int = 16, units_per_faction: int = 6250,
+                      war_density: float = 0.3, generals_per_faction: int = 4, region_size: int = 8, seed: int = 0) -> GameState:
+    # war_density is the share of faction pairs at war; region_size is the side of a region's grid block.
+    if num_factions < 1 or num_cities < num_factions:
+        raise ValueError(f"Need at least one faction and one city per faction, got {num_factions} factions and {num_cities} cities.")
+    if not 0.0 <= war_density <= 1.0:
+        raise ValueError(f"war_density must be between 0 and 1, got {war_density}.")
+    rng = random.Random(seed)
+    width = max(1, math.isqrt(num_cities - 1) + 1)
+    terrains, weights = zip(*TERRAIN_WEIGHTS)
+
+    city_ids = [f"city_{index}" for index in range(num_cities)]
+    cities = []
+    for index, city_id in enumerate(city_ids):
+        x, y = index % width, index // width
+        city = City(city_id=city_id, name=f"City {index}", region_id=f"region_{x // region_size}_{y // region_size}")
+        city.terrain_type = rng.choices(terrains, weights)[0]
+        city.population = rng.randrange(10000, 200001, 1000)
+        city.economy = rng.randrange(50, 301)
+        city.industry = rng.randrange(20, 151)
+        cities.append(city)
+    game_map = GameMap(map_id=f"generated_{num_cities}_{seed}")
+    game_map.add_cities(cities)
+    roads = _grid_roads(num_cities, avg_degree, rng)
+    game_map.add_adjacencies([(city_ids[a], city_ids[b]) for a, b in roads])
+
+    game_state = GameState(game_map_obj=game_map, seed=seed)
+    game_state.set_event_sink(NullEventSink())
+    capitals = rng.sample(range(num_cities), num_factions)
+    faction_ids = [f"faction_{index}" for index in range(num_factions)]
+    game_state.add_factions([Faction(faction_id=faction_id, name=f"Faction {index}", short_name=f"F{index}",
+                                     leader_id=f"{faction_id}_general_0", capital_city_id=city_ids[capitals[index]])
+                             for index, faction_id in enumerate(faction_ids)])
+    game_state.player_faction_id = faction_ids[0]
+    # Diplomacy before cities and units, so declaring war does not rescan garrisons.
+    for index, faction_id in enumerate(faction_ids):
+        for other_id in faction_ids[index + 1:]:
+            if rng.random() < war_density:
+                game_state.set_diplomatic_status(faction_id, other_id, DiplomaticStatus.WAR, -100)
+
+    owner = _grow_territories(num_cities, roads, capitals)
+    game_state.assign_cities([(city_ids[index], faction_ids[owner[index]]) for index in range(num_cities) if owner[index] >= 0])
+    territories: List[List[int]] = [[] for _ in range(num_factions)]
+    for index, faction_index in enumerate(owner):
+        if faction_index >= 0:
+            territories[faction_index].append(index)
+
+    generals = []
+    for faction_index, faction_id in enumerate(faction_ids):
+        for general_index in range(generals_per_faction):
+            general = General(general_id=f"{faction_id}_general_{general_index}", name=f"General {faction_index}.{general_index}",
+                              faction_id=faction_id, command=rng.randrange(30, 100), attack_skill=rng.randrange(30, 100),
+                              defense_skill=rng.randrange(30, 100))
+            home = capitals[faction_index] if general_index == 0 else rng.choice(territories[faction_index])
+            general.current_location_city_id = city_ids[home]
+            generals.append(general)
+    game_state.add_generals(generals)
+
+    rows = []
+    for faction_index, faction_id in enumerate(faction_ids):
+        territory = territories[faction_index]
+        for unit_index in range(units_per_faction):
+            unit_type = rng.choice(LAND_UNIT_TYPES)
+            # The first units are led by the faction's generals and start where they stand.
+            if unit_index < generals_per_faction:
+                general_id = f"{faction_id}_general_{unit_index}"
+                home_city_id = game_state.generals[general_id].current_location_city_id
+            else:
+                general_id = None
+                home_city_id = city_ids[rng.choice(territory)]
+            soldiers = rng.randrange(unit_type.default_soldiers // 2, unit_type.default_soldiers + 1)
+            rows.append((f"{faction_id}_unit_{unit_index}", unit_type.type_id, unit_type.base_attack, unit_type.base_defense, faction_id,
+                         soldiers, unit_type.default_soldiers, 100, general_id, home_city_id))
+    game_state.add_unit_rows(rows)
+    return game_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic scenario file.")
+    parser.add_argument("path")
+    parser.add_argument("--cities", type=int, default=10000)
+    parser.add_argument("--avg-degree", type=float, default=3.0)
+    parser.add_argument("--factions", type=int, default=16)
+    parser.add_argument("--units-per-faction", type=int, default=6250)
+    parser.add_argument("--war-density", type=float, default=0.3)
+    parser.add_argument("--generals-per-faction", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    game_state = generate_scenario(args.cities, args.avg_degree, args.factions, args.units_per_faction, args.war_density,
+                                   args.generals_per_faction, seed=args.seed)
+    save_scenario(game_state, args.path)
+    print(f"Wrote {args.path}: {len(game_state.game_map.cities)} cities, {len(game_state.factions)} factions, "
+          f"{len(game_state.generals)} generals, {len(game_state.army_units)} units")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import hashlib
+import marshal
+import os
+import pickle
+import struct
+import time
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from city import City
+from faction import Faction
+from game_enums import TerrainType
+from game_map import GameMap
+from game_state import GameState
+from general import General
+from id_index import OrderedIdSet
+from unit_table import UnitTable
+
+# A snapshot file is a fixed header followed by a pickled payload of plain tuples, lists, dicts and raw
+# array bytes (never game objects), optionally zlib-compressed. Only load snapshots you wrote yourself:
+# unpickling untrusted data is unsafe.
+#
+# A FULL snapshot holds the whole game. A DELTA holds only what changed since the previous snapshot
+# (full or delta) of the same game, using the dirty flags kept by GameState, UnitTable and DiplomacyMatrix.
+# Turn T is restored by loading the latest full snapshot at or before T and applying every later delta
+# up to T in order. Map topology (cities and roads) is only recorded in full snapshots.
+SNAPSHOT_MAGIC = b"NAPSNAP3"  # 2: the game's seed replaced the saved global random state; 3: factions' next unit number
+_HEADER = struct.Struct("<8sBBxxii")  # magic, kind, compressed, turn, base turn
+FULL_SNAPSHOT = 0
+DELTA_SNAPSHOT = 1
+
+
+def _city_record(city) -> Tuple:
+    return (city.city_id, city.name, city.region_id, city.current_owner_faction_id, city.population, city.economy,
+            city.industry, city.terrain_type.value)
+
+
+def _faction_scalars(faction: Faction) -> Tuple:
+    return (faction.faction_id, faction.name, faction.short_name, faction.leader_general_id, faction.capital_city_id,
+            faction.treasury, faction.food_reserves, faction.manpower_pool, faction.next_unit_number)
+
+
+def _general_record(general: General) -> Tuple:
+    return (general.general_id, general.name, general.faction_id, general.command, general.attack_skill,
+            general.defense_skill, general.loyalty, general.current_location_city_id)
+
+
+def _id_lists_to_index_arrays(id_lists: Sequence, position_of: Dict[str, int]) -> Tuple[bytes, bytes]:
+    # Packs many id lists as (offsets, flat positions) into the saved unit order.
+    offsets = array("q", [0])
+    flat = array("i")
+    for ids in id_lists:
+        flat.extend([position_of[unit_id] for unit_id in ids])
+        offsets.append(len(flat))
+    return offsets.tobytes(), flat.tobytes()
+
+
+def _index_arrays_to_id_lists(packed: Tuple[bytes, bytes], unit_ids: List[str]) -> List[List[str]]:
+    offsets = array("q")
+    offsets.frombytes(packed[0])
+    flat = array("i")
+    flat.frombytes(packed[1])
+    return [[unit_ids[position] for position in flat[offsets[index]:offsets[index + 1]]] for index in range(len(offsets) - 1)]
+
+
+def _common_payload(game_state: GameState) -> Dict[str, Any]:
+    return {"turn": game_state.current_turn,
+            "player_faction_id": game_state.player_faction_id,
+            "combat_engine": game_state.combat_engine,
+            "contested_city_ids": list(game_state.contested_city_ids),
+            "unit_destinations": dict(game_state.unit_destinations),
+            "factions": [_faction_scalars(faction) for faction in game_state.factions.values()],
+            "seed": game_state.seed}
+
+
+def _full_payload(game_state: GameState) -> Dict[str, Any]:
+    game_map = game_state.game_map
+    units = game_state.army_units.export_state()
+    position_of = {unit_id: position for position, unit_id in enumerate(units["unit_ids"])}
+    offsets, neighbors = game_map.export_adjacency()
+    cities = [game_map.cities[city_id] for city_id in game_map.city_ids]
+    factions = list(game_state.factions.values())
+    payload = _common_payload(game_state)
+    payload.update({
+        "map_id": game_map.map_id,
+        "compact_map": game_map.compact_mode,
+        "cities": [_city_record(city) for city in cities],
+        "adjacency": (offsets.tobytes(), neighbors.tobytes()),
+        "garrisons": _id_lists_to_index_arrays([city.garrisoned_units for city in cities], position_of),
+        "faction_lists": [(list(faction.controlled_cities_ids), list(faction.generals_list_ids)) for faction in factions],
+        "faction_armies": _id_lists_to_index_arrays([faction.army_units_list_ids for faction in factions], position_of),
+        "diplomacy": game_state.diplomacy.export_state(),
+        "generals": [_general_record(general) for general in game_state.generals.values()],
+        "units": units,
+    })
+    return payload
+
+
+def _delta_payload(game_state: GameState) -> Dict[str, Any]:
+    table = game_state.army_units
+    cities = game_state.game_map.cities
+    payload = _common_payload(game_state)
+    payload.update({
+        "removed_unit_ids": list(table.removed_ids),
+        "units": [table.row_values(row) for row in table.dirty_rows()],
+        "cities": [(_city_record(cities[city_id]), list(cities[city_id].garrisoned_units))
+                   for city_id in sorted(game_state.dirty_city_ids) if city_id in cities],
+        "faction_lists": {faction_id: (list(faction.controlled_cities_ids), list(faction.generals_list_ids), list(faction.army_units_list_ids))
+                          for faction_id in sorted(game_state.dirty_faction_ids) if (faction := game_state.factions.get(faction_id))},
+        "generals": [_general_record(game_state.generals[general_id]) for general_id in sorted(game_state.dirty_general_ids)
+                     if general_id in game_state.generals],
+        "diplomacy": game_state.diplomacy.export_state() if game_state.diplomacy.dirty else None,
+    })
+    return payload
+
+
+def clear_dirty_flags(game_state: GameState):
+    game_state.army_units.clear_dirty()
+    game_state.dirty_city_ids.clear()
+    game_state.dirty_faction_ids.clear()
+    game_state.dirty_general_ids.clear()
+    game_state.diplomacy.dirty = False
+
+
+def _write(path: str, kind: int, turn: int, base_turn: int, payload: Dict[str, Any], compress: bool) -> int:
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    if compress:
+        data = zlib.compress(data, 1)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(SNAPSHOT_MAGIC, kind, int(compress), turn, base_turn))
+        snapshot_file.write(data)
+    os.replace(temp_path, path)
+    return _HEADER.size + len(data)
+
+
+def save_snapshot(game_state: GameState, path: str, compress: bool = False, clear_dirty: bool = True) -> Dict[str, float]:
+    # Full snapshot; also starts a new delta chain by clearing every dirty flag, unless clear_dirty is
+    # False (for side copies, such as replay checkpoints, that must not disturb the caller's deltas).
+    start = time.perf_counter()
+    size = _write(path, FULL_SNAPSHOT, game_state.current_turn, game_state.current_turn, _full_payload(game_state), compress)
+    if clear_dirty:
+        clear_dirty_flags(game_state)
+    return {"bytes": size, "seconds": time.perf_counter() - start}
+
+
+def snapshot_bytes(game_state: GameState, compress: bool = False) -> bytes:
+    # A full snapshot kept in memory (no header); dirty flags are left alone.
+    data = pickle.dumps(_full_payload(game_state), protocol=pickle.HIGHEST_PROTOCOL)
+    return zlib.compress(data, 1) if compress else data
+
+
+def restore_snapshot_bytes(data: bytes, compressed: bool = False) -> GameState:
+    return restore_full(pickle.loads(zlib.decompress(data) if compressed else data))
+
+
+def state_hash(game_state: GameState) -> str:
+    # Digest of the full snapshot payload, with unit codes decoded so that equal games hash equally
+    # whatever their interners hold. marshal format 2 writes no back-references, so the digest depends
+    # only on the values, not on which objects happen to be shared (as pickle's would).
+    payload = _full_payload(game_state)
+    payload["units"] = UnitTable.decoded_state(payload["units"])
+    return hashlib.blake2b(marshal.dumps(payload, 2), digest_size=16).hexdigest()
+
+
+def save_delta(game_state: GameState, path: str, base_turn: int, compress: bool = False) -> Dict[str, float]:
+    # Changes since the previous snapshot; base_turn names the turn of the snapshot this delta follows.
+    start = time.perf_counter()
+    size = _write(path, DELTA_SNAPSHOT, game_state.current_turn, base_turn, _delta_payload(game_state), compress)
+    clear_dirty_flags(game_state)
+    return {"bytes": size, "seconds": time.perf_counter() - start}
+
+
+def read_snapshot(path: str) -> Tuple[int, int, int, Dict[str, Any]]:
+    with open(path, "rb") as snapshot_file:
+        magic, kind, compressed, turn, base_turn = _HEADER.unpack(snapshot_file.read(_HEADER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"'{path}' is not a Napoleon snapshot.")
+        data = snapshot_file.read()
+    if compressed:
+        data = zlib.decompress(data)
+    return kind, turn, base_turn, pickle.loads(data)
+
+
+def _apply_common(game_state: GameState, payload: Dict[str, Any]):
+    game_state.current_turn = payload["turn"]
+    game_state.seed = payload["seed"]
+    game_state.player_faction_id = payload["player_faction_id"]
+    game_state.combat_engine = payload["combat_engine"]
+    game_state.unit_destinations = dict(payload["unit_destinations"])
+    for (faction_id, name, short_name, leader_id, capital_id, treasury, food, manpower, next_unit_number) in payload["factions"]:
+        faction = game_state.factions.get(faction_id)
+        if faction is None:
+            faction = Faction(faction_id=faction_id, name=name, short_name=short_name)
+            game_state.add_faction(faction)
+        faction.name, faction.short_name, faction.leader_general_id, faction.capital_city_id = name, short_name, leader_id, capital_id
+        faction.treasury, faction.food_reserves, faction.manpower_pool = treasury, food, manpower
+        faction.next_unit_number = next_unit_number
+
+
+def _apply_city_record(city, record: Tuple):
+    (_, city.name, city.region_id, city.current_owner_faction_id, city.population, city.economy, city.industry, terrain) = record
+    city.terrain_type = TerrainType(terrain)
+
+
+def _apply_general_record(game_state: GameState, record: Tuple):
+    general = game_state.generals.get(record[0])
+    if general is None:
+        general = General(general_id=record[0], name=record[1])
+        game_state.generals[record[0]] = general
+    (_, general.name, general.faction_id, general.command, general.attack_skill, general.defense_skill,
+     general.loyalty, general.current_location_city_id) = record
+
+
+def _finish_restore(game_state: GameState, contested_city_ids: List[str]):
+    # Rebuilds what is derived from the restored data rather than stored in it.
+    game_state.rebuild_unit_presence_counts()
+    game_state.rebuild_income_ledger()
+    game_state.rebuild_region_stats()
+    game_state.contested_city_ids = OrderedIdSet(contested_city_ids)
+    game_state._stats_cache.clear()
+    game_state.game_map._clear_route_caches()
+    clear_dirty_flags(game_state)
+
+
+def restore_full(payload: Dict[str, Any]) -> GameState:
+    game_map = GameMap(map_id=payload["map_id"])
+    cities = []
+    for record in payload["cities"]:
+        city = City(city_id=record[0], name=record[1], region_id=record[2])
+        _apply_city_record(city, record)
+        cities.append(city)
+    game_map.add_cities(cities)
+    offsets = array("q")
+    offsets.frombytes(payload["adjacency"][0])
+    neighbors = array("i")
+    neighbors.frombytes(payload["adjacency"][1])
+    game_map.restore_adjacency(offsets, neighbors, compact=payload["compact_map"])
+
+    game_state = GameState(game_map_obj=game_map, seed=payload["seed"])
+    game_state.add_factions([Faction(faction_id=scalars[0], name=scalars[1], short_name=scalars[2]) for scalars in payload["factions"]])
+    _apply_common(game_state, payload)
+    game_state.diplomacy.restore_state(payload["diplomacy"])
+    for record in payload["generals"]:
+        _apply_general_record(game_state, record)
+
+    units = payload["units"]
+    game_state.army_units = UnitTable.from_state(units)
+    unit_ids = game_state.army_units.unit_ids
+    for city, garrison in zip(cities, _index_arrays_to_id_lists(payload["garrisons"], unit_ids)):
+        city.garrisoned_units = OrderedIdSet(garrison)
+    armies = _index_arrays_to_id_lists(payload["faction_armies"], unit_ids)
+    for faction, (city_ids, general_ids), army in zip(game_state.factions.values(), payload["faction_lists"], armies):
+        faction.controlled_cities_ids = OrderedIdSet(city_ids)
+        faction.generals_list_ids = OrderedIdSet(general_ids)
+        faction.army_units_list_ids = OrderedIdSet(army)
+    _finish_restore(game_state, payload["contested_city_ids"])
+    return game_state
+
+
+def apply_delta(game_state: GameState, payload: Dict[str, Any]):
+    _apply_common(game_state, payload)
+    table = game_state.army_units
+    for unit_id in payload["removed_unit_ids"]:
+        table.pop(unit_id, None)
+    for values in payload["units"]:
+        row = table.row_of(values[0])
+        if row is None:
+            table.append_row(*values)
+        else:
+            table.overwrite_row(row, values)
+    cities = game_state.game_map.cities
+    for record, garrison in payload["cities"]:
+        city = cities[record[0]]
+        _apply_city_record(city, record)
+        city.garrisoned_units = OrderedIdSet(garrison)
+    for faction_id, (city_ids, general_ids, army) in payload["faction_lists"].items():
+        faction = game_state.factions[faction_id]
+        faction.controlled_cities_ids = OrderedIdSet(city_ids)
+        faction.generals_list_ids = OrderedIdSet(general_ids)
+        faction.army_units_list_ids = OrderedIdSet(army)
+    for record in payload["generals"]:
+        _apply_general_record(game_state, record)
+    if payload["diplomacy"] is not None:
+        game_state.diplomacy.restore_state(payload["diplomacy"])
+    _finish_restore(game_state, payload["contested_city_ids"])
+
+
+def load_snapshot(path: str, delta_paths: Sequence[str] = ()) -> GameState:
+    kind, turn, _, payload = read_snapshot(path)
+    if kind != FULL_SNAPSHOT:
+        raise ValueError(f"'{path}' is a delta; restoring needs a full snapshot first.")
+    game_state = restore_full(payload)
+    previous_turn = turn
+    for delta_path in delta_paths:
+        kind, turn, base_turn, payload = read_snapshot(delta_path)
+        if kind != DELTA_SNAPSHOT or base_turn != previous_turn:
+            raise ValueError(f"'{delta_path}' does not follow the snapshot for turn {previous_turn}.")
+        apply_delta(game_state, payload)
+        previous_turn = turn
+    return game_state
+
+
+class CheckpointLog:
+    # Per-turn checkpoints in one directory: a full snapshot every full_every turns and a delta otherwise.
+    def __init__(self, directory: str, full_every: int = 10, compress: bool = False):
+        self.directory = directory
+        self.full_every = full_every
+        self.compress = compress
+        self.last_turn: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, turn: int, kind: int) -> str:
+        return os.path.join(self.directory, f"turn_{turn:06d}.{'full' if kind == FULL_SNAPSHOT else 'delta'}")
+
+    def checkpoint(self, game_state: GameState) -> Dict[str, float]:
+        turn = game_state.current_turn
+        if self.last_turn is None or turn % self.full_every == 0 or turn <= self.last_turn:
+            stats = save_snapshot(game_state, self._path(turn, FULL_SNAPSHOT), self.compress)
+            stats["kind"] = FULL_SNAPSHOT
+        else:
+            stats = save_delta(game_state, self._path(turn, DELTA_SNAPSHOT), self.last_turn, self.compress)
+            stats["kind"] = DELTA_SNAPSHOT
+        self.last_turn = turn
+        return stats
+
+    def restore(self, turn: int) -> GameState:
+        full_turns = sorted(int(name[5:11]) for name in os.listdir(self.directory) if name.endswith(".full") and int(name[5:11]) <= turn)
+        if not full_turns:
+            raise ValueError(f"No full snapshot at or before turn {turn} in '{self.directory}'.")
+        base_turn = full_turns[-1]
+        delta_turns = sorted(int(name[5:11]) for name in os.listdir(self.directory)
+                             if name.endswith(".delta") and base_turn < int(name[5:11]) <= turn)
+        return load_snapshot(self._path(base_turn, FULL_SNAPSHOT), [self._path(delta_turn, DELTA_SNAPSHOT) for delta_turn in delta_turns])
@@ -0,0 +1,131 @@
+import cProfile
+import heapq
+import io
+import pstats
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Per-phase timers and counters for GameState.next_turn. A GameState holds a TurnProfiler only while
+# profiling is enabled (GameState.enable_profiling); every hook in the turn is behind an
+# "is not None" check, so an unprofiled game pays one attribute read per phase.
+
+PHASES = ("economy", "marching", "ai_planning", "ai_orders", "battles")
+COUNTERS = ("battles", "attacks", "units_destroyed", "cities_captured")
+SLOWEST_BATTLES = 5
+DEFAULT_PROFILE_HISTORY = 20
+
+
+class TurnProfiler:
+    def __init__(self, history: int = DEFAULT_PROFILE_HISTORY):
+        # One profile dict per finished turn, oldest first:
+        # {"turn", "seconds", "phases": {phase: seconds}, "ai_factions": {faction_id: seconds},
+        #  "slowest_battles": [(city_id, seconds)], "counters": {counter: count}}.
+        if history < 1:
+            raise ValueError(f"Profile history must keep at least one turn, not {history}.")
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.current: Optional[Dict[str, Any]] = None
+        self._turn_start = 0.0
+        self._phase_start = 0.0
+        self._capture_turns: Optional[Tuple[int, int]] = None
+        self._capture_path: Optional[str] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self.cprofile_stats: Optional[pstats.Stats] = None
+
+    def set_history_length(self, history: int):
+        # Keeps the newest profiles that fit.
+        if history < 1:
+            raise ValueError(f"Profile history must keep at least one turn, not {history}.")
+        if history != self.history.maxlen:
+            self.history = deque(self.history, maxlen=history)
+
+    def capture(self, first_turn: int, last_turn: int, path: Optional[str] = None):
+        # Runs cProfile over turns first_turn..last_turn; the stats are in cprofile_stats (and written to
+        # path, if given) once the last turn ends.
+        if first_turn > last_turn:
+            raise ValueError(f"Empty capture range: turns {first_turn}..{last_turn}")
+        self._capture_turns = (first_turn, last_turn)
+        self._capture_path = path
+        self._cprofile = None
+        self.cprofile_stats = None
+
+    @property
+    def capturing(self) -> bool:
+        return self._capture_turns is not None
+
+    def start_turn(self, turn: int):
+        self.current = {"turn": turn, "seconds": 0.0, "phases": {}, "ai_factions": {}, "battle_seconds": {},
+                        "counters": dict.fromkeys(COUNTERS, 0)}
+        if self._capture_turns and self._capture_turns[0] <= turn <= self._capture_turns[1]:
+            if self._cprofile is None:
+                self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._turn_start = self._phase_start = time.perf_counter()
+
+    def end_phase(self, phase: str) -> float:
+        # Charges the time since the previous phase ended to phase; returns it.
+        now = time.perf_counter()
+        elapsed = now - self._phase_start
+        phases = self.current["phases"]
+        phases[phase] = phases.get(phase, 0.0) + elapsed
+        self._phase_start = now
+        return elapsed
+
+    def add_time(self, section: str, key: str, seconds: float):
+        times = self.current[section]
+        times[key] = times.get(key, 0.0) + seconds
+
+    def count(self, counter: str, amount: int = 1):
+        self.current["counters"][counter] += amount
+
+    def end_turn(self):
+        profile = self.current
+        profile["seconds"] = time.perf_counter() - self._turn_start
+        battle_seconds = profile.pop("battle_seconds")
+        profile["slowest_battles"] = heapq.nlargest(SLOWEST_BATTLES, battle_seconds.items(), key=lambda item: item[1])
+        self.history.append(profile)
+        self.current = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            if profile["turn"] >= self._capture_turns[1]:
+                self._finish_capture()
+
+    def _finish_capture(self):
+        self.cprofile_stats = pstats.Stats(self._cprofile)
+        if self._capture_path:
+            self.cprofile_stats.dump_stats(self._capture_path)
+        self._cprofile = None
+        self._capture_turns = None
+
+    def cprofile_report(self, limit: int = 20, sort: str = "cumulative") -> str:
+        if self.cprofile_stats is None:
+            return "No cProfile capture has finished yet."
+        out = io.StringIO()
+        self.cprofile_stats.stream = out
+        self.cprofile_stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    lines = [f"--- Turn {profile['turn']} profile: {profile['seconds'] * 1000:.2f}ms ---"]
+    for phase, seconds in profile["phases"].items():
+        lines.append(f"  {phase:<12} {seconds * 1000:9.2f}ms")
+    if profile["ai_factions"]:
+        lines.append("  AI factions: " + ", ".join(f"{faction_id} {seconds * 1000:.2f}ms"
+                                                   for faction_id, seconds in profile["ai_factions"].items()))
+    if profile["slowest_battles"]:
+        lines.append("  Slowest battles: " + ", ".join(f"{city_id} {seconds * 1000:.2f}ms"
+                                                       for city_id, seconds in profile["slowest_battles"]))
+    lines.append("  " + ", ".join(f"{counter.replace('_', ' ')}: {count}" for counter, count in profile["counters"].items()))
+    return "\n".join(lines)
+
+
+def format_history(history: List[Dict[str, Any]]) -> str:
+    lines = [f"{'turn':>6} {'total ms':>10} " + " ".join(f"{phase:>12}" for phase in PHASES)
+             + f" {'battles':>8} {'captures':>8}"]
+    for profile in history:
+        phases = profile["phases"]
+        lines.append(f"{profile['turn']:>6} {profile['seconds'] * 1000:>10.2f} "
+                     + " ".join(f"{phases.get(phase, 0.0) * 1000:>12.2f}" for phase in PHASES)
+                     + f" {profile['counters']['battles']:>8} {profile['counters']['cities_captured']:>8}")
+    return "\n".join(lines)
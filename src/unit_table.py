@@ -0,0 +1,415 @@
+import weakref
+from array import array
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+NO_CODE = -1
+COLUMN_NAMES = ("type_codes", "faction_codes", "general_codes", "city_codes", "soldiers",
+                "max_soldiers", "morale", "base_attack", "base_defense")
+# The coded columns, in the order of export_state's interner tables.
+CODED_COLUMN_NAMES = ("type_codes", "faction_codes", "general_codes", "city_codes")
+# Everything a forked table shares with its parent until one side writes to it.
+SHARED_NAMES = COLUMN_NAMES + ("dirty", "unit_ids", "_row_by_id", "removed_ids")
+
+
+def _copy_column(value):
+    return value.copy() if isinstance(value, dict) else value[:]
+
+
+class StringInterner:
+    # Maps repeated id strings (unit types, factions, generals, cities) to small integer codes.
+    __slots__ = ("codes", "values", "shared")
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        self.shared = False  # codes and values are also used by a copy(); copied before adding a value
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_CODE
+        code = self.codes.get(value)
+        if code is None:
+            if self.shared:
+                self.codes, self.values, self.shared = self.codes.copy(), self.values[:], False
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, code: int) -> Optional[str]:
+        return self.values[code] if code != NO_CODE else None
+
+    def copy(self) -> "StringInterner":
+        clone = StringInterner.__new__(StringInterner)
+        clone.codes, clone.values = self.codes, self.values
+        clone.shared = self.shared = True
+        return clone
+
+
+class UnitTable:
+    # Columnar storage for army units. Each unit is a row; ArmyUnit objects handed out by the table are
+    # two-slot views (table, row) over these columns. Rows of removed units are left in place so views
+    # held by callers stay valid; compact() reclaims them only when its caller asks (GameState.compact_units).
+    view_class = None  # set to ArmyUnit by army_unit.py
+
+    def __init__(self):
+        self._row_by_id: Dict[str, int] = {}
+        self.unit_ids: List[str] = []
+        self.type_codes = array("H")
+        self.faction_codes = array("i")
+        self.general_codes = array("i")
+        self.city_codes = array("i")
+        self.soldiers = array("i")
+        self.max_soldiers = array("i")
+        self.morale = array("h")
+        self.base_attack = array("h")
+        self.base_defense = array("h")
+        # Change tracking for delta snapshots: dirty[row] is set when a row is added or written through an
+        # ArmyUnit setter (or by the numpy combat engine); removed_ids collects popped units.
+        self.dirty = bytearray()
+        self.removed_ids: List[str] = []
+        # Bumped on every change to the units, so caches of derived data (views.py) can tell they are stale.
+        self.version = 0
+        self.unit_types = StringInterner()
+        self.factions = StringInterner()
+        self.generals = StringInterner()
+        self.cities = StringInterner()
+        # Write barrier for transactions and forks (see GameState.begin/fork). While write_barrier is set,
+        # every write first calls before_write/before_write_rows, which copies columns still shared with a
+        # fork and records old values in the journal. _owned_columns is None when nothing is shared.
+        self.journal = None
+        self.write_barrier = False
+        self._owned_columns: Optional[Set[str]] = None
+        self._is_fork = False
+        self._forks = None
+        self._order_stale = False  # _row_by_id no longer in row order after a rolled-back removal
+
+    def _update_barrier(self):
+        self.write_barrier = self.journal is not None or self._owned_columns is not None
+
+    def _own(self, name: str):
+        owned = self._owned_columns
+        if owned is None or name in owned:
+            return
+        if not self._is_fork and not self._forks:
+            # Every fork of this table is gone, so nothing is shared any more.
+            self._owned_columns = None
+            self._update_barrier()
+            return
+        setattr(self, name, _copy_column(getattr(self, name)))
+        owned.add(name)
+
+    def before_write(self, column_name: str, row: int):
+        self._own(column_name)
+        self._own("dirty")
+        if self.journal is not None:
+            column = getattr(self, column_name)
+            self.journal.record(column.__setitem__, row, column[row])
+
+    def before_write_rows(self, column_name: str, rows: List[int]):
+        self._own(column_name)
+        self._own("dirty")
+        if self.journal is not None:
+            column = getattr(self, column_name)
+            self.journal.record(self._restore_rows, column, rows, [column[row] for row in rows])
+
+    @staticmethod
+    def _restore_rows(column, rows: List[int], values: List[int]):
+        for row, value in zip(rows, values):
+            column[row] = value
+
+    def _before_append(self):
+        for name in SHARED_NAMES:
+            self._own(name)
+        if self.journal is not None:
+            self.journal.record(self._truncate, len(self.unit_ids))
+
+    def _truncate(self, row: int):
+        # Undoes appends: the rows from `row` on are always the newest ones when this runs.
+        for unit_id in self.unit_ids[row:]:
+            self._row_by_id.pop(unit_id, None)
+        for column_name in COLUMN_NAMES:
+            del getattr(self, column_name)[row:]
+        del self.unit_ids[row:]
+        del self.dirty[row:]
+        self.version += 1
+
+    def _unpop(self, unit_id: str, row: int):
+        row_by_id = self._row_by_id
+        if row_by_id and row < next(reversed(row_by_id.values())):
+            self._order_stale = True
+        row_by_id[unit_id] = row
+        if self.removed_ids and self.removed_ids[-1] == unit_id:
+            self.removed_ids.pop()
+        self.dirty[row] = 1
+        self.version += 1
+
+    def _ensure_order(self):
+        # Iteration follows row order; restores it once after rollbacks re-inserted removed units.
+        if self._order_stale:
+            unit_ids = self.unit_ids
+            self._row_by_id = {unit_ids[row]: row for row in sorted(self._row_by_id.values())}
+            self._order_stale = False
+
+    def fork(self) -> "UnitTable":
+        # A table sharing every column with this one; each side copies a column on its first write to it.
+        child = UnitTable.__new__(UnitTable)
+        child.__dict__.update(self.__dict__)
+        child.unit_types, child.factions = self.unit_types.copy(), self.factions.copy()
+        child.generals, child.cities = self.generals.copy(), self.cities.copy()
+        child.journal = None
+        child._owned_columns = set()
+        child._is_fork = True
+        child._forks = None
+        child._update_barrier()
+        if self._forks is None:
+            self._forks = weakref.WeakSet()
+        self._forks.add(child)
+        self._owned_columns = set()
+        self._update_barrier()
+        return child
+
+    def append_row(self, unit_id: str, unit_type_id: str, base_attack: int, base_defense: int,
+                   owning_faction_id: Optional[str], soldiers: int, max_soldiers: int, morale: int = 100,
+                   leading_general_id: Optional[str] = None, current_location_city_id: Optional[str] = None) -> int:
+        if unit_id in self._row_by_id:
+            raise KeyError(f"Unit '{unit_id}' already exists in the unit table.")
+        if self.write_barrier:
+            self._before_append()
+        row = len(self.unit_ids)
+        self.unit_ids.append(unit_id)
+        self.type_codes.append(self.unit_types.intern(unit_type_id))
+        self.faction_codes.append(self.factions.intern(owning_faction_id))
+        self.general_codes.append(self.generals.intern(leading_general_id))
+        self.city_codes.append(self.cities.intern(current_location_city_id))
+        self.soldiers.append(soldiers)
+        self.max_soldiers.append(max_soldiers)
+        self.morale.append(morale)
+        self.base_attack.append(base_attack)
+        self.base_defense.append(base_defense)
+        self.dirty.append(1)
+        self._row_by_id[unit_id] = row
+        self.version += 1
+        return row
+
+    def extend_rows(self, rows: List[Tuple]) -> int:
+        # Bulk append_row: rows are tuples in row_values order. Ids are checked once for the whole batch and
+        # each column is extended in one call. Returns the row index of the first new unit.
+        row_by_id = self._row_by_id
+        new_ids = [row[0] for row in rows]
+        seen = set()
+        duplicates = []
+        for unit_id in new_ids:
+            if unit_id in row_by_id or unit_id in seen:
+                duplicates.append(unit_id)
+            seen.add(unit_id)
+        if duplicates:
+            raise KeyError(f"Units already exist in the unit table: {duplicates[:5]}")
+        if self.write_barrier:
+            self._before_append()
+        first_row = len(self.unit_ids)
+        self.unit_ids.extend(new_ids)
+        intern_type, intern_faction = self.unit_types.intern, self.factions.intern
+        intern_general, intern_city = self.generals.intern, self.cities.intern
+        self.type_codes.extend([intern_type(row[1]) for row in rows])
+        self.base_attack.extend([row[2] for row in rows])
+        self.base_defense.extend([row[3] for row in rows])
+        self.faction_codes.extend([intern_faction(row[4]) for row in rows])
+        self.soldiers.extend([row[5] for row in rows])
+        self.max_soldiers.extend([row[6] for row in rows])
+        self.morale.extend([row[7] for row in rows])
+        self.general_codes.extend([intern_general(row[8]) for row in rows])
+        self.city_codes.extend([intern_city(row[9]) for row in rows])
+        self.dirty.extend(b"\x01" * len(new_ids))
+        row_by_id.update(zip(new_ids, range(first_row, first_row + len(new_ids))))
+        self.version += 1
+        return first_row
+
+    def row_values(self, row: int) -> Tuple:
+        return (self.unit_ids[row], self.unit_types.lookup(self.type_codes[row]), self.base_attack[row], self.base_defense[row],
+                self.factions.lookup(self.faction_codes[row]), self.soldiers[row], self.max_soldiers[row], self.morale[row],
+                self.generals.lookup(self.general_codes[row]), self.cities.lookup(self.city_codes[row]))
+
+    def _view(self, row: int):
+        unit = self.view_class.__new__(self.view_class)
+        unit._table = self
+        unit._row = row
+        return unit
+
+    def add(self, unit):
+        # Copies a (typically detached) ArmyUnit into this table and rebinds the object to its new row.
+        row = self.append_row(*unit._table.row_values(unit._row))
+        unit._table = self
+        unit._row = row
+        return unit
+
+    def row_of(self, unit_id: str) -> Optional[int]:
+        return self._row_by_id.get(unit_id)
+
+    def compact(self):
+        # Drops the rows of removed units. Any ArmyUnit view obtained before this call is invalidated.
+        # Skipped inside a transaction, whose journal refers to rows by number.
+        if self.journal is not None:
+            return
+        self._ensure_order()
+        live_rows = list(self._row_by_id.values())
+        if len(live_rows) == len(self.unit_ids):
+            return
+        for column_name in COLUMN_NAMES:
+            column = getattr(self, column_name)
+            setattr(self, column_name, array(column.typecode, (column[row] for row in live_rows)))
+        self.dirty = bytearray(self.dirty[row] for row in live_rows)
+        self.unit_ids = [self.unit_ids[row] for row in live_rows]
+        self._row_by_id = {unit_id: row for row, unit_id in enumerate(self.unit_ids)}
+        if self._owned_columns is not None:
+            self._owned_columns.update(("dirty", "unit_ids", "_row_by_id") + COLUMN_NAMES)
+
+    @property
+    def dead_rows(self) -> int:
+        return len(self.unit_ids) - len(self._row_by_id)
+
+    def dirty_rows(self) -> List[int]:
+        # Live rows changed since the last clear_dirty(), in row order.
+        dirty, row_by_id, unit_ids = self.dirty, self._row_by_id, self.unit_ids
+        rows = []
+        row = dirty.find(1)
+        while row != -1:
+            if row_by_id.get(unit_ids[row]) == row:
+                rows.append(row)
+            row = dirty.find(1, row + 1)
+        return rows
+
+    def clear_dirty(self):
+        self.dirty = bytearray(len(self.unit_ids))
+        self.removed_ids = []
+
+    def export_state(self) -> Dict:
+        # Live rows only, as raw column bytes plus the interner tables the codes refer to.
+        self._ensure_order()
+        live_rows = list(self._row_by_id.values())
+        all_live = len(live_rows) == len(self.unit_ids)
+        state = {"unit_ids": self.unit_ids if all_live else [self.unit_ids[row] for row in live_rows],
+                 "interners": [self.unit_types.values, self.factions.values, self.generals.values, self.cities.values]}
+        for column_name in COLUMN_NAMES:
+            column = getattr(self, column_name)
+            state[column_name] = (column if all_live else array(column.typecode, (column[row] for row in live_rows))).tobytes()
+        return state
+
+    @staticmethod
+    def decoded_state(state: Dict) -> Dict:
+        # export_state output with the coded columns replaced by the strings they stand for. Interners
+        # keep every string ever interned, including ones only seen inside rolled-back transactions, so
+        # two tables holding the same units can export different codes but decode equal.
+        decoded = {name: value for name, value in state.items() if name != "interners"}
+        empty = UnitTable()
+        for column_name, values in zip(CODED_COLUMN_NAMES, state["interners"]):
+            column = array(getattr(empty, column_name).typecode)
+            column.frombytes(state[column_name])
+            decoded[column_name] = [values[code] if code != NO_CODE else None for code in column]
+        return decoded
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "UnitTable":
+        table = cls()
+        for interner, values in zip((table.unit_types, table.factions, table.generals, table.cities), state["interners"]):
+            for value in values:
+                interner.intern(value)
+        for column_name in COLUMN_NAMES:
+            getattr(table, column_name).frombytes(state[column_name])
+        table.unit_ids = list(state["unit_ids"])
+        table._row_by_id = {unit_id: row for row, unit_id in enumerate(table.unit_ids)}
+        table.dirty = bytearray(len(table.unit_ids))
+        return table
+
+    def overwrite_row(self, row: int, values: Tuple):
+        # Writes a full row_values tuple over an existing row (used when applying delta snapshots).
+        (_, unit_type_id, base_attack, base_defense, owning_faction_id, soldiers, max_soldiers, morale,
+         leading_general_id, current_location_city_id) = values
+        self.type_codes[row] = self.unit_types.intern(unit_type_id)
+        self.base_attack[row] = base_attack
+        self.base_defense[row] = base_defense
+        self.faction_codes[row] = self.factions.intern(owning_faction_id)
+        self.soldiers[row] = soldiers
+        self.max_soldiers[row] = max_soldiers
+        self.morale[row] = morale
+        self.general_codes[row] = self.generals.intern(leading_general_id)
+        self.city_codes[row] = self.cities.intern(current_location_city_id)
+        self.dirty[row] = 1
+        self.version += 1
+
+    # Mapping interface, so GameState.army_units keeps behaving like Dict[str, ArmyUnit].
+    def __getitem__(self, unit_id: str):
+        return self._view(self._row_by_id[unit_id])
+
+    def __setitem__(self, unit_id: str, unit):
+        if unit_id != unit.unit_id:
+            raise KeyError(f"Unit table key '{unit_id}' does not match unit id '{unit.unit_id}'.")
+        self.add(unit)
+
+    def get(self, unit_id: str, default=None):
+        row = self._row_by_id.get(unit_id)
+        return self._view(row) if row is not None else default
+
+    def pop(self, unit_id: str, *default):
+        if self.write_barrier and unit_id in self._row_by_id:
+            self._own("_row_by_id")
+            self._own("removed_ids")
+        row = self._row_by_id.pop(unit_id, None)
+        if row is None:
+            if default:
+                return default[0]
+            raise KeyError(unit_id)
+        if self.journal is not None:
+            self.journal.record(self._unpop, unit_id, row)
+        self.removed_ids.append(unit_id)
+        self.version += 1
+        return self._view(row)
+
+    def __contains__(self, unit_id) -> bool:
+        return unit_id in self._row_by_id
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def __iter__(self) -> Iterator[str]:
+        self._ensure_order()
+        return iter(self._row_by_id)
+
+    def keys(self):
+        self._ensure_order()
+        return self._row_by_id.keys()
+
+    def values(self) -> "UnitValuesView":
+        return UnitValuesView(self)
+
+    def items(self) -> "UnitItemsView":
+        return UnitItemsView(self)
+
+
+class UnitValuesView:
+    # Like dict.values(): sized, iterable any number of times, and live. Each iteration makes its ArmyUnit
+    # views as it goes rather than all up front.
+    __slots__ = ("_table",)
+
+    def __init__(self, table: UnitTable):
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __iter__(self):
+        table = self._table
+        table._ensure_order()
+        view = table._view
+        return map(view, table._row_by_id.values())
+
+
+class UnitItemsView(UnitValuesView):
+    # Like dict.items(), yielding (unit_id, ArmyUnit) pairs.
+    __slots__ = ()
+
+    def __iter__(self):
+        table = self._table
+        table._ensure_order()
+        view = table._view
+        return ((unit_id, view(row)) for unit_id, row in table._row_by_id.items())
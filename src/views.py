@@ -0,0 +1,279 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Paginated, filtered and sorted read views for the summary and info commands. A query (kind, filters,
+# sort) resolves to an ordered list of entity ids, and each id renders to one summary line. Both are
+# cached per game in a ViewCache and stamped with the version counter of the kind they were built from
+# (GameState.entity_versions; UnitTable.version for units), which every change to an entity of that kind
+# bumps. A stale stamp means the cached list or lines are rebuilt on next use, so paging through an
+# unchanged game costs one page of work, and only the lines of the page shown are ever rendered.
+
+KINDS = ("factions", "cities", "generals", "units")
+SECTION_TITLES = {"factions": "Factions", "cities": "Cities", "generals": "Generals", "units": "Army Units"}
+SORT_FIELDS = {
+    "factions": ("id", "name", "treasury", "cities", "units"),
+    "cities": ("id", "name", "owner", "region", "garrison", "population", "economy"),
+    "generals": ("id", "name", "faction", "location", "command", "attack", "defense"),
+    "units": ("id", "type", "faction", "location", "soldiers", "attack", "defense", "morale"),
+}
+DEFAULT_PAGE_SIZE = 20
+MAX_CACHED_ID_LISTS = 16
+MAX_CACHED_LINES = 10000  # per kind
+
+
+class ViewQuery(NamedTuple):
+    kind: str
+    faction_id: Optional[str] = None  # owner of cities; faction of generals and units; the faction itself
+    region_id: Optional[str] = None   # region of cities, or of the city a general or unit stands in
+    sort: Optional[str] = None        # one of SORT_FIELDS[kind]; None keeps the game's own order
+    descending: bool = False
+
+
+class ViewPage(NamedTuple):
+    query: ViewQuery
+    page: int  # 1-based
+    pages: int
+    total: int
+    lines: List[str]
+
+
+class SummaryRequest(NamedTuple):
+    query: Optional[ViewQuery]  # None for every section
+    page: int
+    page_size: int
+
+
+def _stamp(game_state, kind: str) -> Tuple[int, int]:
+    # The count guards against entities added behind GameState's back (e.g. straight into the map).
+    if kind == "units":
+        return game_state.army_units.version, len(game_state.army_units)
+    collection = game_state.game_map.cities if kind == "cities" else getattr(game_state, kind)
+    return game_state.entity_versions[kind], len(collection)
+
+
+def _matching_ids(game_state, query: ViewQuery) -> List[str]:
+    kind, faction_id, region_id = query.kind, query.faction_id, query.region_id
+    cities = game_state.game_map.cities
+    if kind == "factions":
+        return [faction_id] if faction_id is not None else list(game_state.factions)
+    region_city_ids = game_state.game_map.regions.get(region_id, ()) if region_id is not None else None
+    if kind == "cities":
+        return [city_id for city_id in (cities if region_city_ids is None else region_city_ids)
+                if faction_id is None or cities[city_id].current_owner_faction_id == faction_id]
+    if kind == "generals":
+        return [general_id for general_id, general in game_state.generals.items()
+                if (faction_id is None or general.faction_id == faction_id)
+                and (region_id is None or getattr(cities.get(general.current_location_city_id), "region_id", None) == region_id)]
+    table = game_state.army_units
+    unit_ids = list(game_state.factions[faction_id].army_units_list_ids) if faction_id is not None else list(table)
+    if region_id is not None:
+        # Compare interned city codes, so no unit view is built.
+        city_codes = table.cities.codes
+        region_codes = {city_codes[city_id] for city_id in region_city_ids if city_id in city_codes}
+        row_of, location_codes = table.row_of, table.city_codes
+        unit_ids = [unit_id for unit_id in unit_ids if location_codes[row_of(unit_id)] in region_codes]
+    return unit_ids
+
+
+def _sort_key(game_state, kind: str, field: str) -> Optional[Callable[[str], Any]]:
+    if field == "id":
+        return None
+    if kind == "factions":
+        factions = game_state.factions
+        get = {"name": lambda faction: faction.name, "treasury": lambda faction: faction.treasury,
+               "cities": lambda faction: len(faction.controlled_cities_ids), "units": lambda faction: len(faction.army_units_list_ids)}[field]
+        return lambda faction_id: get(factions[faction_id])
+    if kind == "cities":
+        cities = game_state.game_map.cities
+        get = {"name": lambda city: city.name, "owner": lambda city: city.current_owner_faction_id or "",
+               "region": lambda city: city.region_id or "", "garrison": lambda city: len(city.garrisoned_units),
+               "population": lambda city: city.population, "economy": lambda city: city.economy}[field]
+        return lambda city_id: get(cities[city_id])
+    if kind == "generals":
+        generals = game_state.generals
+        get = {"name": lambda general: general.name, "faction": lambda general: general.faction_id or "",
+               "location": lambda general: general.current_location_city_id or "", "command": lambda general: general.command,
+               "attack": lambda general: general.attack_skill, "defense": lambda general: general.defense_skill}[field]
+        return lambda general_id: get(generals[general_id])
+    table = game_state.army_units
+    get = {"type": lambda row: table.unit_types.values[table.type_codes[row]],
+           "faction": lambda row: table.factions.lookup(table.faction_codes[row]) or "",
+           "location": lambda row: table.cities.lookup(table.city_codes[row]) or "",
+           "soldiers": lambda row: table.soldiers[row], "attack": lambda row: table.base_attack[row],
+           "defense": lambda row: table.base_defense[row], "morale": lambda row: table.morale[row]}[field]
+    row_of = table.row_of
+    return lambda unit_id: get(row_of(unit_id))
+
+
+def _render(game_state, kind: str, entity_id: str) -> str:
+    if kind == "factions":
+        faction = game_state.factions[entity_id]
+        return f"- {faction.name} (ID: {entity_id}), Capital: {faction.capital_city_id or 'N/A'}, Treasury: {faction.treasury}"
+    if kind == "cities":
+        city = game_state.game_map.cities[entity_id]
+        owner = game_state.factions.get(city.current_owner_faction_id) if city.current_owner_faction_id else None
+        return f"- {city.name} (ID: {entity_id}), Owner: {owner.short_name if owner else 'Unowned'}, Garrison: {len(city.garrisoned_units)} units"
+    if kind == "generals":
+        general = game_state.generals[entity_id]
+        return (f"- {general.name} (ID: {entity_id}), Faction: {general.faction_id or 'N/A'}, Location: {general.current_location_city_id or 'Field'}, "
+                f"CMD:{general.command} ATK:{general.attack_skill} DEF:{general.defense_skill}")
+    return f"- {game_state.army_units[entity_id]}"
+
+
+class ViewCache:
+    def __init__(self):
+        # query -> (stamp, ordered ids), least recently used first; kind -> (stamp, {id: line}).
+        self._id_lists: "OrderedDict[ViewQuery, Tuple[Tuple[int, int], List[str]]]" = OrderedDict()
+        self._lines: Dict[str, Tuple[Tuple[int, int], Dict[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def ids(self, game_state, query: ViewQuery) -> List[str]:
+        stamp = _stamp(game_state, query.kind)
+        cached = self._id_lists.get(query)
+        if cached is not None and cached[0] == stamp:
+            self._id_lists.move_to_end(query)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        entity_ids = _matching_ids(game_state, query)
+        if query.sort:
+            entity_ids.sort(key=_sort_key(game_state, query.kind, query.sort), reverse=query.descending)
+        self._id_lists[query] = (stamp, entity_ids)
+        self._id_lists.move_to_end(query)
+        if len(self._id_lists) > MAX_CACHED_ID_LISTS:
+            self._id_lists.popitem(last=False)
+        return entity_ids
+
+    def lines(self, game_state, kind: str, entity_ids: List[str]) -> List[str]:
+        stamp = _stamp(game_state, kind)
+        cached = self._lines.get(kind)
+        if cached is None or cached[0] != stamp:
+            cached = self._lines[kind] = (stamp, {})
+        rendered = cached[1]
+        lines = []
+        for entity_id in entity_ids:
+            line = rendered.get(entity_id)
+            if line is None:
+                if len(rendered) >= MAX_CACHED_LINES:
+                    rendered.clear()
+                line = rendered[entity_id] = _render(game_state, kind, entity_id)
+            lines.append(line)
+        return lines
+
+
+def view_cache(game_state) -> ViewCache:
+    if game_state.view_cache is None:
+        game_state.view_cache = ViewCache()
+    return game_state.view_cache
+
+
+def check_query(game_state, query: ViewQuery) -> Optional[str]:
+    if query.kind not in SORT_FIELDS:
+        return f"Error: Unknown view '{query.kind}'. Supported: {', '.join(KINDS)}"
+    if query.faction_id is not None and query.faction_id not in game_state.factions:
+        return f"Error: Faction with ID '{query.faction_id}' not found."
+    if query.region_id is not None and query.kind == "factions":
+        return "Error: Factions cannot be filtered by region."
+    if query.sort is not None and query.sort not in SORT_FIELDS[query.kind]:
+        return f"Error: {SECTION_TITLES[query.kind]} cannot be sorted by '{query.sort}'. Supported: {', '.join(SORT_FIELDS[query.kind])}"
+    return None
+
+
+def get_page(game_state, query: ViewQuery, page: int = 1, page_size: Optional[int] = DEFAULT_PAGE_SIZE) -> Union[ViewPage, str]:
+    # One page of a view, or an "Error: ..." message. page_size None puts every match on page 1.
+    error = check_query(game_state, query)
+    if error:
+        return error
+    if page < 1 or (page_size is not None and page_size < 1):
+        return "Error: Page number and page size must be at least 1."
+    cache = view_cache(game_state)
+    entity_ids = cache.ids(game_state, query)
+    total = len(entity_ids)
+    pages = max(1, -(-total // page_size)) if page_size else 1
+    if page > pages:
+        return f"Error: Page {page} is past the last page ({pages})."
+    if page_size:
+        entity_ids = entity_ids[(page - 1) * page_size:page * page_size]
+    return ViewPage(query, page, pages, total, cache.lines(game_state, query.kind, entity_ids))
+
+
+def query_command(query: Optional[ViewQuery]) -> str:
+    # The summary command that shows this view.
+    if query is None:
+        return "summary"
+    words = ["summary", query.kind]
+    if query.faction_id is not None:
+        words += ["owner" if query.kind == "cities" else "faction", query.faction_id]
+    if query.region_id is not None:
+        words += ["region", query.region_id]
+    if query.sort is not None:
+        words += ["sort", query.sort] + (["desc"] if query.descending else [])
+    return " ".join(words)
+
+
+def section_lines(game_state, kind: str, page: int = 1, page_size: Optional[int] = None) -> List[str]:
+    # One section of display_summary: a page of the unfiltered view, with a pointer to the next page.
+    view_page = get_page(game_state, ViewQuery(kind), page, page_size)
+    if isinstance(view_page, str):
+        return [f"  (no entries on page {page})"]
+    lines = list(view_page.lines)
+    if view_page.page < view_page.pages:
+        remaining = view_page.total - view_page.page * page_size
+        lines.append(f"  ... {remaining} more; see '{query_command(view_page.query)} --page {view_page.page + 1}'")
+    return lines
+
+
+def format_page(view_page: ViewPage) -> str:
+    query = view_page.query
+    filters = []
+    if query.faction_id is not None:
+        filters.append(f"{'owner' if query.kind == 'cities' else 'faction'} {query.faction_id}")
+    if query.region_id is not None:
+        filters.append(f"region {query.region_id}")
+    if query.sort is not None:
+        filters.append(f"sort {query.sort}{' desc' if query.descending else ''}")
+    title = SECTION_TITLES[query.kind] + (f" ({', '.join(filters)})" if filters else "")
+    if not view_page.total:
+        return f"{title}: none."
+    lines = [f"{title}: page {view_page.page} of {view_page.pages}, {view_page.total} total"]
+    lines.extend(view_page.lines)
+    if view_page.page < view_page.pages:
+        lines.append(f"  ... see '{query_command(query)} --page {view_page.page + 1}' for more")
+    return "\n".join(lines)
+
+
+def parse_summary_args(args: List[str]) -> Union[SummaryRequest, str]:
+    # Arguments of: summary [<kind>] [faction|owner <faction_id>] [region <region_id>] [sort <field> [desc]]
+    #               [--page <n>] [--page-size <n>]
+    usage = ("Error: Invalid summary command. Format: summary [factions|cities|generals|units] [faction|owner <faction_id>] "
+             "[region <region_id>] [sort <field> [desc]] [--page <n>] [--page-size <n>]")
+    kind = args[0] if args and args[0] in KINDS else None
+    fields: Dict[str, Any] = {}
+    page, page_size = 1, DEFAULT_PAGE_SIZE
+    index = 1 if kind else 0
+    while index < len(args):
+        word = args[index]
+        value = args[index + 1] if index + 1 < len(args) else None
+        if value is None:
+            return usage
+        if word in ("faction", "owner") and "faction_id" not in fields:
+            fields["faction_id"] = value
+        elif word == "region" and "region_id" not in fields:
+            fields["region_id"] = value
+        elif word == "sort" and "sort" not in fields:
+            fields["sort"] = value
+            if index + 2 < len(args) and args[index + 2] == "desc":
+                fields["descending"] = True
+                index += 1
+        elif word in ("--page", "--page-size") and value.isdigit() and int(value) > 0:
+            if word == "--page":
+                page = int(value)
+            else:
+                page_size = int(value)
+        else:
+            return usage
+        index += 2
+    if kind is None and fields:
+        return "Error: Filters and sorting need a view: summary <factions|cities|generals|units> ..."
+    return SummaryRequest(ViewQuery(kind, **fields) if kind else None, page, page_size)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# The game modules import each other as top-level modules (e.g. "from game_state import GameState").
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import pytest
+
+from game_events import NullEventSink
+from scenario import load_scenario, scenario_path
+
+
+@pytest.fixture
+def game_state():
+    # A fresh europe_1805 game with events switched off.
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    game_state.set_event_sink(NullEventSink())
+    return game_state
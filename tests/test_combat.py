@@ -0,0 +1,34 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmarks import COMPARISON_FORCES, compare_engines
+
+TRIALS = 400
+# Allowed gap between the engines, in standard errors of the difference of the two sample means.
+TOLERANCE = 4.0
+
+
+def _assert_means_agree(python_stats, numpy_stats, name):
+    python_mean, numpy_mean = python_stats[f"{name}_mean"], numpy_stats[f"{name}_mean"]
+    standard_error = math.sqrt((python_stats[f"{name}_std"] ** 2 + numpy_stats[f"{name}_std"] ** 2) / TRIALS)
+    assert abs(python_mean - numpy_mean) <= TOLERANCE * standard_error + 1e-9, (name, python_mean, numpy_mean, standard_error)
+
+
+@pytest.mark.parametrize("num_defenders,num_attackers", COMPARISON_FORCES)
+def test_engines_agree(num_defenders, num_attackers):
+    stats = compare_engines(TRIALS, num_defenders, num_attackers)
+    python_stats, numpy_stats = stats["python"], stats["numpy"]
+    _assert_means_agree(python_stats, numpy_stats, "defender")
+    _assert_means_agree(python_stats, numpy_stats, "attacker")
+    pooled_rate = (python_stats["capture_rate"] + numpy_stats["capture_rate"]) / 2
+    standard_error = math.sqrt(2 * pooled_rate * (1 - pooled_rate) / TRIALS)
+    assert abs(python_stats["capture_rate"] - numpy_stats["capture_rate"]) <= TOLERANCE * standard_error + 1e-9
+
+
+def test_comparison_covers_a_capture():
+    # The settle path (city changes hands) must be exercised, not only held cities.
+    rates = [compare_engines(100, *forces)["python"]["capture_rate"] for forces in COMPARISON_FORCES]
+    assert any(0.1 < rate < 0.9 for rate in rates)
@@ -0,0 +1,30 @@
+import pytest
+
+from game_enums import DiplomaticStatus
+
+
+def test_relations_view_is_read_only(game_state):
+    relations = game_state.factions["france"].diplomatic_relations
+    before = relations["austria"]["status"]
+    with pytest.raises(TypeError):
+        relations["austria"] = {"status": DiplomaticStatus.WAR, "relation_value": -100}
+    assert game_state.diplomacy.status("france", "austria") == before
+
+
+def test_reading_treaties_does_not_change_the_matrix(game_state):
+    diplomacy = game_state.diplomacy
+    diplomacy.dirty = False
+    treaties = game_state.factions["france"].diplomatic_relations["austria"]["treaties"]
+    treaties.append("secret_pact")
+    assert diplomacy.treaties("france", "austria") == []
+    assert not diplomacy._treaties
+    assert not diplomacy.dirty
+
+
+def test_war_through_game_state_is_journaled(game_state):
+    game_state.begin()
+    game_state.set_diplomatic_status("france", "prussia", DiplomaticStatus.WAR, -100)
+    assert game_state.factions["france"].diplomatic_relations["prussia"]["status"] == DiplomaticStatus.WAR
+    game_state.rollback()
+    assert game_state.factions["france"].diplomatic_relations["prussia"]["status"] == DiplomaticStatus.PEACE
+    assert game_state.verify_indexes() == []
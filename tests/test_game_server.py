@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from game_server import GameServer, RequestError
+
+
+def _run(tmp_path, scenario_coroutine):
+    async def run():
+        server = GameServer(str(tmp_path), idle_seconds=3600, workers=1, max_turns_per_request=5, max_recruits_per_request=20)
+        try:
+            return await scenario_coroutine(server)
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_session_survives_eviction(tmp_path):
+    async def play(server):
+        created = await server.handle_request({"op": "create_session", "scenario": "europe_1805", "seed": 7})
+        session_id = created["session"]
+        assert (await server.handle_request({"op": "next_turn", "session": session_id, "count": 3}))["turn"] == created["turn"] + 3
+        before = await server.handle_request({"op": "get_faction_details_str", "session": session_id, "faction_id": "france"})
+        session = server.sessions[session_id]
+        async with session.lock:
+            await server.evict(session)
+        assert session.game_state is None and server.stats["evictions"] == 1
+        after = await server.handle_request({"op": "get_faction_details_str", "session": session_id, "faction_id": "france"})
+        assert after == before and server.stats["restores"] == 1
+        assert (await server.handle_request({"op": "next_turn", "session": session_id}))["turn"] == created["turn"] + 4
+        assert await server.handle_request({"op": "close_session", "session": session_id}) == {"closed": session_id}
+        assert not server.sessions
+    _run(tmp_path, play)
+
+
+@pytest.mark.parametrize("scenario", ["/etc/passwd.jsonl", "../scenarios/europe_1805", "..", ".hidden"])
+def test_scenarios_are_names_not_paths(tmp_path, scenario):
+    async def create(server):
+        with pytest.raises(RequestError, match="Invalid scenario name"):
+            await server.handle_request({"op": "create_session", "scenario": scenario})
+        assert (await server.handle_request({"op": "create_session", "scenario": "europe_1805.jsonl"}))["session"]
+    _run(tmp_path, create)
+
+
+def test_counts_are_limited(tmp_path):
+    async def flood(server):
+        session_id = (await server.handle_request({"op": "create_session"}))["session"]
+        response = await server.handle_line(b'{"id": 1, "op": "next_turn", "session": "%s", "count": 1000000000}' % session_id.encode())
+        assert not response["ok"] and "at most 5" in response["error"]
+        response = await server.handle_line(b'{"id": 2, "op": "recruit_units", "session": "%s", "unit_type": "infantry_corps", '
+                                            b'"city_id": "paris", "count": 1000000000}' % session_id.encode())
+        assert not response["ok"] and "at most 20" in response["error"]
+        assert len(server.sessions[session_id].game_state.army_units) == 5
+    _run(tmp_path, flood)
@@ -0,0 +1,68 @@
+from army_unit import ArmyUnit
+from scenario import load_scenario, scenario_path
+from scenario_generator import generate_scenario
+from snapshot import state_hash
+
+
+def test_placing_unit_in_its_own_city_changes_nothing():
+    game_state = generate_scenario(50, num_factions=3, units_per_faction=40, seed=1)
+    city = next(city for city in game_state.game_map.cities.values() if len(city.garrisoned_units) > 1)
+    first_unit_id = next(iter(city.garrisoned_units))
+    garrison_before, hash_before = list(city.garrisoned_units), state_hash(game_state)
+    game_state.place_unit_in_city(first_unit_id, city.city_id)
+    assert list(game_state.game_map.cities[city.city_id].garrisoned_units) == garrison_before
+    assert state_hash(game_state) == hash_before
+
+
+def test_damaging_a_unit_keeps_region_counts():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    region_id = game_state.game_map.cities["paris"].region_id
+    soldiers_before = game_state.get_region_stats(region_id, "france").soldiers
+    assert not game_state.damage_unit("fra_guard", 100)
+    assert game_state.get_region_stats(region_id, "france").soldiers == soldiers_before - 100
+    assert game_state.verify_indexes() == []
+    assert game_state.damage_unit("fra_guard", 10 ** 9)
+    assert game_state.army_units["fra_guard"].soldiers == 0
+    assert game_state.verify_indexes() == []
+
+
+def _france_unit_ids(game_state):
+    return [unit_id for unit_id in game_state.army_units if unit_id.startswith("france_unit_")]
+
+
+def test_recruited_ids_are_never_reused():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    game_state.add_army_unit(ArmyUnit("france_unit_2", "militia", 5, 5, "france"))
+    game_state.place_unit_in_city("france_unit_2", "paris")
+    game_state.recruit_units("infantry_corps", "paris", 3)
+    assert _france_unit_ids(game_state) == ["france_unit_2", "france_unit_1", "france_unit_3", "france_unit_4"]
+    game_state._remove_unit("france_unit_4")
+    game_state._remove_unit("france_unit_3")
+    game_state.recruit_unit("infantry_corps", "paris")
+    game_state.recruit_units("infantry_corps", "paris", 2)
+    assert _france_unit_ids(game_state) == ["france_unit_2", "france_unit_1", "france_unit_5", "france_unit_6", "france_unit_7"]
+    assert game_state.verify_indexes() == []
+
+
+def test_recruit_units_for_another_faction():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    message = game_state.recruit_units("militia", "london", 3, acting_faction_id="britain")
+    assert not message.startswith("Error"), message
+    britain = game_state.factions["britain"]
+    new_unit_ids = [unit_id for unit_id in game_state.army_units if unit_id.startswith("britain_unit_")]
+    assert len(new_unit_ids) == 3
+    for unit_id in new_unit_ids:
+        unit = game_state.army_units[unit_id]
+        assert (unit.owning_faction_id, unit.current_location_city_id) == ("britain", "london")
+        assert unit_id in britain.army_units_list_ids and unit_id in game_state.game_map.cities["london"].garrisoned_units
+    assert not _france_unit_ids(game_state)
+    assert game_state.recruit_units("militia", "paris", 3, acting_faction_id="britain").startswith("Error")
+    assert game_state.verify_indexes() == []
+
+
+def test_placing_unit_missing_from_its_garrison_re_adds_it():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    game_state._writable_garrison("paris").discard("fra_guard")
+    game_state.place_unit_in_city("fra_guard", "paris")
+    assert "fra_guard" in game_state.game_map.cities["paris"].garrisoned_units
+    assert game_state.verify_indexes() == []
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from city import City
+from game_events import NullEventSink
+from game_map import GameMap
+from scenario_generator import generate_scenario
+from snapshot import _full_payload
+from unit_table import UnitTable
+
+SEED = 5
+
+
+def _hub_map(spokes: int = 40) -> GameMap:
+    game_map = GameMap(map_id="hub")
+    game_map.add_cities([City(city_id=f"c{index}", name=f"C{index}", region_id="r") for index in range(spokes + 1)])
+    order = list(range(1, spokes + 1))
+    random.Random(SEED).shuffle(order)
+    game_map.add_adjacencies([("c0", f"c{index}") for index in order])
+    return game_map
+
+
+def _game_outcome(game_state, turns: int = 30):
+    game_state.seed = SEED
+    game_state.set_event_sink(NullEventSink())
+    for _ in range(turns):
+        game_state.next_turn()
+    payload = _full_payload(game_state)
+    del payload["compact_map"], payload["adjacency"]
+    payload["units"] = UnitTable.decoded_state(payload["units"])
+    return payload
+
+
+def test_compacting_keeps_neighbour_order():
+    game_map = _hub_map()
+    before = {city_id: game_map.neighbors(city_id) for city_id in game_map.city_ids}
+    game_map.compact_adjacency()
+    assert {city_id: game_map.neighbors(city_id) for city_id in game_map.city_ids} == before
+
+
+def test_compact_adjacency_lookups_on_long_rows():
+    game_map = _hub_map()
+    game_map.compact_adjacency()
+    assert all(game_map.are_adjacent("c0", f"c{index}") and game_map.are_adjacent(f"c{index}", "c0") for index in range(1, 41))
+    assert not game_map.are_adjacent("c1", "c2")
+    assert not game_map.are_adjacent("c0", "c0")
+
+
+def test_graph_file_keeps_neighbour_order(tmp_path):
+    game_map = _hub_map()
+    before = {city_id: game_map.neighbors(city_id) for city_id in game_map.city_ids}
+    path = str(tmp_path / "hub.graph")
+    game_map.save_graph_file(path)
+    loaded = GameMap(map_id="hub")
+    loaded.load_graph_file(path, city_factory=lambda city_id: City(city_id=city_id, name=city_id, region_id="r"))
+    assert {city_id: loaded.neighbors(city_id) for city_id in loaded.city_ids} == before
+
+
+def test_compact_map_plays_the_same_game():
+    plain = generate_scenario(300, num_factions=6, units_per_faction=40, seed=SEED)
+    compact = generate_scenario(300, num_factions=6, units_per_faction=40, seed=SEED)
+    compact.game_map.compact_adjacency()
+    assert _game_outcome(plain) == _game_outcome(compact)
+
+
+def test_graph_file_registers_new_cities_in_regions(tmp_path):
+    game_map = _hub_map()
+    path = str(tmp_path / "hub.graph")
+    game_map.save_graph_file(path)
+    loaded = GameMap(map_id="hub")
+    loaded.add_city(City(city_id="c0", name="C0", region_id="centre"))
+    loaded.load_graph_file(path, city_factory=lambda city_id: City(city_id=city_id, name=city_id, region_id=f"r{city_id[1:] == '1'}"))
+    assert set(loaded.regions) == {"centre", "rTrue", "rFalse"}
+    assert sorted(city_id for city_ids in loaded.regions.values() for city_id in city_ids) == sorted(loaded.cities)
+    assert loaded.neighbors("c0") == game_map.neighbors("c0")
+
+
+def test_graph_file_rejects_unknown_cities(tmp_path):
+    game_map = _hub_map()
+    path = str(tmp_path / "hub.graph")
+    game_map.save_graph_file(path)
+    with pytest.raises(ValueError):
+        GameMap(map_id="hub").load_graph_file(path)
@@ -0,0 +1,42 @@
+from game_events import NullEventSink
+from scenario import load_scenario, save_scenario, scenario_path
+from scenario_generator import generate_scenario
+from snapshot import state_hash
+
+TURNS = 12
+SEED = 5
+
+
+def _play(game_state, turns=TURNS):
+    game_state.seed = SEED
+    game_state.set_event_sink(NullEventSink())
+    for _ in range(turns):
+        game_state.next_turn()
+    return state_hash(game_state)
+
+
+def _round_trip(game_state, tmp_path):
+    path = str(tmp_path / "saved.jsonl")
+    save_scenario(game_state, path)
+    reloaded, _ = load_scenario(path)
+    return reloaded
+
+
+def test_saved_scenario_keeps_neighbour_order(tmp_path):
+    original, _ = load_scenario(scenario_path("europe_1805"))
+    reloaded = _round_trip(original, tmp_path)
+    game_map = original.game_map
+    assert [game_map.neighbors(city_id) for city_id in game_map.city_ids] == \
+           [reloaded.game_map.neighbors(city_id) for city_id in game_map.city_ids]
+
+
+def test_saved_scenario_replays_identically(tmp_path):
+    original, _ = load_scenario(scenario_path("europe_1805"))
+    reloaded = _round_trip(original, tmp_path)
+    assert _play(original) == _play(reloaded)
+
+
+def test_saved_generated_scenario_replays_identically(tmp_path):
+    original = generate_scenario(300, num_factions=6, units_per_faction=40, seed=SEED)
+    reloaded = _round_trip(original, tmp_path)
+    assert _play(original) == _play(reloaded)
@@ -0,0 +1,34 @@
+from game_enums import TerrainType, UnitMovementType
+from snapshot import load_snapshot, save_delta, save_snapshot, state_hash
+
+
+def test_terrain_change_reaches_delta(game_state, tmp_path):
+    full_path, delta_path = str(tmp_path / "full.snap"), str(tmp_path / "delta.snap")
+    save_snapshot(game_state, full_path)
+    assert not game_state.set_city_terrain("paris", TerrainType.MOUNTAIN).startswith("Error")
+    save_delta(game_state, delta_path, base_turn=game_state.current_turn)
+    restored = load_snapshot(full_path, [delta_path])
+    assert restored.game_map.cities["paris"].terrain_type == TerrainType.MOUNTAIN
+    assert state_hash(restored) == state_hash(game_state)
+
+
+def test_terrain_change_rolls_back_with_routes(game_state):
+    game_map = game_state.game_map
+    route_before = game_map.find_path("london", "vienna", UnitMovementType.ARTILLERY)
+    game_state.begin()
+    game_state.set_city_terrain("paris", TerrainType.MOUNTAIN)
+    game_map.find_path("london", "vienna", UnitMovementType.ARTILLERY)
+    game_state.rollback()
+    assert game_map.cities["paris"].terrain_type == TerrainType.PLAINS
+    assert game_map.find_path("london", "vienna", UnitMovementType.ARTILLERY) == route_before
+
+
+def test_terrain_change_in_fork_leaves_parent_alone(game_state):
+    game_map = game_state.game_map
+    costs_before = list(game_map._costs_for(UnitMovementType.FOOT))
+    child = game_state.fork()
+    child.set_city_terrain("paris", TerrainType.MOUNTAIN)
+    child.game_map._costs_for(UnitMovementType.FOOT)
+    assert game_map.cities["paris"].terrain_type == TerrainType.PLAINS
+    assert game_map._costs_for(UnitMovementType.FOOT) == costs_before
+    assert child.game_map._costs_for(UnitMovementType.FOOT) != costs_before
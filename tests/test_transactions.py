@@ -0,0 +1,92 @@
+import gc
+
+import pytest
+
+from city import City
+from game_enums import DiplomaticStatus
+from game_events import NullEventSink
+from scenario import load_scenario, scenario_path
+from scenario_generator import generate_scenario
+from snapshot import state_hash
+
+TURNS = 8
+
+
+def _games():
+    europe, _ = load_scenario(scenario_path("europe_1805"))
+    games = [europe] + [generate_scenario(200, num_factions=5, units_per_faction=30, seed=seed) for seed in (1, 2, 3)]
+    for game_state in games:
+        game_state.set_event_sink(NullEventSink())
+    return games
+
+
+def _play(game_state, turns=TURNS):
+    for _ in range(turns):
+        game_state.next_turn()
+    return state_hash(game_state)
+
+
+@pytest.mark.parametrize("game_index", range(4))
+def test_rollback_restores_state(game_index):
+    game_state = _games()[game_index]
+    before = state_hash(game_state)
+    game_state.begin()
+    _play(game_state)
+    game_state.rollback()
+    assert state_hash(game_state) == before
+    assert game_state.verify_indexes() == []
+
+
+@pytest.mark.parametrize("game_index", range(4))
+def test_fork_plays_like_parent_without_touching_it(game_index):
+    game_state = _games()[game_index]
+    before = state_hash(game_state)
+    child = game_state.fork()
+    child_hash = _play(child)
+    assert state_hash(game_state) == before
+    assert _play(game_state) == child_hash
+    assert game_state.verify_indexes() == [] and child.verify_indexes() == []
+
+
+def _edit_map(game_state):
+    game_map = game_state.game_map
+    city_ids = game_map.city_ids
+    game_map.add_adjacency(city_ids[0], city_ids[-1])
+
+
+def test_map_edits_refused_in_transaction():
+    game_state = _games()[0]
+    game_state.begin()
+    with pytest.raises(RuntimeError):
+        _edit_map(game_state)
+    with pytest.raises(RuntimeError):
+        game_state.game_map.add_city(City(city_id="new_city", name="New City", region_id="test"))
+    game_state.commit()
+    _edit_map(game_state)
+
+
+def test_map_edits_refused_while_forked():
+    game_state = _games()[0]
+    child = game_state.fork()
+    with pytest.raises(RuntimeError):
+        _edit_map(child)
+    with pytest.raises(RuntimeError):
+        _edit_map(game_state)
+    del child
+    gc.collect()
+    _edit_map(game_state)
+
+
+def test_fork_shares_indexes_until_changed():
+    game_state = _games()[0]
+    child = game_state.fork()
+    assert child.game_map.cities is game_state.game_map.cities
+    assert child._city_faction_unit_counts is game_state._city_faction_unit_counts
+    assert child.diplomacy._status is game_state.diplomacy._status
+    child_before = state_hash(child)
+    game_state.set_diplomatic_status("france", "prussia", DiplomaticStatus.WAR, -100)
+    game_state.march_unit("fra_guard", "vienna")
+    _play(game_state, 3)
+    assert state_hash(child) == child_before
+    assert child.is_at_war("france", "prussia") is False and not child.unit_destinations
+    assert child.game_map.cities is not game_state.game_map.cities
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_capture_keeps_history_length(game_state):
+    game_state.enable_profiling(50)
+    game_state.enable_profiling().capture(3, 5)
+    assert game_state.profiler.history.maxlen == 50
+
+
+def test_resizing_keeps_capture_in_progress(game_state):
+    game_state.enable_profiling().capture(2, 4)
+    game_state.next_turn()
+    game_state.next_turn()
+    profiler = game_state.enable_profiling(5)
+    assert profiler.capturing
+    game_state.next_turn()
+    game_state.next_turn()
+    assert profiler.cprofile_stats is not None
+    assert [profile["turn"] for profile in profiler.history] == [2, 3, 4, 5]
+
+
+def test_resizing_keeps_newest_profiles(game_state):
+    game_state.enable_profiling(10)
+    for _ in range(4):
+        game_state.next_turn()
+    assert [profile["turn"] for profile in game_state.enable_profiling(2).history] == [4, 5]
+
+
+def test_empty_history_is_rejected(game_state):
+    with pytest.raises(ValueError):
+        game_state.enable_profiling(0)
+    game_state.enable_profiling(3)
+    with pytest.raises(ValueError):
+        game_state.enable_profiling(0)
+    assert game_state.profiler.history.maxlen == 3
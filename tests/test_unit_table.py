@@ -0,0 +1,31 @@
+from game_events import NullEventSink
+from scenario import load_scenario, scenario_path
+
+
+def test_values_and_items_can_be_reused():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    army_units = game_state.army_units
+    values, items = army_units.values(), army_units.items()
+    assert len(values) == len(items) == len(army_units)
+    assert [unit.unit_id for unit in values] == [unit.unit_id for unit in values] == list(army_units)
+    assert [unit_id for unit_id, _ in items] == [unit.unit_id for _, unit in items] == list(army_units)
+    game_state.recruit_units("infantry_corps", "paris", 3)
+    assert len(values) == len(items) == len(army_units)
+    assert [unit.unit_id for unit in values] == list(army_units)
+
+
+def test_held_units_survive_turns_and_compaction_is_explicit():
+    game_state, _ = load_scenario(scenario_path("europe_1805"))
+    game_state.set_event_sink(NullEventSink())
+    game_state.recruit_units("infantry_corps", "paris", 50)
+    unit_ids = [unit_id for unit_id in game_state.army_units if unit_id.startswith("france_unit_")]
+    for unit_id in unit_ids[:40]:
+        game_state._remove_unit(unit_id)
+    held = [game_state.army_units[unit_id] for unit_id in unit_ids[40:]]
+    game_state.next_turn()
+    assert [unit.unit_id for unit in held] == unit_ids[40:]
+    assert game_state.army_units.dead_rows == 40
+    assert game_state.compact_units()
+    assert game_state.army_units.dead_rows == 0
+    assert [game_state.army_units[unit_id].unit_id for unit_id in unit_ids[40:]] == unit_ids[40:]
+    assert game_state.verify_indexes() == []